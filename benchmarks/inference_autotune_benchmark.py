@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Throughput/latency of the inference scheduler: fixed batch sizes vs the autotuner
+
+Closed-loop clients each submit one interactive text to the embedding model and
+wait for it, at several concurrency levels (optionally with a bulk job running
+in the background). For every level the benchmark reports items/s, tokens/s and
+p50/p99 latency of:
+  - fixed batch limits (--fixed-sizes, autotuning off)
+  - the autotuner (INFERENCE_* SLO settings), plus the batch limit, coalescing
+    wait and cost model it converged to
+
+The final section prints the fitted latency curve (expected padded tokens,
+predicted latency and throughput per batch size), which is what the autotuner
+picks its limits from.
+
+Usage:
+    python benchmarks/inference_autotune_benchmark.py
+    python benchmarks/inference_autotune_benchmark.py --model sentence-transformers/all-MiniLM-L6-v2 \\
+        --concurrency 1 4 16 64 --seconds 10 --with-bulk --output autotune.json
+"""
+import sys
+sys.path.append('.')
+
+import argparse
+import json
+import random
+import statistics
+import threading
+import time
+from typing import Dict, Any, List
+
+from src.core.config import settings
+from src.utils.inference_scheduler import InferenceScheduler, INTERACTIVE, BULK
+
+WORDS = (
+    "the a new post about travel food music code startup coffee weekend run marathon team "
+    "launch photo city mountain river book movie game season friends family work project "
+    "idea today finally amazing really think love hate weather summer winter"
+).split()
+
+
+def make_texts(count: int, seed: int) -> List[str]:
+    """Posts with a long-tailed length mix: mostly short, some paragraphs, a few essays"""
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(count):
+        roll = rng.random()
+        words = rng.randint(5, 20) if roll < 0.7 else rng.randint(40, 120) if roll < 0.95 else rng.randint(200, 400)
+        texts.append(" ".join(rng.choice(WORDS) for _ in range(words)))
+    return texts
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def run_level(
+    scheduler: InferenceScheduler,
+    texts: List[str],
+    concurrency: int,
+    seconds: float,
+    with_bulk: bool,
+    estimate_tokens
+) -> Dict[str, Any]:
+    """Drive the scheduler with closed-loop interactive clients for a fixed time"""
+    stop = threading.Event()
+    latencies: List[float] = []
+    tokens = [0]
+    lock = threading.Lock()
+
+    def client(index: int):
+        rng = random.Random(index)
+        while not stop.is_set():
+            text = rng.choice(texts)
+            start = time.perf_counter()
+            scheduler.run([text], INTERACTIVE)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                tokens[0] += estimate_tokens(text)
+
+    def bulk():
+        while not stop.is_set():
+            scheduler.run(texts[:256], BULK)
+
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(concurrency)]
+    if with_bulk:
+        threads.append(threading.Thread(target=bulk, daemon=True))
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "items_per_s": round(len(latencies) / duration, 1),
+        "tokens_per_s": round(tokens[0] / duration, 1),
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inference scheduler autotuner benchmark")
+    parser.add_argument("--model", default=None, help="Embedding model (default: settings.EMBEDDING_MODEL)")
+    parser.add_argument("--dimension", type=int, default=None)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--fixed-sizes", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--seconds", type=float, default=5.0, help="Duration of each measurement")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Autotuner settling time before measuring")
+    parser.add_argument("--with-bulk", action="store_true", help="Keep a bulk job running in the background")
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default=None, help="Write the results as JSON")
+    args = parser.parse_args()
+
+    from src.services.embeddings_service import EmbeddingsService
+    service = EmbeddingsService(model_name=args.model, dimension=args.dimension)
+    texts = make_texts(args.texts, args.seed)
+    service._encode(texts[:64])  # Warm-up
+
+    print(
+        f"SLO: interactive {settings.INFERENCE_INTERACTIVE_SLO_MS:g}ms, bulk {settings.INFERENCE_BULK_SLO_MS:g}ms; "
+        f"bulk job: {'on' if args.with_bulk else 'off'}\n"
+    )
+    header = f"  {'config':<14} {'clients':>7} {'items/s':>9} {'tokens/s':>10} {'p50':>9} {'p99':>9}   tuned"
+    results = []
+    tuned_scheduler = None
+
+    for concurrency in args.concurrency:
+        print(header)
+        configs = [(f"fixed {size}", size, False) for size in args.fixed_sizes] + [("autotune", None, True)]
+        for label, size, autotune in configs:
+            scheduler = InferenceScheduler(
+                "benchmark",
+                service._encode,
+                max_batch_size=size,
+                bulk_batch_size=size,
+                cost_fn=service.estimate_tokens,
+                autotune=autotune,
+                pass_size=settings.EMBEDDING_FORWARD_BATCH
+            )
+            if autotune and args.warmup > 0:
+                run_level(scheduler, texts, concurrency, args.warmup, args.with_bulk, service.estimate_tokens)
+            row = run_level(scheduler, texts, concurrency, args.seconds, args.with_bulk, service.estimate_tokens)
+            row["config"] = label
+
+            tuned = ""
+            if scheduler.tuner is not None:
+                tuner = scheduler.tuner
+                overhead, per_token = tuner.cost_model() or (0.0, 0.0)
+                row["tuned"] = {
+                    "interactive_limit": tuner.limits[INTERACTIVE],
+                    "bulk_limit": tuner.limits[BULK],
+                    "coalesce_wait_ms": round(tuner.coalesce_wait * 1000, 3),
+                    "model_tokens_per_s": round(tuner.tokens_per_second, 1),
+                    "overhead_ms": round(overhead * 1000, 3),
+                    "us_per_token": round(per_token * 1e6, 3),
+                }
+                tuned = (
+                    f"limits {tuner.limits[INTERACTIVE]}/{tuner.limits[BULK]}, "
+                    f"wait {tuner.coalesce_wait * 1000:.2f}ms"
+                )
+                tuned_scheduler = scheduler
+            scheduler.stop()
+
+            results.append(row)
+            print(
+                f"  {label:<14} {concurrency:>7} {row['items_per_s']:>9} {row['tokens_per_s']:>10} "
+                f"{row['p50_ms']:>7}ms {row['p99_ms']:>7}ms   {tuned}"
+            )
+        print()
+
+    curve = []
+    if tuned_scheduler is not None and tuned_scheduler.tuner.cost_model() is not None:
+        tuner = tuned_scheduler.tuner
+        overhead, per_token = tuner.cost_model()
+        costs = [service.estimate_tokens(text) for text in texts]
+        padded = tuner.expected_padded_tokens(costs)
+        print(f"Fitted cost model: {overhead * 1000:.2f}ms + {per_token * 1e6:.2f}us/padded token "
+              f"({statistics.mean(costs):.0f} tokens per text on average)")
+        print(f"  {'batch':>6} {'padded':>8} {'latency':>10} {'items/s':>10}")
+        for size in (1, 2, 4, 8, 16, 32, 64, 128, 256):
+            if size > len(padded):
+                break
+            latency = overhead + per_token * padded[size - 1]
+            curve.append({
+                "batch": size,
+                "padded_tokens": round(float(padded[size - 1]), 1),
+                "latency_ms": round(latency * 1000, 3),
+                "items_per_s": round(size / latency, 1),
+            })
+            marker = "  <- interactive limit" if size <= tuner.limits[INTERACTIVE] < size * 2 else ""
+            print(f"  {size:>6} {padded[size - 1]:>8.0f} {latency * 1000:>8.2f}ms {size / latency:>10.1f}{marker}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "model": service.model_name,
+                "slo_ms": {
+                    "interactive": settings.INFERENCE_INTERACTIVE_SLO_MS,
+                    "bulk": settings.INFERENCE_BULK_SLO_MS,
+                },
+                "with_bulk": args.with_bulk,
+                "results": results,
+                "curve": curve,
+            }, f, indent=2)
+        print(f"\n✓ Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test for the FastAPI endpoints
+
+By default the app runs in-process with local stand-ins, so results are reproducible
+and need no external services:
+  - MongoDB: mongomock (or a local mongod via --mongo-uri)
+  - Vector store: in-memory LocalVectorStore
+  - Embeddings: a small sentence-transformers model (--model)
+  - Moderation: the rule-based service (--moderation ml loads Detoxify)
+
+A seeded synthetic dataset (users, posts, likes, comments, follows) is written to
+Mongo and indexed, then each endpoint is driven at the configured concurrency.
+Per-endpoint p50/p95/p99 latency, throughput and error rate go to a JSON report;
+--compare prints the change against an earlier report.
+
+Usage:
+    pip install -r requirements-dev.txt
+    python benchmarks/load_test.py --concurrency 8 --requests 300 --output bench_load.json
+    python benchmarks/load_test.py --target http://localhost:8000 --user-ids <id> <id>
+    python benchmarks/load_test.py --compare bench_load_previous.json
+"""
+import sys
+sys.path.append('.')
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import time
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Callable
+
+import httpx
+import numpy as np
+
+from src.core.config import settings
+
+WORDS = [
+    "travel", "fitness", "coffee", "music", "coding", "python", "football", "recipe",
+    "photography", "mountains", "beach", "startup", "design", "gaming", "books", "movies",
+    "yoga", "running", "garden", "pets", "art", "science", "history", "fashion",
+    "weekend", "city", "sunset", "team", "learning", "project", "family", "friends",
+]
+
+MODERATION_SAMPLES = [
+    "Had a great time hiking with friends this weekend!",
+    "CLICK HERE to win free money, limited offer, act now!!!",
+    "This recipe is the worst thing I have ever cooked, so dumb",
+    "Check out my new photography portfolio",
+]
+
+
+def random_text(rng: random.Random, min_words: int, max_words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words)))
+
+
+def seed_database(db, n_users: int, n_posts: int, seed: int) -> Dict[str, List[str]]:
+    """
+    Write a synthetic social graph into MongoDB
+
+    Every user likes at least one post, so every user gets an interest vector.
+
+    Returns:
+        Dictionary with the generated 'user_ids' and 'post_ids'
+    """
+    from bson import ObjectId
+
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+
+    users = [
+        {
+            "_id": ObjectId(),
+            "firstName": rng.choice(["Alex", "Sam", "Jo", "Riley", "Kim", "Noor", "Ari"]),
+            "lastName": rng.choice(["Lee", "Patel", "Garcia", "Smith", "Chen", "Okafor"]),
+            "bio": random_text(rng, 0, 12),
+        }
+        for _ in range(n_users)
+    ]
+    posts = [
+        {
+            "_id": ObjectId(),
+            "userId": rng.choice(users)["_id"],
+            "post": random_text(rng, 3, 60),
+            "type": 0,
+            "reactions": 0,
+            "comments": 0,
+        }
+        for _ in range(n_posts)
+    ]
+
+    reactions, comments, follows = [], [], []
+    for user in users:
+        for post in rng.sample(posts, min(len(posts), rng.randint(1, 15))):
+            reactions.append({
+                "userId": user["_id"],
+                "postId": post["_id"],
+                "createdAt": now - timedelta(days=rng.uniform(0, 90)),
+            })
+        for post in rng.sample(posts, min(len(posts), rng.randint(0, 5))):
+            comments.append({
+                "userId": user["_id"],
+                "postId": post["_id"],
+                "createdAt": now - timedelta(days=rng.uniform(0, 90)),
+            })
+        for followee in rng.sample(users, min(len(users), rng.randint(0, 10))):
+            if followee["_id"] != user["_id"]:
+                follows.append({"followerId": user["_id"], "followeeId": followee["_id"]})
+
+    db.users.insert_many(users)
+    db.posts.insert_many(posts)
+    db.postreactions.insert_many(reactions)
+    if comments:
+        db.comments.insert_many(comments)
+    if follows:
+        db.friends.insert_many(follows)
+
+    return {
+        "user_ids": [str(user["_id"]) for user in users],
+        "post_ids": [str(post["_id"]) for post in posts],
+    }
+
+
+def build_local_app(args) -> Dict[str, Any]:
+    """
+    Wire the app to local stand-ins and index the seeded dataset
+
+    Returns:
+        Dictionary with the ASGI 'app' and the seeded 'user_ids' / 'post_ids'
+    """
+    settings.EMBEDDING_MODEL = args.model
+    settings.EMBEDDING_DIMENSION = args.dimension
+
+    from src.core import dependencies
+    from src.services.embeddings_service import EmbeddingsService
+    from src.services.vector_db_service import VectorDBService
+    from src.services.local_vector_store import LocalVectorStore
+    from src.services.mongo_service import MongoService
+    from src.services.recommendation_service import RecommendationService
+    from src.utils.helpers import build_user_metadata, build_post_metadata
+
+    if args.mongo_uri:
+        from pymongo import MongoClient
+        mongo_client = MongoClient(args.mongo_uri)
+    else:
+        try:
+            import mongomock
+        except ImportError:
+            raise SystemExit("mongomock is required for the local stand-in (pip install -r requirements-dev.txt)")
+        mongo_client = mongomock.MongoClient("mongodb://localhost:27017/postal_loadtest")
+
+    mongo = MongoService(client=mongo_client)
+    # In-memory LocalVectorStore: qdrant-client's own local mode cannot add a named
+    # vector to an existing point, which interest updates do
+    vector_db = VectorDBService(client=LocalVectorStore())
+    embeddings = EmbeddingsService()
+    recommendation = RecommendationService(embeddings, vector_db, mongo)
+
+    if args.moderation == "ml":
+        from src.services.moderation_service import ModerationService
+    else:
+        from src.services.moderation_service_simple import ModerationService
+    moderation = ModerationService()
+
+    print(f"\nSeeding {args.users} users and {args.posts} posts...")
+    mongo.db.client.drop_database(mongo.db.name)
+    ids = seed_database(mongo.db, args.users, args.posts, args.seed)
+
+    print("Indexing posts...")
+    vector_db.create_collections()
+    posts = mongo.get_all_posts()
+    post_embeddings = embeddings.encode_posts(posts).tolist()
+    vector_db.upsert_batch(
+        vector_db.POSTS_COLLECTION,
+        [
+            {
+                "id": str(post["_id"]),
+                "vectors": {VectorDBService.POST_CONTENT_VECTOR: embedding},
+                "payload": build_post_metadata(post),
+            }
+            for post, embedding in zip(posts, post_embeddings)
+        ]
+    )
+
+    print("Indexing users and interest vectors...")
+    users = mongo.get_all_users()
+    user_embeddings = embeddings.generate_embeddings_batch([embeddings.user_text(user) for user in users])
+    items = []
+    for user, embedding in zip(users, user_embeddings):
+        user_id = str(user["_id"])
+        vectors = {VectorDBService.USER_PROFILE_VECTOR: embedding}
+        payload = build_user_metadata(user)
+        interest = recommendation.compute_user_interest(user_id)
+        if interest:
+            vectors[VectorDBService.USER_INTEREST_VECTOR] = interest[0]
+            payload.update(interest[1])
+        items.append({"id": user_id, "vectors": vectors, "payload": payload})
+    vector_db.upsert_batch(vector_db.USERS_COLLECTION, items)
+
+    # Route every dependency lookup to the stand-ins
+    dependencies._embeddings_service = embeddings
+    dependencies._vector_db_service = vector_db
+    dependencies._mongo_service = mongo
+    dependencies._recommendation_service = recommendation
+    dependencies._moderation_service = moderation
+
+    from src.api.main import app
+    return {"app": app, **ids}
+
+
+def build_scenarios(user_ids: List[str], rng: random.Random) -> Dict[str, Callable[[], Dict[str, Any]]]:
+    """Request body generators per endpoint"""
+    return {
+        "/api/search/posts": lambda: {"query": random_text(rng, 1, 6), "limit": 20},
+        "/api/search/users": lambda: {"query": random_text(rng, 1, 4), "limit": 10},
+        "/api/recommendations/users": lambda: {"user_id": rng.choice(user_ids), "limit": 10},
+        "/api/recommendations/posts": lambda: {"user_id": rng.choice(user_ids), "limit": 20},
+        "/api/recommendations/posts/collaborative": lambda: {"user_id": rng.choice(user_ids), "limit": 20},
+        "/api/moderation/check": lambda: {"text": rng.choice(MODERATION_SAMPLES)},
+    }
+
+
+async def run_endpoint(
+    client: httpx.AsyncClient,
+    path: str,
+    make_body: Callable[[], Dict[str, Any]],
+    total_requests: int,
+    concurrency: int
+) -> Dict[str, Any]:
+    """Fire total_requests POSTs at one endpoint with a fixed number of concurrent workers"""
+    latencies: List[float] = []
+    errors = 0
+    remaining = total_requests
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            body = make_body()
+            t0 = time.perf_counter()
+            try:
+                response = await client.post(path, json=body)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - t0)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies_ms = np.array(latencies) * 1000.0
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "error_rate": errors / len(latencies) if latencies else 0.0,
+        "throughput_rps": len(latencies) / elapsed if elapsed > 0 else None,
+        "latency_ms": {
+            "p50": float(np.percentile(latencies_ms, 50)),
+            "p95": float(np.percentile(latencies_ms, 95)),
+            "p99": float(np.percentile(latencies_ms, 99)),
+            "mean": float(latencies_ms.mean()),
+            "max": float(latencies_ms.max()),
+        },
+    }
+
+
+def compare_reports(previous: Dict[str, Any], current: Dict[str, Any]):
+    """Print per-endpoint changes between two reports"""
+    print("\n" + "=" * 50)
+    print("Comparison with previous report")
+    print("=" * 50)
+    for path, now in current["endpoints"].items():
+        before = previous.get("endpoints", {}).get(path)
+        if not before:
+            print(f"  {path}: new endpoint")
+            continue
+
+        def delta(a: float, b: float) -> str:
+            return f"{(b - a) / a * 100:+.1f}%" if a else "n/a"
+
+        print(f"  {path}")
+        print(f"    p50 {before['latency_ms']['p50']:.1f} -> {now['latency_ms']['p50']:.1f} ms "
+              f"({delta(before['latency_ms']['p50'], now['latency_ms']['p50'])})")
+        print(f"    p99 {before['latency_ms']['p99']:.1f} -> {now['latency_ms']['p99']:.1f} ms "
+              f"({delta(before['latency_ms']['p99'], now['latency_ms']['p99'])})")
+        print(f"    rps {before['throughput_rps']:.1f} -> {now['throughput_rps']:.1f} "
+              f"({delta(before['throughput_rps'], now['throughput_rps'])})")
+        print(f"    errors {before['error_rate']:.2%} -> {now['error_rate']:.2%}")
+
+
+async def run(args) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+
+    if args.target:
+        if not args.user_ids:
+            raise SystemExit("--user-ids is required with --target")
+        user_ids = args.user_ids
+        client = httpx.AsyncClient(base_url=args.target, timeout=args.timeout)
+        mode = args.target
+    else:
+        local = build_local_app(args)
+        user_ids = local["user_ids"]
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=local["app"]),
+            base_url="http://loadtest",
+            timeout=args.timeout
+        )
+        mode = "in-process"
+
+    scenarios = build_scenarios(user_ids, rng)
+    selected = args.endpoints or list(scenarios.keys())
+    results = {}
+
+    async with client:
+        for path in selected:
+            make_body = scenarios[path]
+            # Warm up model, caches and connections before measuring
+            for _ in range(args.warmup):
+                await client.post(path, json=make_body())
+
+            result = await run_endpoint(client, path, make_body, args.requests, args.concurrency)
+            results[path] = result
+            print(f"  {path:45s} p50={result['latency_ms']['p50']:8.1f}ms "
+                  f"p99={result['latency_ms']['p99']:8.1f}ms "
+                  f"rps={result['throughput_rps']:7.1f} errors={result['error_rate']:.2%}")
+
+    return {
+        "benchmark": "load_test",
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "environment": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "mode": mode,
+        },
+        "config": {
+            "concurrency": args.concurrency,
+            "requests_per_endpoint": args.requests,
+            "seed": args.seed,
+            "users": args.users,
+            "posts": args.posts,
+            "model": args.model,
+            "moderation": args.moderation,
+        },
+        "endpoints": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the AI service endpoints")
+    parser.add_argument("--target", default=None, help="Base URL of a running service (default: in-process)")
+    parser.add_argument("--user-ids", nargs="+", default=None, help="Existing user IDs to use with --target")
+    parser.add_argument("--mongo-uri", default=None, help="Local mongod URI with a throwaway database name; it is dropped and reseeded (default: mongomock)")
+    parser.add_argument("--model", default="sentence-transformers/paraphrase-MiniLM-L3-v2")
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--moderation", choices=["simple", "ml"], default="simple")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--endpoints", nargs="+", default=None, help="Subset of endpoint paths to drive")
+    parser.add_argument("--output", default="bench_load.json")
+    parser.add_argument("--compare", default=None, help="Previous report to compare against")
+    args = parser.parse_args()
+
+    print("=" * 50)
+    print("Load Test")
+    print("=" * 50)
+
+    report = asyncio.run(run(args))
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✓ Report written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare_reports(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the service-layer hot paths
+
+Each benchmark times one function in isolation (calibrated inner loop, several
+rounds, median per call) in the spirit of pytest-benchmark:
+  - EmbeddingsService.generate_embedding vs generate_embeddings_batch (per text)
+  - ModerationService.check_spam and check_toxicity
+  - merge_recommendations and normalize_scores
+  - exclusion filter construction used by search_similar_posts
+
+Results are compared against a stored baseline and the run fails (exit code 1) when
+any benchmark's median is slower than the baseline by more than --threshold, or
+(exit code 2) when there is no baseline. Baselines are machine-specific and not
+committed: save them on the machine that runs the comparison.
+
+Usage:
+    python benchmarks/micro_benchmarks.py --save-baseline
+    python benchmarks/micro_benchmarks.py                      # compare, fail on regression
+    python benchmarks/micro_benchmarks.py --skip-models --only merge normalize filter
+    python benchmarks/micro_benchmarks.py --model sentence-transformers/all-MiniLM-L6-v2 --skip-toxicity
+"""
+import sys
+sys.path.append('.')
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import time
+from typing import Callable, Dict, Any, List, Optional
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baselines", "micro_benchmarks.json")
+
+SAMPLE_POSTS = [
+    "Just got back from an amazing trip to the mountains, the views were unreal",
+    "Anyone have a good recipe for banana bread? Mine always comes out dry",
+    "CLICK HERE for FREE MONEY!!! Limited offer, act now http://a.io http://b.io http://c.io",
+    "Finished my first marathon today. Legs are dead but so worth it",
+    "Hot take: tabs are better than spaces and I will not be taking questions",
+    "Our startup just shipped v2 of the app, huge thanks to the whole team",
+    "soooooo tired of this weather, when is summer coming back",
+    "Reading list for the weekend: three sci-fi novels and a history of maps",
+]
+
+
+def measure(fn: Callable[[], Any], rounds: int, min_round_time: float) -> Dict[str, float]:
+    """
+    Time a callable: calibrate iterations per round, then take per-call stats over rounds
+
+    Args:
+        fn: Zero-argument callable to time
+        rounds: Number of timed rounds
+        min_round_time: Target duration of one round in seconds
+
+    Returns:
+        Dictionary with per-call median/min/mean/stdev in microseconds and the iteration count
+    """
+    fn()  # Warm-up (lazy imports, caches, first-call allocations)
+
+    iterations = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        elapsed = time.perf_counter() - t0
+        if elapsed >= min_round_time or iterations >= 1_000_000:
+            break
+        iterations *= 2 if elapsed == 0 else max(2, int(min_round_time / elapsed) + 1)
+
+    per_call = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        per_call.append((time.perf_counter() - t0) / iterations * 1e6)
+
+    return {
+        "median_us": statistics.median(per_call),
+        "min_us": min(per_call),
+        "mean_us": statistics.fmean(per_call),
+        "stdev_us": statistics.stdev(per_call) if len(per_call) > 1 else 0.0,
+        "iterations": iterations,
+        "rounds": rounds,
+    }
+
+
+def helper_benchmarks() -> Dict[str, Callable[[], Any]]:
+    """Pure-Python helpers used when merging and ranking results"""
+    from src.utils.helpers import merge_recommendations, normalize_scores
+
+    rng = random.Random(0)
+    benchmarks = {}
+    for size in (20, 200, 2000):
+        first = [(f"p{rng.randint(0, size * 2)}", rng.random()) for _ in range(size)]
+        second = [(f"p{rng.randint(0, size * 2)}", rng.random()) for _ in range(size)]
+        scores = [rng.random() for _ in range(size)]
+        benchmarks[f"merge_recommendations[{size}]"] = lambda a=first, b=second: merge_recommendations(a, b, 0.7, 0.3)
+        benchmarks[f"normalize_scores[{size}]"] = lambda s=scores: normalize_scores(s)
+    return benchmarks
+
+
+def filter_benchmarks() -> Dict[str, Callable[[], Any]]:
+    """Exclusion filter construction done on every search_similar_posts call"""
+    from qdrant_client import QdrantClient
+    from src.services.vector_db_service import VectorDBService
+
+    vector_db = VectorDBService(client=QdrantClient(":memory:"))
+    benchmarks = {}
+    for size in (10, 100, 1000):
+        exclude_ids = [f"{i:024x}" for i in range(size)]
+        benchmarks[f"search_posts_filter[{size}]"] = lambda ids=exclude_ids: vector_db.build_exclude_filter(
+            vector_db.POSTS_COLLECTION, ids
+        )
+    return benchmarks
+
+
+def spam_benchmarks() -> Dict[str, Callable[[], Any]]:
+    """Rule-based spam check (no model needed)"""
+    from src.services.moderation_service import ModerationService
+
+    # check_spam only uses class attributes, so skip loading Detoxify
+    moderation = ModerationService.__new__(ModerationService)
+    texts = SAMPLE_POSTS
+    return {
+        "check_spam[short]": lambda: moderation.check_spam(texts[1]),
+        "check_spam[spammy]": lambda: moderation.check_spam(texts[2]),
+        "check_spam[long]": lambda: moderation.check_spam(" ".join(texts) * 4),
+    }
+
+
+def embedding_benchmarks(batch_sizes: List[int], model_name: Optional[str]) -> Dict[str, Callable[[], Any]]:
+    """Model inference: single vs batched embeddings"""
+    from src.services.embeddings_service import EmbeddingsService
+
+    embeddings = EmbeddingsService(model_name=model_name)
+    benchmarks = {
+        "generate_embedding[1]": lambda: embeddings.generate_embedding(SAMPLE_POSTS[0]),
+    }
+    for batch_size in batch_sizes:
+        texts = [SAMPLE_POSTS[i % len(SAMPLE_POSTS)] for i in range(batch_size)]
+        benchmarks[f"generate_embeddings_batch[{batch_size}]"] = lambda t=texts: embeddings.generate_embeddings_batch(t)
+    return benchmarks
+
+
+def toxicity_benchmarks() -> Dict[str, Callable[[], Any]]:
+    """Model inference: Detoxify toxicity prediction"""
+    from src.services.moderation_service import ModerationService
+
+    moderation = ModerationService()
+    return {
+        "check_toxicity[short]": lambda: moderation.check_toxicity(SAMPLE_POSTS[3]),
+        "check_toxicity[long]": lambda: moderation.check_toxicity(" ".join(SAMPLE_POSTS)),
+    }
+
+
+def compare(baseline: Dict[str, Any], results: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    Print a comparison table and return the names of regressed benchmarks
+
+    Args:
+        baseline: Previously saved report
+        results: Current results keyed by benchmark name
+        threshold: Allowed slowdown as a fraction (0.2 = 20%)
+    """
+    regressions = []
+    print("\n" + "=" * 50)
+    print(f"Comparison with baseline ({baseline.get('created_at', 'unknown')})")
+    print("=" * 50)
+    for name, current in results.items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous:
+            print(f"  {name:40s} {current['median_us']:12.2f}us   (new)")
+            continue
+        change = (current["median_us"] - previous["median_us"]) / previous["median_us"]
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"  {name:40s} {previous['median_us']:12.2f}us -> {current['median_us']:12.2f}us {change:+7.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for service hot paths")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed median slowdown (0.2 = 20%%)")
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--min-round-time", type=float, default=0.2, help="Seconds per timed round")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--skip-models", action="store_true", help="Skip benchmarks that load ML models")
+    parser.add_argument("--skip-toxicity", action="store_true", help="Skip the Detoxify benchmarks only")
+    parser.add_argument("--model", default=None, help="Embedding model (default: settings.EMBEDDING_MODEL)")
+    parser.add_argument("--only", nargs="+", default=None, help="Run benchmarks whose name contains any of these")
+    parser.add_argument("--output", default=None, help="Also write this run's report here")
+    args = parser.parse_args()
+
+    print("=" * 50)
+    print("Micro-benchmarks")
+    print("=" * 50)
+
+    benchmarks: Dict[str, Callable[[], Any]] = {}
+    benchmarks.update(helper_benchmarks())
+    benchmarks.update(filter_benchmarks())
+    benchmarks.update(spam_benchmarks())
+    if not args.skip_models:
+        benchmarks.update(embedding_benchmarks(args.batch_sizes, args.model))
+        if not args.skip_toxicity:
+            benchmarks.update(toxicity_benchmarks())
+
+    if args.only:
+        benchmarks = {name: fn for name, fn in benchmarks.items() if any(key in name for key in args.only)}
+
+    results = {}
+    for name, fn in benchmarks.items():
+        result = measure(fn, args.rounds, args.min_round_time)
+        batch = name.split("[")[-1].rstrip("]")
+        if name.startswith("generate_embeddings_batch") and batch.isdigit():
+            result["per_item_us"] = result["median_us"] / int(batch)
+        results[name] = result
+        extra = f"  ({result['per_item_us']:.1f}us/text)" if "per_item_us" in result else ""
+        print(f"  {name:40s} median={result['median_us']:12.2f}us  min={result['min_us']:12.2f}us{extra}")
+
+    report = {
+        "benchmark": "micro",
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "environment": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+        },
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✓ Baseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        # A comparison run without a baseline checks nothing, so it must not pass
+        print(f"\n✗ No baseline at {args.baseline}; run with --save-baseline first")
+        sys.exit(2)
+
+    with open(args.baseline) as f:
+        regressions = compare(json.load(f), results, args.threshold)
+
+    if regressions:
+        print(f"\n✗ {len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+    print(f"\n✓ No regressions beyond {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+Recall/latency benchmark for vector search settings
+
+Builds a fixed corpus (synthetic clustered vectors, or loaded from an .npz file with
+'posts', 'users' and 'queries' arrays), computes exact top-k with NumPy as ground
+truth, then runs VectorDBService.search_similar_posts / search_similar_users against
+a local Qdrant across a grid of hnsw_ef, quantization and exclusion-filter sizes.
+With several --transport values every cell is measured over REST and gRPC.
+
+Usage:
+    docker run -p 6333:6333 -p 6334:6334 qdrant/qdrant
+    python benchmarks/vector_search_benchmark.py --output bench_vector.json
+    python benchmarks/vector_search_benchmark.py --posts 200000 --hnsw-ef 32 64 128 \\
+        --quantization none scalar binary --filter-sizes 0 50 500
+    python benchmarks/vector_search_benchmark.py --backend local --hnsw-ef 64 --quantization none
+    python benchmarks/vector_search_benchmark.py --transport rest grpc --hnsw-ef 64 --quantization none
+
+The report is JSON (one entry per grid cell with recall@k, p50/p95/p99 latency in ms
+and QPS) so runs from different releases can be diffed directly.
+"""
+import sys
+sys.path.append('.')
+
+import argparse
+import json
+import platform
+import time
+from typing import List, Dict, Any
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.models import OptimizersConfigDiff, HnswConfigDiff
+
+from src.core.config import settings
+from src.services.vector_db_service import VectorDBService
+from src.services.local_vector_store import LocalVectorStore
+
+
+class BenchmarkVectorDB(VectorDBService):
+    """VectorDBService bound to throwaway benchmark collections"""
+
+    USERS_COLLECTION = "bench_users"
+    POSTS_COLLECTION = "bench_posts"
+
+    COLLECTION_VECTORS = {
+        USERS_COLLECTION: VectorDBService.COLLECTION_VECTORS[VectorDBService.USERS_COLLECTION],
+        POSTS_COLLECTION: VectorDBService.COLLECTION_VECTORS[VectorDBService.POSTS_COLLECTION],
+    }
+
+    ID_FIELDS = {
+        USERS_COLLECTION: "user_id",
+        POSTS_COLLECTION: "post_id",
+    }
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length (cosine similarity becomes a dot product)"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32)
+
+
+def generate_corpus(n_posts: int, n_users: int, n_queries: int, dimension: int, seed: int) -> Dict[str, np.ndarray]:
+    """
+    Generate clustered vectors that behave roughly like sentence embeddings
+
+    Args:
+        n_posts: Number of post vectors
+        n_users: Number of user vectors
+        n_queries: Number of query vectors
+        dimension: Vector dimension
+        seed: Random seed (same seed, same corpus)
+
+    Returns:
+        Dictionary with 'posts', 'users' and 'queries' arrays
+    """
+    rng = np.random.default_rng(seed)
+    n_clusters = max(8, int(np.sqrt(n_posts)))
+    centers = normalize(rng.normal(size=(n_clusters, dimension)))
+
+    def sample(n: int, spread: float) -> np.ndarray:
+        assignments = rng.integers(0, n_clusters, size=n)
+        return normalize(centers[assignments] + rng.normal(scale=spread, size=(n, dimension)))
+
+    return {
+        "posts": sample(n_posts, 0.08),
+        "users": sample(n_users, 0.08),
+        "queries": sample(n_queries, 0.1),
+    }
+
+
+def load_corpus(path: str) -> Dict[str, np.ndarray]:
+    """Load a corpus saved with np.savez(path, posts=..., users=..., queries=...)"""
+    data = np.load(path)
+    return {name: normalize(data[name]) for name in ("posts", "users", "queries")}
+
+
+def exact_top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """
+    Exact top-k by cosine similarity (ground truth)
+
+    Args:
+        corpus: Unit-length corpus vectors
+        queries: Unit-length query vectors
+        k: Number of neighbours
+
+    Returns:
+        Array of shape (n_queries, k) with corpus indices ordered by score
+    """
+    scores = queries @ corpus.T
+    k = min(k, corpus.shape[0])
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+    return np.take_along_axis(top, order, axis=1)
+
+
+def build_collection(
+    vector_db: BenchmarkVectorDB,
+    collection_name: str,
+    vector_name: str,
+    vectors: np.ndarray,
+    prefix: str,
+    batch_size: int = 512,
+    wait_for_index: bool = True,
+    timeout: float = 600.0
+):
+    """Recreate a benchmark collection with the current settings and wait for indexing"""
+    vector_db.client.delete_collection(collection_name)
+    vector_db.create_collection(collection_name)
+
+    # Small benchmark corpora would otherwise stay below Qdrant's indexing and
+    # full-scan thresholds and be searched exactly, which measures nothing
+    vector_db.client.update_collection(
+        collection_name=collection_name,
+        optimizers_config=OptimizersConfigDiff(indexing_threshold=1),
+        hnsw_config=HnswConfigDiff(full_scan_threshold=1)
+    )
+
+    for start in range(0, len(vectors), batch_size):
+        vector_db.upsert_batch(
+            collection_name,
+            [
+                {"id": f"{prefix}_{i}", "vectors": {vector_name: vectors[i].tolist()}}
+                for i in range(start, min(start + batch_size, len(vectors)))
+            ]
+        )
+
+    if not wait_for_index:
+        return
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        info = vector_db.client.get_collection(collection_name)
+        indexed = info.indexed_vectors_count or 0
+        if str(info.status).lower().endswith("green") and indexed >= len(vectors):
+            return
+        time.sleep(0.5)
+    print(f"  ! Timed out waiting for '{collection_name}' to finish indexing; results may reflect partial indexes")
+
+
+def percentile_ms(latencies: List[float], percentile: float) -> float:
+    return float(np.percentile(latencies, percentile) * 1000.0)
+
+
+def run_case(
+    search_fn,
+    prefix: str,
+    corpus: np.ndarray,
+    queries: np.ndarray,
+    k: int,
+    filter_size: int
+) -> Dict[str, Any]:
+    """
+    Run every query once and compare against exact search
+
+    The exclusion filter removes each query's own nearest neighbours, which is the
+    worst case for filtered HNSW search (and what 'exclude already liked' looks like).
+    """
+    truth_with_filter = exact_top_k(corpus, queries, k + filter_size)
+    latencies = []
+    recalls = []
+
+    started = time.perf_counter()
+    for query, truth in zip(queries, truth_with_filter):
+        excluded = [f"{prefix}_{i}" for i in truth[:filter_size]]
+        expected = {f"{prefix}_{i}" for i in truth[filter_size:filter_size + k]}
+
+        t0 = time.perf_counter()
+        results = search_fn(query.tolist(), k, excluded or None)
+        latencies.append(time.perf_counter() - t0)
+
+        found = {result.id for result in results}
+        recalls.append(len(found & expected) / max(len(expected), 1))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "recall_at_k": float(np.mean(recalls)),
+        "latency_ms": {
+            "p50": percentile_ms(latencies, 50),
+            "p95": percentile_ms(latencies, 95),
+            "p99": percentile_ms(latencies, 99),
+            "mean": float(np.mean(latencies) * 1000.0),
+        },
+        "qps": len(queries) / elapsed if elapsed > 0 else None,
+    }
+
+
+def make_client(args, transport: str = "rest"):
+    if args.backend == "local":
+        # In-process NumPy store; hnsw_ef and quantization have no effect on it
+        return LocalVectorStore(None)
+    if args.in_memory:
+        # Local mode is exact search only; useful to smoke-test the harness
+        return QdrantClient(":memory:")
+    # Same keep-alive pool as the service, so both transports reuse connections
+    options = VectorDBService.connection_options()
+    return QdrantClient(
+        url=args.qdrant_url,
+        api_key=args.api_key,
+        timeout=60,
+        prefer_grpc=transport == "grpc",
+        grpc_port=args.grpc_port,
+        limits=options["limits"],
+        grpc_options=options["grpc_options"]
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall/latency benchmark for Qdrant search settings")
+    parser.add_argument("--qdrant-url", default=f"http://{settings.QDRANT_HOST}:{settings.QDRANT_PORT}")
+    parser.add_argument("--api-key", default=None)
+    parser.add_argument("--in-memory", action="store_true", help="Use in-process Qdrant (exact search only)")
+    parser.add_argument("--backend", choices=["qdrant", "local"], default="qdrant",
+                        help="'local' benchmarks the in-process NumPy vector store instead of Qdrant")
+    parser.add_argument("--transport", nargs="+", choices=["rest", "grpc"], default=["rest"],
+                        help="Qdrant transports to compare (each grid cell is measured with every transport)")
+    parser.add_argument("--grpc-port", type=int, default=settings.QDRANT_GRPC_PORT)
+    parser.add_argument("--corpus", default=None, help=".npz file with posts, users and queries arrays")
+    parser.add_argument("--posts", type=int, default=20000)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dimension", type=int, default=settings.EMBEDDING_DIMENSION)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--hnsw-ef", type=int, nargs="+", default=[16, 32, 64, 128, 256])
+    parser.add_argument("--quantization", nargs="+", default=["none", "scalar", "binary"])
+    parser.add_argument("--filter-sizes", type=int, nargs="+", default=[0, 10, 100])
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--output", default="bench_vector_search.json")
+    args = parser.parse_args()
+
+    print("=" * 50)
+    print("Vector Search Benchmark")
+    print("=" * 50)
+
+    if args.corpus:
+        corpus = load_corpus(args.corpus)
+        print(f"Loaded corpus from {args.corpus}")
+    else:
+        corpus = generate_corpus(args.posts, args.users, args.queries, args.dimension, args.seed)
+        print(f"Generated corpus (seed {args.seed})")
+    dimension = corpus["posts"].shape[1]
+    print(f"  posts={len(corpus['posts'])} users={len(corpus['users'])} "
+          f"queries={len(corpus['queries'])} dimension={dimension}")
+
+    # gRPC only applies to a Qdrant server; local modes run in-process
+    transports = args.transport if args.backend == "qdrant" and not args.in_memory else args.transport[:1]
+    vector_dbs = {}
+    for transport in transports:
+        vector_dbs[transport] = BenchmarkVectorDB(client=make_client(args, transport))
+        vector_dbs[transport].dimension = dimension
+    vector_db = vector_dbs[transports[0]]
+
+    targets = [
+        ("posts", vector_db.POSTS_COLLECTION, VectorDBService.POST_CONTENT_VECTOR, "post",
+         lambda db, q, k, excluded: db.search_similar_posts(q, limit=k, exclude_post_ids=excluded)),
+        ("users", vector_db.USERS_COLLECTION, VectorDBService.USER_PROFILE_VECTOR, "user",
+         lambda db, q, k, excluded: db.search_similar_users(q, limit=k, exclude_user_ids=excluded)),
+    ]
+
+    results = []
+    original_quantization = settings.QUANTIZATION
+    try:
+        for quantization in args.quantization:
+            settings.QUANTIZATION = quantization
+            print(f"\nBuilding collections (quantization={quantization})...")
+            for name, collection, vector_name, prefix, _ in targets:
+                build_collection(
+                    vector_db, collection, vector_name, corpus[name], prefix,
+                    wait_for_index=not args.in_memory and args.backend == "qdrant"
+                )
+
+            for hnsw_ef in args.hnsw_ef:
+                for transport, db in vector_dbs.items():
+                    db.search_params = db.build_search_params(hnsw_ef=hnsw_ef, quantization=quantization)
+
+                    for name, _, _, prefix, search in targets:
+                        search_fn = lambda q, k, excluded, db=db, search=search: search(db, q, k, excluded)
+
+                        # Warm caches and connections before measuring
+                        for query in corpus["queries"][:args.warmup]:
+                            search_fn(query.tolist(), args.k, None)
+
+                        for filter_size in args.filter_sizes:
+                            case = run_case(
+                                search_fn, prefix, corpus[name], corpus["queries"], args.k, filter_size
+                            )
+                            case.update({
+                                "target": name,
+                                "transport": transport,
+                                "quantization": quantization,
+                                "hnsw_ef": hnsw_ef,
+                                "filter_size": filter_size,
+                                "k": args.k,
+                            })
+                            results.append(case)
+                            print(f"  {name:5s} {transport:4s} q={quantization:6s} ef={hnsw_ef:4d} "
+                                  f"filter={filter_size:4d} recall@{args.k}={case['recall_at_k']:.4f} "
+                                  f"p50={case['latency_ms']['p50']:.2f}ms p99={case['latency_ms']['p99']:.2f}ms "
+                                  f"qps={case['qps']:.0f}")
+    finally:
+        settings.QUANTIZATION = original_quantization
+        for _, collection, _, _, _ in targets:
+            vector_db.client.delete_collection(collection)
+
+    report = {
+        "benchmark": "vector_search",
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "environment": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "backend": args.backend,
+            "qdrant": "in-memory" if args.in_memory else args.qdrant_url,
+            "transports": transports,
+        },
+        "corpus": {
+            "source": args.corpus or "synthetic",
+            "seed": None if args.corpus else args.seed,
+            "posts": int(len(corpus["posts"])),
+            "users": int(len(corpus["users"])),
+            "queries": int(len(corpus["queries"])),
+            "dimension": int(dimension),
+        },
+        "settings": {
+            "hnsw_m": settings.HNSW_M,
+            "hnsw_ef_construct": settings.HNSW_EF_CONSTRUCT,
+            "vectors_on_disk": settings.VECTORS_ON_DISK,
+            "quantization_rescore": settings.QUANTIZATION_RESCORE,
+            "quantization_oversampling": settings.QUANTIZATION_OVERSAMPLING,
+        },
+        "results": results,
+    }
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print("\n" + "=" * 50)
+    print(f"✓ Report written to {args.output}")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
@@ -62,8 +62,8 @@ for idx, user in enumerate(users, 1):
         
         # Store in Qdrant
         point = PointStruct(
-            id=str(uuid.uuid4()),
-            vector=embedding,
+            id=str(uuid.uuid5(uuid.NAMESPACE_OID, user_id)),
+            vector={"profile": embedding},
             payload={
                 "user_id": user_id,
                 "firstName": user.get('firstName', ''),
@@ -103,8 +103,8 @@ for idx, post in enumerate(posts, 1):
         
         # Store in Qdrant
         point = PointStruct(
-            id=str(uuid.uuid4()),
-            vector=embedding,
+            id=str(uuid.uuid5(uuid.NAMESPACE_OID, post_id)),
+            vector={"content": embedding},
             payload={
                 "post_id": post_id,
                 "userId": str(post.get('userId', '')),
@@ -0,0 +1,63 @@
+"""
+Script to migrate 'users' / 'posts' collections created before named vectors
+
+Those collections hold one unnamed vector per point and the API refuses to start
+on them. This builds 'users_v{COLLECTION_VERSION}' / 'posts_v{COLLECTION_VERSION}'
+from MongoDB with the configured model, then replaces the old collections with
+aliases to the new ones.
+
+Run this once, with the API stopped, before starting this release:
+    python scripts/migrate_collections.py
+"""
+import sys
+import time
+sys.path.append('.')
+
+from src.core.config import settings
+from src.core.dependencies import get_vector_db_service, get_reindex_service
+
+
+def main():
+    """Rebuild legacy collections as the configured version and promote it"""
+    print("=" * 50)
+    print("Migrating Qdrant collections to named vectors")
+    print("=" * 50)
+
+    vector_db = get_vector_db_service()
+    legacy = [
+        name for name in (vector_db.USERS_COLLECTION, vector_db.POSTS_COLLECTION)
+        if vector_db.get_alias_target(name) is None
+        and vector_db.collection_exists(name)
+        and vector_db.is_legacy_collection(name)
+    ]
+    if not legacy:
+        print("\nNo collections from before named vectors, nothing to migrate")
+        return
+    print(f"\nLegacy collections: {legacy}")
+
+    reindex = get_reindex_service()
+    try:
+        job = reindex.start(settings.COLLECTION_VERSION, settings.EMBEDDING_MODEL, settings.EMBEDDING_DIMENSION)
+        while job["status"] == "building":
+            time.sleep(5)
+            job = reindex.status()["job"]
+            print(f"  → {job['posts_indexed']} posts, {job['users_indexed']} users, "
+                  f"{job['interest_vectors_built']} interest vectors")
+
+        if job["status"] != "ready":
+            raise RuntimeError(f"Building version {job['version']} failed: {job['error']}")
+
+        # Reads of the old names fail between the delete and the alias creation
+        swapped = reindex.promote(drop_unversioned=True)
+        print(f"\n✓ Collections migrated: {swapped}")
+    except Exception as e:
+        print(f"\n✗ Error: {e}")
+        sys.exit(1)
+
+    print("\n" + "=" * 50)
+    print("Migration complete! Start the API now.")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
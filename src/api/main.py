@@ -1,9 +1,19 @@
-from fastapi import FastAPI
+import asyncio
+import anyio.to_thread
+from fastapi import FastAPI, Response
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from src.api.routes import recommendations, search, moderation, embeddings, admin
 from src.models.schemas import HealthCheckResponse
 from src.core.config import settings
-from src.core.dependencies import get_vector_db_service
+from src.core.dependencies import (
+    get_vector_db_service, get_health_service, get_embeddings_service, get_moderation_service,
+    get_indexing_service, get_reindex_service, close_services
+)
+from src.services.vector_db_service import LegacyCollectionError
+from src.core.metrics import MetricsMiddleware, update_threadpool_metrics
+from src.core.tracing import TracingMiddleware, setup_tracing, shutdown_tracing
 
 # Create FastAPI app
 app = FastAPI(
@@ -21,6 +31,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency per route (wraps the CORS layer so it is timed too)
+app.add_middleware(MetricsMiddleware)
+
+# Server span per request (no-op until setup_tracing() enables a tracer)
+app.add_middleware(TracingMiddleware)
+
 # Include routers
 app.include_router(recommendations.router, prefix="/api")
 app.include_router(search.router, prefix="/api")
@@ -29,6 +45,22 @@ app.include_router(embeddings.router, prefix="/api")
 app.include_router(admin.router, prefix="/api")  # Admin endpoints
 
 
+def refresh_live_config():
+    """Follow promotions and collection config changes made through other workers (blocking)"""
+    get_reindex_service().sync_live_version()
+    get_vector_db_service().refresh_search_params()
+
+
+async def sync_live_config():
+    """Run refresh_live_config in a worker thread every LIVE_VERSION_REFRESH_SECONDS"""
+    while True:
+        await asyncio.sleep(settings.LIVE_VERSION_REFRESH_SECONDS)
+        try:
+            await anyio.to_thread.run_sync(refresh_live_config)
+        except Exception as e:
+            print(f"Error syncing live collection config: {e}")
+
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize services on startup"""
@@ -39,14 +71,46 @@ async def startup_event():
     print(f"Qdrant: {settings.QDRANT_HOST}:{settings.QDRANT_PORT}")
     print("=" * 50)
     
+    try:
+        setup_tracing()
+    except Exception as e:
+        print(f"✗ Error initializing tracing: {e}")
+    
     # Initialize vector database collections
     try:
         vector_db = get_vector_db_service()
         vector_db.create_collections()
+        vector_db.refresh_search_params()
         print("✓ Vector database collections initialized")
+    except LegacyCollectionError:
+        # Every search and write would fail: refuse to start until the collections are migrated
+        raise
     except Exception as e:
         print(f"✗ Error initializing vector database: {e}")
     
+    # Probes are served from state refreshed in the background
+    try:
+        health = get_health_service()
+        if settings.WARM_MODELS_ON_STARTUP:
+            health.warm_models({
+                "embeddings": get_embeddings_service,
+                "moderation": get_moderation_service,
+            })
+        health.start()
+        print("✓ Health checks started")
+    except Exception as e:
+        print(f"✗ Error starting health checks: {e}")
+    
+    # Write-behind embedding updates (drains anything left from the previous run)
+    try:
+        get_indexing_service().start()
+        print("✓ Write-behind worker started")
+    except Exception as e:
+        print(f"✗ Error starting write-behind worker: {e}")
+    
+    if settings.LIVE_VERSION_REFRESH_SECONDS > 0:
+        app.state.live_config_task = asyncio.get_running_loop().create_task(sync_live_config())
+    
     print("=" * 50)
     print("Postal AI Service is ready!")
     print("=" * 50)
@@ -56,6 +120,11 @@ async def startup_event():
 async def shutdown_event():
     """Cleanup on shutdown"""
     print("Shutting down Postal AI Service...")
+    if getattr(app.state, "live_config_task", None) is not None:
+        app.state.live_config_task.cancel()
+    # Only services that were created: getting them here would connect just to stop them
+    await close_services()
+    shutdown_tracing()
 
 
 @app.get("/", response_model=HealthCheckResponse)
@@ -73,23 +142,40 @@ async def root():
     }
 
 
+@app.get("/livez")
+async def liveness():
+    """Liveness probe: the process is serving requests (no dependency checks)"""
+    return get_health_service().liveness()
+
+
+@app.get("/readyz")
+async def readiness():
+    """Readiness probe: models loaded and connections healthy, from in-memory state"""
+    ready, details = get_health_service().readiness()
+    return JSONResponse(status_code=200 if ready else 503, content=details)
+
+
 @app.get("/health", response_model=HealthCheckResponse)
 async def health_check():
-    """Health check endpoint"""
+    """Health check endpoint (collection counts are approximate and refreshed in the background)"""
     try:
-        # Check vector database
-        vector_db = get_vector_db_service()
-        users_info = vector_db.get_collection_info("users")
-        posts_info = vector_db.get_collection_info("posts")
+        health = get_health_service()
+        ready, details = health.readiness()
+        vector_db = health.checks["vector_db"]
+        users_count = health.collections.get("users", {}).get("points_count", "?")
+        posts_count = health.collections.get("posts", {}).get("points_count", "?")
         
         return {
-            "status": "healthy",
+            "status": "healthy" if ready else "degraded",
             "version": "1.0.0",
             "services": {
                 "api": "running",
-                "embeddings": "ready",
-                "vector_db": f"connected ({users_info['points_count']} users, {posts_info['points_count']} posts)",
-                "mongodb": "connected"
+                "embeddings": "ready" if health.models.get("embeddings", {}).get("loaded", True) else "loading",
+                "vector_db": (
+                    f"connected (~{users_count} users, ~{posts_count} posts)"
+                    if vector_db["ok"] else f"error: {vector_db['error']}"
+                ),
+                "mongodb": "connected" if health.checks["mongodb"]["ok"] else f"error: {health.checks['mongodb']['error']}"
             }
         }
     except Exception as e:
@@ -105,6 +191,13 @@ async def health_check():
         }
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics endpoint"""
+    update_threadpool_metrics()
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -1,6 +1,10 @@
-from fastapi import APIRouter, HTTPException, Header
+from fastapi import APIRouter, HTTPException, Header, Query
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, Field
 from typing import Optional
 import os
+import time
+import anyio.to_thread
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -8,6 +12,95 @@ router = APIRouter(prefix="/admin", tags=["admin"])
 ADMIN_SECRET = os.getenv("ADMIN_SECRET", "change-this-in-production")
 
 
+class ReindexRequest(BaseModel):
+    version: int = Field(..., ge=1, description="Version number of the new collections")
+    model: str = Field(..., description="Embedding model for the new version")
+    dimension: int = Field(..., ge=1, description="Embedding dimension of the model")
+
+
+class ShadowReadRequest(BaseModel):
+    sample_rate: float = Field(..., ge=0.0, le=1.0, description="Fraction of live reads to replay (0 disables)")
+
+
+def check_admin(authorization: Optional[str]):
+    """Raise 401 unless the request carries the admin bearer token"""
+    if not authorization or authorization != f"Bearer {ADMIN_SECRET}":
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+
+def run_initialize_embeddings() -> dict:
+    """
+    Embed every user and post and build interest vectors (blocking)
+    
+    Encodes go to the bulk inference lane, so live queries keep their latency
+    while this runs.
+    """
+    from src.core.dependencies import (
+        get_embeddings_service,
+        get_vector_db_service,
+        get_mongo_service,
+        get_recommendation_service
+    )
+    from src.utils.helpers import build_user_metadata, build_post_metadata
+    from src.utils.inference_scheduler import BULK
+    
+    embeddings_service = get_embeddings_service()
+    vector_db = get_vector_db_service()
+    mongo = get_mongo_service()
+    recommendation_service = get_recommendation_service()
+    
+    # Create collections (ignore if already exist)
+    try:
+        vector_db.create_collections()
+    except Exception as e:
+        print(f"Collections might already exist: {e}")
+        # Continue anyway - collections exist is fine
+    
+    # Process users
+    users = mongo.get_all_users()
+    user_count = 0
+    
+    for user in users:
+        try:
+            user_id = str(user['_id'])
+            embedding = embeddings_service.generate_user_embedding(user, priority=BULK)
+            vector_db.upsert_user_embedding(user_id, embedding, build_user_metadata(user))
+            user_count += 1
+        except Exception as e:
+            print(f"Error processing user {user.get('_id')}: {e}")
+    
+    # Process posts
+    posts = mongo.get_all_posts()
+    post_count = 0
+    
+    for post in posts:
+        try:
+            post_id = str(post['_id'])
+            embedding = embeddings_service.generate_post_embedding(post, priority=BULK)
+            vector_db.upsert_post_embedding(post_id, embedding, build_post_metadata(post))
+            post_count += 1
+        except Exception as e:
+            print(f"Error processing post {post.get('_id')}: {e}")
+    
+    # Build interest vectors now that post embeddings exist
+    interest_count = 0
+    
+    for user in users:
+        try:
+            if recommendation_service.rebuild_user_interest(str(user['_id'])):
+                interest_count += 1
+        except Exception as e:
+            print(f"Error building interest vector for user {user.get('_id')}: {e}")
+    
+    return {
+        "success": True,
+        "users_processed": user_count,
+        "posts_processed": post_count,
+        "interest_vectors_built": interest_count,
+        "message": "Embeddings initialized successfully"
+    }
+
+
 @router.post("/initialize-embeddings")
 async def initialize_embeddings(
     authorization: Optional[str] = Header(None)
@@ -17,71 +110,11 @@ async def initialize_embeddings(
     Requires admin authorization
     """
     # Check authorization
-    if not authorization or authorization != f"Bearer {ADMIN_SECRET}":
-        raise HTTPException(status_code=401, detail="Unauthorized")
+    check_admin(authorization)
     
     try:
-        from src.core.dependencies import (
-            get_embeddings_service,
-            get_vector_db_service,
-            get_mongo_service
-        )
-        
-        embeddings_service = get_embeddings_service()
-        vector_db = get_vector_db_service()
-        mongo = get_mongo_service()
-        
-        # Create collections (ignore if already exist)
-        try:
-            vector_db.create_collections()
-        except Exception as e:
-            print(f"Collections might already exist: {e}")
-            # Continue anyway - collections exist is fine
-        
-        # Process users
-        users = mongo.get_all_users()
-        user_count = 0
-        
-        for user in users:
-            try:
-                user_id = str(user['_id'])
-                embedding = embeddings_service.generate_user_embedding(user)
-                metadata = {
-                    'firstName': user.get('firstName', ''),
-                    'lastName': user.get('lastName', ''),
-                    'bio': user.get('bio', ''),
-                }
-                vector_db.upsert_user_embedding(user_id, embedding, metadata)
-                user_count += 1
-            except Exception as e:
-                print(f"Error processing user {user.get('_id')}: {e}")
-        
-        # Process posts
-        posts = mongo.get_all_posts()
-        post_count = 0
-        
-        for post in posts:
-            try:
-                post_id = str(post['_id'])
-                embedding = embeddings_service.generate_post_embedding(post)
-                metadata = {
-                    'userId': str(post.get('userId', '')),
-                    'type': post.get('type', 0),
-                    'reactions': post.get('reactions', 0),
-                    'comments': post.get('comments', 0),
-                }
-                vector_db.upsert_post_embedding(post_id, embedding, metadata)
-                post_count += 1
-            except Exception as e:
-                print(f"Error processing post {post.get('_id')}: {e}")
-        
-        return {
-            "success": True,
-            "users_processed": user_count,
-            "posts_processed": post_count,
-            "message": "Embeddings initialized successfully"
-        }
-        
+        # Runs in a worker thread so the event loop keeps serving live traffic
+        return await anyio.to_thread.run_sync(run_initialize_embeddings)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error initializing embeddings: {str(e)}")
 
@@ -94,11 +127,10 @@ async def admin_status(
     Get system status
     Requires admin authorization
     """
-    if not authorization or authorization != f"Bearer {ADMIN_SECRET}":
-        raise HTTPException(status_code=401, detail="Unauthorized")
+    check_admin(authorization)
     
     try:
-        from src.core.dependencies import get_vector_db_service
+        from src.core.dependencies import get_vector_db_service, get_indexing_service
         
         vector_db = get_vector_db_service()
         users_info = vector_db.get_collection_info("users")
@@ -107,9 +139,197 @@ async def admin_status(
         return {
             "users_in_vector_db": users_info.get('points_count', 0),
             "posts_in_vector_db": posts_info.get('points_count', 0),
+            "write_behind": get_indexing_service().stats(),
             "status": "healthy"
         }
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting status: {str(e)}")
 
+
+@router.post("/write-behind/requeue")
+async def requeue_write_behind(
+    entity_type: Optional[str] = Query(None, description="'user' or 'post' (both when omitted)"),
+    authorization: Optional[str] = Header(None)
+):
+    """
+    Retry write-behind entries that exhausted WRITE_BEHIND_MAX_ATTEMPTS
+    (e.g. after fixing the outage or the bad documents that made them fail)
+    Requires admin authorization
+    """
+    check_admin(authorization)
+    
+    from src.core.dependencies import get_indexing_service
+    
+    try:
+        indexing = get_indexing_service()
+        requeued = await anyio.to_thread.run_sync(indexing.requeue_failed, entity_type)
+        return {"success": True, "requeued": requeued, "write_behind": indexing.stats()}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error requeueing write-behind entries: {str(e)}")
+
+
+def speedscope_response(profile: dict, kind: str) -> JSONResponse:
+    """Return a speedscope document as a downloadable file"""
+    filename = f"{kind}-profile-{time.strftime('%Y%m%d-%H%M%S')}.speedscope.json"
+    return JSONResponse(
+        content=profile,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.post("/profile/cpu")
+async def profile_cpu(
+    seconds: float = Query(10.0, gt=0, le=120, description="Capture duration"),
+    interval_ms: float = Query(5.0, ge=1, le=100, description="Sampling interval"),
+    include_idle: bool = Query(False, description="Include threads blocked in select/lock waits"),
+    authorization: Optional[str] = Header(None)
+):
+    """
+    Sample this worker's thread stacks for N seconds and return a speedscope flamegraph
+    Open the file at https://www.speedscope.app
+    Requires admin authorization
+    """
+    check_admin(authorization)
+    
+    from src.utils.profiling import profile_cpu as capture_cpu, ProfileInProgressError
+    
+    try:
+        # Sample from a worker thread so the event loop keeps serving (and gets profiled)
+        profile = await anyio.to_thread.run_sync(capture_cpu, seconds, interval_ms / 1000, include_idle)
+        return speedscope_response(profile, "cpu")
+    except ProfileInProgressError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error profiling CPU: {str(e)}")
+
+
+@router.post("/profile/memory")
+async def profile_memory(
+    seconds: float = Query(10.0, gt=0, le=300, description="Capture duration"),
+    authorization: Optional[str] = Header(None)
+):
+    """
+    Trace allocations for N seconds and return the growth as a speedscope flamegraph
+    Tracing slows allocations down while it runs
+    Requires admin authorization
+    """
+    check_admin(authorization)
+    
+    from src.utils.profiling import profile_memory as capture_memory, ProfileInProgressError
+    
+    try:
+        profile = await anyio.to_thread.run_sync(capture_memory, seconds)
+        return speedscope_response(profile, "memory")
+    except ProfileInProgressError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error profiling memory: {str(e)}")
+
+
+@router.post("/reindex")
+async def start_reindex(
+    request: ReindexRequest,
+    authorization: Optional[str] = Header(None)
+):
+    """
+    Build a new collection version with another embedding model in the background
+    Live reads keep using the current version until the new one is promoted
+    Requires admin authorization
+    """
+    check_admin(authorization)
+    
+    from src.core.dependencies import get_reindex_service
+    
+    try:
+        job = get_reindex_service().start(request.version, request.model, request.dimension)
+        return {"success": True, "job": job}
+    except (RuntimeError, ValueError) as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error starting reindex: {str(e)}")
+
+
+@router.get("/reindex")
+async def reindex_status(
+    authorization: Optional[str] = Header(None)
+):
+    """
+    Get progress of the background build and shadow-read comparison
+    Requires admin authorization
+    """
+    check_admin(authorization)
+    
+    from src.core.dependencies import get_reindex_service
+    
+    return get_reindex_service().status()
+
+
+@router.post("/reindex/shadow")
+async def set_shadow_reads(
+    request: ShadowReadRequest,
+    authorization: Optional[str] = Header(None)
+):
+    """
+    Replay a sample of live reads against the built version and compare results
+    Requires admin authorization
+    """
+    check_admin(authorization)
+    
+    from src.core.dependencies import get_reindex_service
+    
+    reindex_service = get_reindex_service()
+    reindex_service.set_shadow(request.sample_rate)
+    return reindex_service.status()
+
+
+@router.post("/reindex/promote")
+async def promote_reindex(
+    drop_unversioned: bool = False,
+    authorization: Optional[str] = Header(None)
+):
+    """
+    Atomically swap the 'users' and 'posts' aliases to the built version
+    drop_unversioned replaces unversioned collections of those names (reads fail briefly)
+    Requires admin authorization
+    """
+    check_admin(authorization)
+    
+    from src.core.dependencies import get_reindex_service
+    
+    try:
+        swapped = get_reindex_service().promote(drop_unversioned=drop_unversioned)
+        return {"success": True, "aliases": swapped}
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error promoting version: {str(e)}")
+
+
+@router.post("/collections/apply-config")
+async def apply_collection_config(
+    authorization: Optional[str] = Header(None)
+):
+    """
+    Apply HNSW, on-disk and quantization settings to the existing collections
+    Qdrant re-optimizes in the background; searches keep working meanwhile
+    Requires admin authorization
+    """
+    check_admin(authorization)
+    
+    try:
+        from src.core.dependencies import get_vector_db_service
+        
+        vector_db = get_vector_db_service()
+        updated = [
+            vector_db.apply_collection_config(collection_name)
+            for collection_name in [vector_db.USERS_COLLECTION, vector_db.POSTS_COLLECTION]
+        ]
+        
+        return {"success": True, "collections": updated}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error applying collection config: {str(e)}")
@@ -1,9 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Header, Query
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, Field
+from typing import Literal, List, Optional
+from functools import partial
+import anyio.to_thread
+import numpy as np
 from src.services.embeddings_service import EmbeddingsService
 from src.services.vector_db_service import VectorDBService
 from src.services.mongo_service import MongoService
-from src.core.dependencies import get_embeddings_service, get_vector_db_service, get_mongo_service
+from src.services.recommendation_service import RecommendationService
+from src.services.reindex_service import ReindexService
+from src.services.indexing_service import IndexingService
+from src.core.dependencies import (
+    get_embeddings_service,
+    get_vector_db_service,
+    get_mongo_service,
+    get_recommendation_service,
+    get_reindex_service,
+    get_indexing_service
+)
+from src.utils.helpers import build_user_metadata, build_post_metadata
+from src.utils.vector_codec import negotiate_format, vectors_response, BINARY
+from src.core.config import settings
 
 router = APIRouter(prefix="/embeddings", tags=["embeddings"])
 
@@ -16,17 +34,54 @@ class PostEmbeddingRequest(BaseModel):
     post_id: str
 
 
+class InteractionRequest(BaseModel):
+    user_id: str
+    post_id: str
+    interaction_type: Literal["like", "comment"] = "like"
+
+
+class UserBatchEmbeddingRequest(BaseModel):
+    user_ids: List[str] = Field(..., min_length=1, description="User IDs")
+
+
+class PostBatchEmbeddingRequest(BaseModel):
+    post_ids: List[str] = Field(..., min_length=1, description="Post IDs")
+
+
+class EncodeRequest(BaseModel):
+    texts: List[str] = Field(..., min_length=1, description="Texts to embed")
+    normalize: bool = Field(False, description="Return unit-length vectors")
+    format: Optional[Literal["json", "binary", "msgpack"]] = Field(None, description="Overrides the Accept header")
+    dtype: Literal["float32", "float16"] = Field("float32", description="Element type of binary/msgpack output")
+    priority: Literal["interactive", "bulk"] = Field("interactive", description="Inference lane; offline jobs should use 'bulk'")
+
+
+class StoredVectorsRequest(BaseModel):
+    collection: Literal["users", "posts"]
+    ids: List[str] = Field(..., min_length=1, max_length=1000, description="MongoDB IDs")
+    vector_name: Optional[str] = Field(None, description="Named vector (defaults to 'profile' / 'content')")
+    format: Optional[Literal["json", "binary", "msgpack"]] = Field(None, description="Overrides the Accept header")
+    dtype: Literal["float32", "float16"] = "float32"
+
+
 @router.post("/user")
 async def generate_user_embedding(
     request: UserEmbeddingRequest,
+    background: bool = Query(False, description="Queue the update and return 202 immediately"),
     embeddings_service: EmbeddingsService = Depends(get_embeddings_service),
     vector_db: VectorDBService = Depends(get_vector_db_service),
-    mongo: MongoService = Depends(get_mongo_service)
+    mongo: MongoService = Depends(get_mongo_service),
+    reindex_service: ReindexService = Depends(get_reindex_service),
+    indexing_service: IndexingService = Depends(get_indexing_service)
 ):
     """
     Generate and store embedding for a single user
     Called when a new user registers
+    With ?background=true the update is queued and flushed in batches (202)
     """
+    if background:
+        return queued_response(indexing_service, "user", [request.user_id])
+    
     try:
         # Get user from MongoDB
         user = mongo.get_user_by_id(request.user_id)
@@ -36,13 +91,9 @@ async def generate_user_embedding(
         # Generate embedding
         embedding = embeddings_service.generate_user_embedding(user)
         
-        # Store in vector database
-        metadata = {
-            'firstName': user.get('firstName', ''),
-            'lastName': user.get('lastName', ''),
-            'bio': user.get('bio', ''),
-        }
-        vector_db.upsert_user_embedding(request.user_id, embedding, metadata)
+        # Store in vector database (and in a version being built, if any)
+        vector_db.upsert_user_embedding(request.user_id, embedding, build_user_metadata(user))
+        reindex_service.mirror_user(user)
         
         return {
             "success": True,
@@ -56,14 +107,21 @@ async def generate_user_embedding(
 @router.post("/post")
 async def generate_post_embedding(
     request: PostEmbeddingRequest,
+    background: bool = Query(False, description="Queue the update and return 202 immediately"),
     embeddings_service: EmbeddingsService = Depends(get_embeddings_service),
     vector_db: VectorDBService = Depends(get_vector_db_service),
-    mongo: MongoService = Depends(get_mongo_service)
+    mongo: MongoService = Depends(get_mongo_service),
+    reindex_service: ReindexService = Depends(get_reindex_service),
+    indexing_service: IndexingService = Depends(get_indexing_service)
 ):
     """
     Generate and store embedding for a single post
     Called when a new post is created
+    With ?background=true the update is queued and flushed in batches (202)
     """
+    if background:
+        return queued_response(indexing_service, "post", [request.post_id])
+    
     try:
         # Get post from MongoDB
         post = mongo.get_post_by_id(request.post_id)
@@ -73,14 +131,9 @@ async def generate_post_embedding(
         # Generate embedding
         embedding = embeddings_service.generate_post_embedding(post)
         
-        # Store in vector database
-        metadata = {
-            'userId': str(post.get('userId', '')),
-            'type': post.get('type', 0),
-            'reactions': post.get('reactions', 0),
-            'comments': post.get('comments', 0),
-        }
-        vector_db.upsert_post_embedding(request.post_id, embedding, metadata)
+        # Store in vector database (and in a version being built, if any)
+        vector_db.upsert_post_embedding(request.post_id, embedding, build_post_metadata(post))
+        reindex_service.mirror_post(post)
         
         return {
             "success": True,
@@ -90,3 +143,214 @@ async def generate_post_embedding(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating embedding: {str(e)}")
 
+
+def queued_response(indexing_service: IndexingService, entity_type: str, entity_ids: List[str]) -> JSONResponse:
+    """Enqueue a write-behind update and answer 202 Accepted"""
+    try:
+        depth = indexing_service.enqueue(entity_type, entity_ids)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error queueing embedding update: {str(e)}")
+    
+    return JSONResponse(
+        status_code=202,
+        content={"success": True, "queued": len(entity_ids), "queue_depth": depth}
+    )
+
+
+def check_batch_size(ids: List[str]):
+    """Reject batches larger than one model call should take"""
+    if len(ids) > settings.MAX_ENCODE_BATCH:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.MAX_ENCODE_BATCH} items per request (got {len(ids)})"
+        )
+
+
+@router.post("/users/batch")
+async def generate_user_embeddings_batch(
+    request: UserBatchEmbeddingRequest,
+    background: bool = Query(False, description="Queue the updates and return 202 immediately"),
+    indexing_service: IndexingService = Depends(get_indexing_service)
+):
+    """
+    Generate and store embeddings for many users
+    One MongoDB query, one batched encode and one Qdrant upsert for the whole list
+    """
+    check_batch_size(request.user_ids)
+    if background:
+        return queued_response(indexing_service, "user", request.user_ids)
+    
+    try:
+        # Mongo fetch, encode and upsert block: keep them off the event loop
+        indexed, not_found = await anyio.to_thread.run_sync(indexing_service.index_users, request.user_ids)
+        
+        return {
+            "success": True,
+            "indexed": indexed,
+            "not_found": not_found,
+            "dimension": indexing_service.embeddings_provider().dimension
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generating embeddings: {str(e)}")
+
+
+@router.post("/posts/batch")
+async def generate_post_embeddings_batch(
+    request: PostBatchEmbeddingRequest,
+    background: bool = Query(False, description="Queue the updates and return 202 immediately"),
+    indexing_service: IndexingService = Depends(get_indexing_service)
+):
+    """
+    Generate and store embeddings for many posts (bulk imports, admin edits)
+    One MongoDB query, one batched encode and one Qdrant upsert for the whole list
+    """
+    check_batch_size(request.post_ids)
+    if background:
+        return queued_response(indexing_service, "post", request.post_ids)
+    
+    try:
+        # Mongo fetch, encode and upsert block: keep them off the event loop
+        indexed, not_found = await anyio.to_thread.run_sync(indexing_service.index_posts, request.post_ids)
+        
+        return {
+            "success": True,
+            "indexed": indexed,
+            "not_found": not_found,
+            "dimension": indexing_service.embeddings_provider().dimension
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generating embeddings: {str(e)}")
+
+
+@router.post("/encode")
+async def encode_texts(
+    request: EncodeRequest,
+    accept: Optional[str] = Header(None),
+    embeddings_service: EmbeddingsService = Depends(get_embeddings_service)
+):
+    """
+    Embed raw texts in one batched model call (comments, hashtags, drafts, ...)
+    Nothing is fetched from MongoDB or stored; rows follow the order of 'texts'
+    """
+    check_batch_size(request.texts)
+    
+    try:
+        fmt = negotiate_format(accept, request.format)
+        embeddings = await anyio.to_thread.run_sync(partial(
+            embeddings_service.encode_batch,
+            request.texts,
+            normalize=request.normalize,
+            priority=request.priority
+        ))
+        
+        return vectors_response(
+            embeddings,
+            fmt,
+            {"model": embeddings_service.model_name, "normalized": request.normalize},
+            request.dtype
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error encoding texts: {str(e)}")
+
+
+@router.post("/interaction")
+async def record_interaction(
+    request: InteractionRequest,
+    recommendation_service: RecommendationService = Depends(get_recommendation_service),
+    reindex_service: ReindexService = Depends(get_reindex_service)
+):
+    """
+    Fold a like or comment into the user's interest vector
+    Called when a user likes or comments on a post
+    """
+    try:
+        # Qdrant reads/writes and the per-user lock block: keep them off the event loop
+        updated = await anyio.to_thread.run_sync(partial(
+            recommendation_service.record_interaction,
+            user_id=request.user_id,
+            post_id=request.post_id,
+            interaction_type=request.interaction_type
+        ))
+        reindex_service.mirror_interaction(request.user_id, request.post_id, request.interaction_type)
+        
+        return {
+            "success": True,
+            "updated": updated,
+            "message": f"Interaction recorded for user {request.user_id}"
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error recording interaction: {str(e)}")
+
+
+@router.post("/user/interest")
+async def rebuild_user_interest(
+    request: UserEmbeddingRequest,
+    recommendation_service: RecommendationService = Depends(get_recommendation_service)
+):
+    """
+    Rebuild a user's interest vector from their full like/comment history
+    """
+    try:
+        updated = await anyio.to_thread.run_sync(recommendation_service.rebuild_user_interest, request.user_id)
+        
+        return {
+            "success": True,
+            "updated": updated,
+            "message": f"Interest vector rebuilt for user {request.user_id}"
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error rebuilding interest vector: {str(e)}")
+
+
+@router.post("/vectors")
+async def get_stored_vectors(
+    request: StoredVectorsRequest,
+    accept: Optional[str] = Header(None),
+    vector_db: VectorDBService = Depends(get_vector_db_service)
+):
+    """
+    Fetch stored vectors by ID, as JSON or packed float32/float16
+    Send 'Accept: application/octet-stream' (raw row-major matrix, one row per
+    requested ID in request order, NaN rows for missing IDs, counted in X-Missing-Count) or
+    'Accept: application/msgpack' (same fields as JSON, vectors as one bin)
+    """
+    try:
+        fmt = negotiate_format(accept, request.format)
+        vector_name = request.vector_name or (
+            VectorDBService.USER_PROFILE_VECTOR if request.collection == "users"
+            else VectorDBService.POST_CONTENT_VECTOR
+        )
+        collection_name = (
+            vector_db.USERS_COLLECTION if request.collection == "users" else vector_db.POSTS_COLLECTION
+        )
+        
+        vectors_config = vector_db.get_vectors_config(collection_name)
+        if vector_name not in vectors_config:
+            raise HTTPException(status_code=400, detail=f"Unknown vector '{vector_name}' for {request.collection}")
+        
+        stored = vector_db.get_vectors(collection_name, request.ids, vector_name)
+        missing = [entity_id for entity_id in request.ids if entity_id not in stored]
+        
+        if fmt == BINARY:
+            # Rows are aligned with the request (NaN for missing IDs), so only the count goes in headers
+            matrix = np.full((len(request.ids), vectors_config[vector_name].size), np.nan, dtype=np.float32)
+            for row, entity_id in enumerate(request.ids):
+                if entity_id in stored:
+                    matrix[row] = stored[entity_id]
+            body = {"vector_name": vector_name, "missing_count": len(missing)}
+            return vectors_response(matrix, fmt, body, request.dtype)
+        
+        body = {"vector_name": vector_name, "missing": missing}
+        found = [entity_id for entity_id in request.ids if entity_id in stored]
+        return vectors_response(
+            [stored[entity_id] for entity_id in found],
+            fmt,
+            {**body, "ids": found},
+            request.dtype
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching vectors: {str(e)}")
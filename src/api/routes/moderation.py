@@ -1,4 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException
+from functools import partial
+import anyio.to_thread
 from src.models.schemas import ModerationRequest, ModerationResponse
 from src.services.moderation_service import ModerationService
 from src.core.dependencies import get_moderation_service
@@ -15,11 +17,13 @@ async def moderate_content(
     Check content for toxicity and spam
     """
     try:
-        results = moderation_service.moderate_content(
+        results = await anyio.to_thread.run_sync(partial(
+            moderation_service.moderate_content,
             text=request.text,
             check_toxicity=request.check_toxicity,
-            check_spam=request.check_spam
-        )
+            check_spam=request.check_spam,
+            priority=request.priority
+        ))
         
         return ModerationResponse(
             is_safe=results['is_safe'],
@@ -1,4 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException
+from functools import partial
+import anyio.to_thread
 from src.models.schemas import (
     UserRecommendationRequest,
     UserRecommendationResponse,
@@ -20,16 +22,22 @@ async def get_user_recommendations(
     Get user recommendations based on profile similarity
     """
     try:
-        user_ids, scores = recommendation_service.recommend_users(
+        user_ids, scores = await anyio.to_thread.run_sync(partial(
+            recommendation_service.recommend_users,
             user_id=request.user_id,
             limit=request.limit,
             exclude_following=request.exclude_following
-        )
+        ))
+        
+        cards = None
+        if request.hydrate:
+            cards = await anyio.to_thread.run_sync(recommendation_service.hydrate_users, user_ids, scores)
         
         return UserRecommendationResponse(
             user_ids=user_ids,
             scores=scores,
-            total=len(user_ids)
+            total=len(user_ids),
+            cards=cards
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating recommendations: {str(e)}")
@@ -44,16 +52,22 @@ async def get_post_recommendations(
     Get post recommendations for user's feed
     """
     try:
-        post_ids, scores = recommendation_service.recommend_posts(
+        post_ids, scores = await anyio.to_thread.run_sync(partial(
+            recommendation_service.recommend_posts,
             user_id=request.user_id,
             limit=request.limit
-        )
+        ))
+        
+        cards = None
+        if request.hydrate:
+            cards = await anyio.to_thread.run_sync(recommendation_service.hydrate_posts, post_ids, scores)
         
         return PostRecommendationResponse(
             post_ids=post_ids,
             scores=scores,
             total=len(post_ids),
-            page=request.page
+            page=request.page,
+            cards=cards
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating post recommendations: {str(e)}")
@@ -69,16 +83,22 @@ async def get_collaborative_post_recommendations(
     (Based on what similar users liked)
     """
     try:
-        post_ids, scores = recommendation_service.recommend_posts_collaborative(
+        post_ids, scores = await anyio.to_thread.run_sync(partial(
+            recommendation_service.recommend_posts_collaborative,
             user_id=request.user_id,
             limit=request.limit
-        )
+        ))
+        
+        cards = None
+        if request.hydrate:
+            cards = await anyio.to_thread.run_sync(recommendation_service.hydrate_posts, post_ids, scores)
         
         return PostRecommendationResponse(
             post_ids=post_ids,
             scores=scores,
             total=len(post_ids),
-            page=request.page
+            page=request.page,
+            cards=cards
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating collaborative recommendations: {str(e)}")
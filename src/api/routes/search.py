@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException
+import anyio.to_thread
 from src.models.schemas import SemanticSearchRequest, SemanticSearchResponse
 from src.services.recommendation_service import RecommendationService
 from src.core.dependencies import get_recommendation_service
@@ -15,15 +16,20 @@ async def semantic_search_posts(
     Search posts using semantic similarity
     """
     try:
-        post_ids, scores = recommendation_service.search_posts_semantic(
+        post_ids, scores = await recommendation_service.search_posts_semantic_async(
             query=request.query,
             limit=request.limit
         )
         
+        cards = None
+        if request.hydrate:
+            cards = await anyio.to_thread.run_sync(recommendation_service.hydrate_posts, post_ids, scores)
+        
         return SemanticSearchResponse(
             results=post_ids,
             scores=scores,
-            total=len(post_ids)
+            total=len(post_ids),
+            cards=cards
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error performing semantic search: {str(e)}")
@@ -38,15 +44,20 @@ async def semantic_search_users(
     Search users using semantic similarity
     """
     try:
-        user_ids, scores = recommendation_service.search_users_semantic(
+        user_ids, scores = await recommendation_service.search_users_semantic_async(
             query=request.query,
             limit=request.limit
         )
         
+        cards = None
+        if request.hydrate:
+            cards = await anyio.to_thread.run_sync(recommendation_service.hydrate_users, user_ids, scores)
+        
         return SemanticSearchResponse(
             results=user_ids,
             scores=scores,
-            total=len(user_ids)
+            total=len(user_ids),
+            cards=cards
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error performing semantic search: {str(e)}")
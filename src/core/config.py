@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Literal, Optional, Dict
 
 
 class Settings(BaseSettings):
@@ -12,6 +12,35 @@ class Settings(BaseSettings):
     QDRANT_HOST: str = "localhost"
     QDRANT_PORT: int = 6333
     QDRANT_API_KEY: Optional[str] = None  # For Qdrant Cloud
+    QDRANT_PREFER_GRPC: bool = False  # Use gRPC (protobuf vectors) instead of REST/JSON where supported
+    QDRANT_GRPC_PORT: int = 6334
+    QDRANT_TIMEOUT: int = 10  # Request timeout in seconds
+    QDRANT_HTTP2: bool = False  # HTTP/2 for REST (negotiated over HTTPS only, e.g. Qdrant Cloud)
+    QDRANT_MAX_CONNECTIONS: int = 64  # REST connection pool size
+    QDRANT_MAX_KEEPALIVE_CONNECTIONS: int = 32  # Idle REST connections kept open for reuse
+    QDRANT_KEEPALIVE_SECONDS: float = 30.0  # Idle REST connection lifetime; also the gRPC keep-alive ping interval
+    COLLECTION_VERSION: int = 1  # 'users'/'posts' are aliases to 'users_v{n}'/'posts_v{n}'
+    
+    # Vector store backend
+    VECTOR_BACKEND: str = "qdrant"  # "qdrant" (server) or "local" (in-process NumPy store, no server)
+    LOCAL_VECTOR_PATH: Optional[str] = "data/vectors"  # Local store directory (empty keeps it in memory)
+    LOCAL_VECTOR_IVF_THRESHOLD: int = 20000  # Points per vector above which the local store uses IVF (0 = always exact)
+    LOCAL_VECTOR_IVF_PROBES: int = 8  # IVF partitions scanned per query
+    
+    # Qdrant index and storage tuning
+    HNSW_M: int = 16  # Graph degree: higher improves recall, costs memory
+    HNSW_EF_CONSTRUCT: int = 100  # Build-time beam width
+    HNSW_EF_SEARCH: Optional[int] = None  # Search-time beam width (None uses Qdrant's default)
+    VECTORS_ON_DISK: bool = False  # Keep original vectors on disk (memory-mapped)
+    QUANTIZATION: str = "none"  # "none", "scalar" (int8) or "binary"
+    QUANTIZATION_ALWAYS_RAM: bool = True  # Keep quantized vectors in RAM even with on-disk originals
+    QUANTIZATION_RESCORE: bool = True  # Re-rank quantized candidates with original vectors
+    QUANTIZATION_OVERSAMPLING: float = 2.0  # Candidates fetched per result before rescoring
+    
+    # Background reindexing (model upgrades)
+    REINDEX_BATCH_SIZE: int = 64
+    SHADOW_READ_MAX_PENDING: int = 100  # Shadow reads beyond this backlog are dropped
+    LIVE_VERSION_REFRESH_SECONDS: float = 5.0  # How often workers re-read the live collection version and its quantization (0 disables)
     
     # Node.js API
     NODE_API_URL: str = "http://localhost:3000"
@@ -19,7 +48,54 @@ class Settings(BaseSettings):
     # AI Settings
     EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
     EMBEDDING_DIMENSION: int = 384
+    EMBEDDING_MAX_SEQ_LENGTH: int = 256  # Tokens per text fed to the model (caps the model's own limit; the rest is cut off)
+    EMBEDDING_FORWARD_BATCH: int = 32  # Texts per forward pass; inputs are sorted by token length so each pass pads only to its longest text
+    EMBEDDING_CHUNK_POOLING: Literal["mean", "max", "none"] = "mean"  # Posts longer than one window: "mean" or "max" over token windows, "none" truncates
+    EMBEDDING_MAX_CHUNKS: int = 4  # Token windows per post at most, bounding the cost of one post (text beyond is dropped)
     MAX_RESULTS: int = 10
+    MAX_ENCODE_BATCH: int = 256  # Texts per /api/embeddings/encode call
+    
+    # Inference scheduling (one worker per model; interactive lane before bulk lane)
+    INFERENCE_SCHEDULER_ENABLED: bool = True
+    INFERENCE_MAX_BATCH_SIZE: int = 32  # Concurrent interactive items coalesced into one model call
+    INFERENCE_BULK_BATCH_SIZE: int = 16  # Bulk items per model call (the most an interactive item waits behind)
+    INFERENCE_AUTOTUNE: bool = True  # Adapt batch sizes and coalescing wait to measured model latency (sizes above are starting points)
+    INFERENCE_INTERACTIVE_SLO_MS: float = 50.0  # Interactive latency target: the batch in flight + coalescing wait + own model call
+    INFERENCE_BULK_SLO_MS: float = 25.0  # Budget for one bulk batch while interactive traffic flows (the extra wait an interactive item can see)
+    INFERENCE_AUTOTUNE_MAX_BATCH: int = 256  # Upper bound on tuned batch sizes
+    INFERENCE_MAX_COALESCE_WAIT_MS: float = 5.0  # Upper bound on waiting for more interactive items before a call
+    
+    SINGLE_FLIGHT_ENABLED: bool = True  # Identical concurrent recommendation/search calls share one computation
+    
+    # Additional named vectors per collection, e.g. {"mpnet": 768} to A/B a second model
+    EXTRA_NAMED_VECTORS: Dict[str, int] = {}
+    
+    # Interest vectors (recency-weighted mean of liked/commented post embeddings)
+    INTEREST_HALF_LIFE_DAYS: float = 30.0
+    INTEREST_LIKE_WEIGHT: float = 1.0
+    INTEREST_COMMENT_WEIGHT: float = 2.0
+    INTEREST_HISTORY_LIMIT: int = 200
+    INTEREST_BLEND_WEIGHT: float = 0.7  # Share of the interest search when blended with the profile search
+    
+    # Tracing (OpenTelemetry; requires the packages in requirements-tracing.txt)
+    TRACING_EXPORTER: str = "none"  # "none", "otlp" or "file"
+    OTLP_ENDPOINT: str = "http://localhost:4318/v1/traces"  # OTLP/HTTP collector
+    TRACING_FILE: str = "traces.jsonl"  # Used by the "file" exporter
+    TRACING_SAMPLE_RATE: float = 1.0  # Fraction of new traces sampled (incoming sampled traces are kept)
+    TRACING_SERVICE_NAME: str = "postal-ai-service"
+    
+    # Write-behind embedding updates (?background=true on the embedding endpoints)
+    WRITE_BEHIND_DB_PATH: str = "data/write_behind.sqlite3"  # Local queue, survives restarts
+    WRITE_BEHIND_BATCH_SIZE: int = 64  # Entities per flush; a full batch flushes immediately
+    WRITE_BEHIND_FLUSH_INTERVAL: float = 1.0  # Seconds between flushes of partial batches
+    WRITE_BEHIND_MAX_ATTEMPTS: int = 5  # Failed flushes before an entry is parked
+    WRITE_BEHIND_RETRY_BACKOFF: float = 2.0  # Delay before the first retry of a failed entry, doubled per attempt
+    WRITE_BEHIND_MAX_BACKOFF: float = 300.0  # Upper bound of the retry delay
+    
+    # Health checks
+    HEALTH_REFRESH_SECONDS: float = 15.0  # Background refresh of collection stats and connection state
+    HEALTH_STALE_SECONDS: float = 60.0  # /readyz fails if the last successful check is older than this
+    WARM_MODELS_ON_STARTUP: bool = True  # Load models in the background at startup (/readyz waits for it)
     
     # Admin
     ADMIN_SECRET: str = "change-this-in-production"
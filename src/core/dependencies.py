@@ -1,9 +1,13 @@
 from functools import lru_cache
+import threading
 from src.core.config import Settings, settings
 from src.services.embeddings_service import EmbeddingsService
 from src.services.vector_db_service import VectorDBService
 from src.services.mongo_service import MongoService
 from src.services.recommendation_service import RecommendationService
+from src.services.reindex_service import ReindexService
+from src.services.health_service import HealthService
+from src.services.indexing_service import IndexingService
 from src.services.moderation_service import ModerationService  # Real ML-based moderation
 # from src.services.moderation_service_simple import ModerationService  # Simple moderation for testing
 
@@ -14,19 +18,27 @@ def get_settings() -> Settings:
     return settings
 
 
-# Service instances (singleton pattern)
+# Service instances (singleton pattern). They are created on first use from request
+# threads and the startup warm-up thread, so creation is guarded by one lock
+# (re-entrant: services that depend on others create them while holding it).
+_lock = threading.RLock()
 _embeddings_service = None
 _vector_db_service = None
 _mongo_service = None
 _recommendation_service = None
 _moderation_service = None
+_reindex_service = None
+_health_service = None
+_indexing_service = None
 
 
 def get_embeddings_service() -> EmbeddingsService:
     """Get embeddings service instance"""
     global _embeddings_service
     if _embeddings_service is None:
-        _embeddings_service = EmbeddingsService()
+        with _lock:
+            if _embeddings_service is None:
+                _embeddings_service = EmbeddingsService()
     return _embeddings_service
 
 
@@ -34,7 +46,9 @@ def get_vector_db_service() -> VectorDBService:
     """Get vector database service instance"""
     global _vector_db_service
     if _vector_db_service is None:
-        _vector_db_service = VectorDBService()
+        with _lock:
+            if _vector_db_service is None:
+                _vector_db_service = VectorDBService()
     return _vector_db_service
 
 
@@ -42,7 +56,9 @@ def get_mongo_service() -> MongoService:
     """Get MongoDB service instance"""
     global _mongo_service
     if _mongo_service is None:
-        _mongo_service = MongoService()
+        with _lock:
+            if _mongo_service is None:
+                _mongo_service = MongoService()
     return _mongo_service
 
 
@@ -50,10 +66,12 @@ def get_recommendation_service() -> RecommendationService:
     """Get recommendation service instance"""
     global _recommendation_service
     if _recommendation_service is None:
-        embeddings = get_embeddings_service()
-        vector_db = get_vector_db_service()
-        mongo = get_mongo_service()
-        _recommendation_service = RecommendationService(embeddings, vector_db, mongo)
+        with _lock:
+            if _recommendation_service is None:
+                embeddings = get_embeddings_service()
+                vector_db = get_vector_db_service()
+                mongo = get_mongo_service()
+                _recommendation_service = RecommendationService(embeddings, vector_db, mongo)
     return _recommendation_service
 
 
@@ -61,6 +79,69 @@ def get_moderation_service() -> ModerationService:
     """Get moderation service instance"""
     global _moderation_service
     if _moderation_service is None:
-        _moderation_service = ModerationService()
+        with _lock:
+            if _moderation_service is None:
+                _moderation_service = ModerationService()
     return _moderation_service
 
+
+
+def _replace_embeddings_service(service: EmbeddingsService):
+    """Swap in the embeddings model of a newly promoted collection version"""
+    global _embeddings_service
+    with _lock:
+        previous, _embeddings_service = _embeddings_service, service
+
+    # The old model's worker finishes its queued work in the background, then frees it
+    if previous is not None and previous is not service:
+        threading.Thread(target=previous.close, daemon=True, name="embeddings-close").start()
+
+
+def get_reindex_service() -> ReindexService:
+    """Get reindex service instance"""
+    global _reindex_service
+    if _reindex_service is None:
+        with _lock:
+            if _reindex_service is None:
+                _reindex_service = ReindexService(
+                    get_recommendation_service(),
+                    get_vector_db_service(),
+                    get_mongo_service(),
+                    on_promote=_replace_embeddings_service
+                )
+    return _reindex_service
+
+
+def get_health_service() -> HealthService:
+    """Get health service instance"""
+    global _health_service
+    if _health_service is None:
+        with _lock:
+            if _health_service is None:
+                _health_service = HealthService(get_vector_db_service(), get_mongo_service())
+    return _health_service
+
+
+def get_indexing_service() -> IndexingService:
+    """Get indexing service instance"""
+    global _indexing_service
+    if _indexing_service is None:
+        with _lock:
+            if _indexing_service is None:
+                _indexing_service = IndexingService(
+                    get_embeddings_service,
+                    get_vector_db_service(),
+                    get_mongo_service(),
+                    get_reindex_service
+                )
+    return _indexing_service
+
+
+async def close_services():
+    """Stop background work and close connections of the services that were created"""
+    if _health_service is not None:
+        _health_service.stop()
+    if _indexing_service is not None:
+        _indexing_service.stop()
+    if _vector_db_service is not None:
+        await _vector_db_service.close_async()
@@ -0,0 +1,292 @@
+"""
+Prometheus metrics for the API and the service layer
+
+Metrics live in the default registry and are exposed by the /metrics endpoint.
+Label children are resolved once (at decoration time for @timed), so recording a
+sample on the hot path is a perf_counter() pair and a histogram observe. When
+tracing is enabled, timed stages are also recorded as spans (see tracing.py).
+"""
+from typing import Callable, Optional
+from contextlib import contextmanager
+from functools import wraps
+import inspect
+import time
+import anyio.to_thread
+from prometheus_client import Counter, Gauge, Histogram
+from src.core.tracing import span, set_span_attributes, result_count, tracing_enabled
+
+# Request latency buckets (seconds): sub-millisecond probes up to slow model batches
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being served",
+)
+STAGE_LATENCY = Histogram(
+    "service_stage_duration_seconds",
+    "Latency of individual service-layer stages (Mongo, model inference, Qdrant, ...)",
+    ["service", "stage"],
+    buckets=LATENCY_BUCKETS,
+)
+STAGE_ERRORS = Counter(
+    "service_stage_errors_total",
+    "Service-layer stages that raised",
+    ["service", "stage"],
+)
+BATCH_SIZE = Histogram(
+    "service_batch_size",
+    "Number of items per batched operation",
+    ["operation"],
+    buckets=BATCH_BUCKETS,
+)
+CACHE_LOOKUPS = Counter(
+    "cache_lookups_total",
+    "Cache lookups by result (hit ratio = hit / (hit + miss))",
+    ["cache", "result"],
+)
+THREADPOOL_BUSY = Gauge(
+    "threadpool_busy_threads",
+    "Worker threads in use by sync route handlers",
+)
+THREADPOOL_SIZE = Gauge(
+    "threadpool_size",
+    "Worker thread limit for sync route handlers",
+)
+THREADPOOL_WAITING = Gauge(
+    "threadpool_waiting_tasks",
+    "Sync route handlers queued waiting for a worker thread",
+)
+BACKGROUND_QUEUE_DEPTH = Gauge(
+    "background_queue_depth",
+    "Tasks queued on background executors",
+    ["executor"],
+)
+
+WRITE_BEHIND_DEPTH = Gauge(
+    "write_behind_queue_depth",
+    "Entities waiting in the write-behind embedding queue",
+)
+WRITE_BEHIND_LAG = Gauge(
+    "write_behind_lag_seconds",
+    "Age of the oldest pending write-behind update",
+)
+WRITE_BEHIND_FLUSHED = Counter(
+    "write_behind_flushed_total",
+    "Write-behind queue entries indexed",
+    ["entity_type"],
+)
+WRITE_BEHIND_FAILED = Counter(
+    "write_behind_failed_total",
+    "Write-behind queue entries whose flush failed (retried up to WRITE_BEHIND_MAX_ATTEMPTS)",
+    ["entity_type"],
+)
+EMBEDDING_TOKENS = Counter(
+    "embedding_tokens_total",
+    "Tokens in embedding model forward passes, real or padding (padding waste = padding / total)",
+    ["kind"],
+)
+EMBEDDING_TRUNCATED = Counter(
+    "embedding_truncated_texts_total",
+    "Texts that reached EMBEDDING_MAX_SEQ_LENGTH tokens and were cut off",
+)
+EMBEDDING_CHUNKED = Counter(
+    "embedding_chunked_texts_total",
+    "Long posts split into token windows whose embeddings were pooled",
+)
+SINGLE_FLIGHT_EXECUTED = Counter(
+    "single_flight_executed_total",
+    "Calls that ran their computation (the first of a group of identical concurrent calls)",
+    ["operation"],
+)
+SINGLE_FLIGHT_COLLAPSED = Counter(
+    "single_flight_collapsed_total",
+    "Calls that waited for an identical in-flight call and shared its result",
+    ["operation"],
+)
+
+INFERENCE_QUEUE_DEPTH = Gauge(
+    "inference_queue_depth",
+    "Items waiting for a model, by priority lane",
+    ["model", "lane"],
+)
+INFERENCE_QUEUE_WAIT = Histogram(
+    "inference_queue_wait_seconds",
+    "Time from submission until a job's first batch starts, by priority lane",
+    ["model", "lane"],
+    buckets=LATENCY_BUCKETS,
+)
+INFERENCE_LATENCY = Histogram(
+    "inference_latency_seconds",
+    "Time from submission until all of a job's results are ready, by priority lane",
+    ["model", "lane"],
+    buckets=LATENCY_BUCKETS,
+)
+INFERENCE_BATCH_LIMIT = Gauge(
+    "inference_batch_limit",
+    "Current maximum items per model call, by priority lane (set by the autotuner)",
+    ["model", "lane"],
+)
+INFERENCE_COALESCE_WAIT = Gauge(
+    "inference_coalesce_wait_seconds",
+    "Current time an interactive batch waits for more items before running (set by the autotuner)",
+    ["model"],
+)
+INFERENCE_THROUGHPUT = Gauge(
+    "inference_tokens_per_second",
+    "Recent model throughput in (estimated) tokens per second of model time",
+    ["model"],
+)
+
+
+@contextmanager
+def stage_timer(service: str, stage: str):
+    """
+    Time a block of code as a service stage
+
+    Args:
+        service: Service name (e.g. 'recommendation')
+        stage: Stage name within the service (e.g. 'merge')
+    """
+    histogram = STAGE_LATENCY.labels(service, stage)
+    start = time.perf_counter()
+    try:
+        with span(f"{service}.{stage}"):
+            yield
+    except Exception:
+        STAGE_ERRORS.labels(service, stage).inc()
+        raise
+    finally:
+        histogram.observe(time.perf_counter() - start)
+
+
+def timed(service: str, stage: Optional[str] = None) -> Callable:
+    """
+    Decorator that records a method's latency as a service stage (sync or async)
+
+    Args:
+        service: Service name
+        stage: Stage name (defaults to the function name)
+    """
+    def decorator(fn: Callable) -> Callable:
+        name = stage or fn.__name__
+        span_name = f"{service}.{name}"
+        histogram = STAGE_LATENCY.labels(service, name)
+        errors = STAGE_ERRORS.labels(service, name)
+
+        if inspect.iscoroutinefunction(fn):
+            @wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    if not tracing_enabled():
+                        return await fn(*args, **kwargs)
+                    with span(span_name) as current:
+                        result = await fn(*args, **kwargs)
+                        count = result_count(result)
+                        if count is not None:
+                            current.set_attribute("result.count", count)
+                        return result
+                except Exception:
+                    errors.inc()
+                    raise
+                finally:
+                    histogram.observe(time.perf_counter() - start)
+
+            return async_wrapper
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                if not tracing_enabled():
+                    return fn(*args, **kwargs)
+                with span(span_name) as current:
+                    result = fn(*args, **kwargs)
+                    count = result_count(result)
+                    if count is not None:
+                        current.set_attribute("result.count", count)
+                    return result
+            except Exception:
+                errors.inc()
+                raise
+            finally:
+                histogram.observe(time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request latency per route template
+
+    Labels use the matched route's path ('/api/recommendations/users/{user_id}')
+    rather than the raw URL, so cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._route_paths = {}
+
+    def route_label(self, scope) -> str:
+        """Resolve the route template of the endpoint the router matched"""
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        path = self._route_paths.get(endpoint)
+        if path is None:
+            routes = getattr(scope.get("app"), "routes", [])
+            self._route_paths = {
+                getattr(route, "endpoint", None): route.path for route in routes if hasattr(route, "path")
+            }
+            path = self._route_paths.get(endpoint, "unmatched")
+        return path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        REQUESTS_IN_PROGRESS.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUESTS_IN_PROGRESS.dec()
+            REQUEST_LATENCY.labels(
+                scope["method"], self.route_label(scope), str(status["code"])
+            ).observe(time.perf_counter() - start)
+
+
+def update_threadpool_metrics():
+    """Sample the AnyIO worker thread limiter (call from the event loop, e.g. at scrape time)"""
+    stats = anyio.to_thread.current_default_thread_limiter().statistics()
+    THREADPOOL_BUSY.set(stats.borrowed_tokens)
+    THREADPOOL_SIZE.set(stats.total_tokens)
+    THREADPOOL_WAITING.set(stats.tasks_waiting)
+
+
+def observe_batch(operation: str, size: int):
+    """Record the number of items in a batched operation (also tags the current span)"""
+    BATCH_SIZE.labels(operation).observe(size)
+    set_span_attributes(**{"batch.size": size})
+
+
+def record_cache(cache: str, hit: bool):
+    """Record a cache lookup as a hit or a miss"""
+    CACHE_LOOKUPS.labels(cache, "hit" if hit else "miss").inc()
@@ -0,0 +1,186 @@
+"""
+OpenTelemetry tracing for the API and the service layer
+
+Tracing is optional: the opentelemetry packages are only imported when
+TRACING_EXPORTER is not "none", and every helper here is a cheap no-op while
+tracing is disabled. Requests get a server span (continuing the caller's W3C
+'traceparent' header, e.g. from the Node backend) and each instrumented
+service call becomes a child span.
+"""
+from typing import Any, Dict, Optional, Sequence
+from contextlib import contextmanager
+import json
+import threading
+from src.core.config import settings
+
+_tracer = None
+
+
+def tracing_enabled() -> bool:
+    """Whether a tracer has been configured"""
+    return _tracer is not None
+
+
+def setup_tracing() -> bool:
+    """
+    Configure the global tracer provider from settings
+
+    Returns:
+        True if tracing was enabled
+    """
+    global _tracer
+    exporter_name = settings.TRACING_EXPORTER.lower()
+    if exporter_name == "none" or _tracer is not None:
+        return _tracer is not None
+
+    try:
+        from opentelemetry import trace
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, SimpleSpanProcessor
+        from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+    except ImportError:
+        print("✗ Tracing requested but opentelemetry-sdk is not installed; tracing disabled")
+        return False
+
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": settings.TRACING_SERVICE_NAME}),
+        sampler=ParentBased(TraceIdRatioBased(settings.TRACING_SAMPLE_RATE)),
+    )
+
+    if exporter_name == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=settings.OTLP_ENDPOINT)))
+    elif exporter_name == "file":
+        provider.add_span_processor(SimpleSpanProcessor(_file_exporter(settings.TRACING_FILE)))
+    else:
+        raise ValueError(f"Unknown TRACING_EXPORTER '{settings.TRACING_EXPORTER}' (expected none, otlp or file)")
+
+    trace.set_tracer_provider(provider)
+    _tracer = trace.get_tracer("postal-ai-service")
+    print(f"✓ Tracing enabled ({exporter_name})")
+    return True
+
+
+def shutdown_tracing():
+    """Flush pending spans and stop the tracer"""
+    global _tracer
+    if _tracer is None:
+        return
+    from opentelemetry import trace
+    trace.get_tracer_provider().shutdown()
+    _tracer = None
+
+
+def _file_exporter(path: str):
+    """Span exporter writing one JSON object per span to a local file (for tests and debugging)"""
+    from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+
+    class FileSpanExporter(SpanExporter):
+        def __init__(self):
+            self._lock = threading.Lock()
+
+        def export(self, spans) -> "SpanExportResult":
+            with self._lock, open(path, "a") as f:
+                for span in spans:
+                    f.write(json.dumps({
+                        "name": span.name,
+                        "trace_id": format(span.context.trace_id, "032x"),
+                        "span_id": format(span.context.span_id, "016x"),
+                        "parent_id": format(span.parent.span_id, "016x") if span.parent else None,
+                        "start_ns": span.start_time,
+                        "duration_ms": (span.end_time - span.start_time) / 1e6,
+                        "status": span.status.status_code.name,
+                        "attributes": dict(span.attributes or {}),
+                    }) + "\n")
+            return SpanExportResult.SUCCESS
+
+        def shutdown(self):
+            pass
+
+    return FileSpanExporter()
+
+
+@contextmanager
+def span(name: str, attributes: Optional[Dict[str, Any]] = None):
+    """
+    Run a block inside a child span of the current one (no-op when tracing is off)
+
+    Args:
+        name: Span name, e.g. 'qdrant.search'
+        attributes: Initial span attributes
+    """
+    if _tracer is None:
+        yield None
+        return
+    with _tracer.start_as_current_span(name, attributes=attributes) as current:
+        yield current
+
+
+def set_span_attributes(**attributes):
+    """Tag the current span (batch size, result count, filter size, ...); no-op when tracing is off"""
+    if _tracer is None:
+        return
+    from opentelemetry import trace
+    current = trace.get_current_span()
+    if current.is_recording():
+        current.set_attributes(attributes)
+
+
+def result_count(result: Any) -> Optional[int]:
+    """Number of results in a service return value (lists or (ids, scores) tuples)"""
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, tuple) and result and isinstance(result[0], list):
+        return len(result[0])
+    return None
+
+
+class TracingMiddleware:
+    """ASGI middleware opening a server span per request, continuing incoming trace context"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if _tracer is None or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        from opentelemetry import propagate
+        from opentelemetry.trace import SpanKind, Status, StatusCode
+
+        headers = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope.get("headers", [])}
+        parent = propagate.extract(headers)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                current.set_attribute("http.status_code", status_code)
+                if status_code >= 500:
+                    current.set_status(Status(StatusCode.ERROR))
+            await send(message)
+
+        with _tracer.start_as_current_span(
+            f"{scope['method']} {scope['path']}",
+            context=parent,
+            kind=SpanKind.SERVER,
+            attributes={"http.method": scope["method"], "http.target": scope["path"]},
+        ) as current:
+            await self.app(scope, receive, send_wrapper)
+            route = _route_path(scope)
+            if route:
+                current.update_name(f"{scope['method']} {route}")
+                current.set_attribute("http.route", route)
+
+
+def _route_path(scope) -> Optional[str]:
+    """Route template of the endpoint the router matched, if any"""
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return None
+    routes: Sequence = getattr(scope.get("app"), "routes", [])
+    for route in routes:
+        if getattr(route, "endpoint", None) is endpoint:
+            return route.path
+    return None
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Literal, Optional, Dict, Any
 
 
 # ==================== User Models ====================
@@ -8,6 +8,7 @@ class UserRecommendationRequest(BaseModel):
     user_id: str = Field(..., description="ID of the user requesting recommendations")
     limit: int = Field(default=10, ge=1, le=50, description="Number of recommendations to return")
     exclude_following: bool = Field(default=True, description="Exclude users already being followed")
+    hydrate: bool = Field(default=False, description="Also return renderable cards for the results (one batched MongoDB fetch)")
 
 
 class UserRecommendationResponse(BaseModel):
@@ -15,6 +16,7 @@ class UserRecommendationResponse(BaseModel):
     user_ids: List[str] = Field(..., description="List of recommended user IDs")
     scores: List[float] = Field(..., description="Similarity scores for each recommendation")
     total: int = Field(..., description="Total number of recommendations")
+    cards: Optional[List[Dict[str, Any]]] = Field(default=None, description="Result cards in score order (only with hydrate=true)")
 
 
 # ==================== Post Models ====================
@@ -23,6 +25,7 @@ class PostRecommendationRequest(BaseModel):
     user_id: str = Field(..., description="ID of the user requesting recommendations")
     limit: int = Field(default=20, ge=1, le=100, description="Number of posts to return")
     page: int = Field(default=1, ge=1, description="Page number for pagination")
+    hydrate: bool = Field(default=False, description="Also return renderable cards for the results (one batched MongoDB fetch)")
 
 
 class PostRecommendationResponse(BaseModel):
@@ -31,6 +34,7 @@ class PostRecommendationResponse(BaseModel):
     scores: List[float] = Field(..., description="Relevance scores for each post")
     total: int = Field(..., description="Total number of recommendations")
     page: int = Field(..., description="Current page number")
+    cards: Optional[List[Dict[str, Any]]] = Field(default=None, description="Result cards in score order (only with hydrate=true)")
 
 
 # ==================== Search Models ====================
@@ -39,6 +43,7 @@ class SemanticSearchRequest(BaseModel):
     query: str = Field(..., min_length=1, description="Search query text")
     limit: int = Field(default=20, ge=1, le=100, description="Number of results to return")
     search_type: str = Field(default="posts", description="Type of search: 'posts' or 'users'")
+    hydrate: bool = Field(default=False, description="Also return renderable cards for the results (one batched MongoDB fetch)")
 
 
 class SemanticSearchResponse(BaseModel):
@@ -46,6 +51,7 @@ class SemanticSearchResponse(BaseModel):
     results: List[str] = Field(..., description="List of result IDs (post or user IDs)")
     scores: List[float] = Field(..., description="Relevance scores for each result")
     total: int = Field(..., description="Total number of results")
+    cards: Optional[List[Dict[str, Any]]] = Field(default=None, description="Result cards in score order (only with hydrate=true)")
 
 
 # ==================== Moderation Models ====================
@@ -54,6 +60,7 @@ class ModerationRequest(BaseModel):
     text: str = Field(..., min_length=1, description="Text content to moderate")
     check_toxicity: bool = Field(default=True, description="Check for toxic content")
     check_spam: bool = Field(default=True, description="Check for spam")
+    priority: Literal["interactive", "bulk"] = Field(default="interactive", description="Inference lane; batch re-moderation jobs should use 'bulk'")
 
 
 class ModerationResponse(BaseModel):
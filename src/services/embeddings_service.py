@@ -1,6 +1,10 @@
-from typing import List, Union
+from typing import List, Union, Optional, Tuple
 import numpy as np
+import anyio.to_thread
+import time
 from src.core.config import settings
+from src.core.metrics import timed, observe_batch, EMBEDDING_TOKENS, EMBEDDING_TRUNCATED, EMBEDDING_CHUNKED
+from src.utils.inference_scheduler import InferenceScheduler, INTERACTIVE, BULK, approx_tokens
 import os
 
 # Set environment variables BEFORE importing PyTorch or transformers
@@ -15,25 +19,145 @@ import torch
 torch.set_num_threads(1)
 
 from sentence_transformers import SentenceTransformer
+from sentence_transformers.models import Transformer
+from tqdm import trange
 
 
 class EmbeddingsService:
     """Service for generating text embeddings using sentence-transformers"""
     
-    def __init__(self):
-        """Initialize the embeddings model"""
-        print(f"Loading embedding model: {settings.EMBEDDING_MODEL}")
+    # Texts are cut to this many characters per token of max_seq_length before
+    # tokenization (a subword token rarely spans more), so a huge post is not
+    # tokenized in full only to be truncated
+    MAX_CHARS_PER_TOKEN = 10
+    
+    # Calls that read the scheduler just before close() still get to submit within this
+    CLOSE_GRACE_SECONDS = 1.0
+    
+    def __init__(self, model_name: Optional[str] = None, dimension: Optional[int] = None):
+        """
+        Initialize the embeddings model
+        
+        Args:
+            model_name: Model to load (defaults to EMBEDDING_MODEL)
+            dimension: Embedding dimension of the model (defaults to EMBEDDING_DIMENSION)
+        """
+        self.model_name = model_name or settings.EMBEDDING_MODEL
+        print(f"Loading embedding model: {self.model_name}")
         # Load model with device='cpu' explicitly
-        self.model = SentenceTransformer(settings.EMBEDDING_MODEL, device='cpu')
-        self.dimension = settings.EMBEDDING_DIMENSION
-        print(f"Embedding model loaded successfully. Dimension: {self.dimension}")
+        self.model = SentenceTransformer(self.model_name, device='cpu')
+        self.dimension = dimension or settings.EMBEDDING_DIMENSION
+        if settings.EMBEDDING_MAX_SEQ_LENGTH and (
+            self.model.max_seq_length is None or self.model.max_seq_length > settings.EMBEDDING_MAX_SEQ_LENGTH
+        ):
+            self.model.max_seq_length = settings.EMBEDDING_MAX_SEQ_LENGTH
+        print(f"Embedding model loaded successfully. Dimension: {self.dimension}, max tokens: {self.model.max_seq_length}")
+        
+        # Length-bucketed encoding needs direct access to the Hugging Face tokenizer
+        first_module = self.model._first_module()
+        self._transformer = first_module if isinstance(first_module, Transformer) else None
+        if self._transformer is not None:
+            # Padding pre-tokenized buckets is the point here; silence the "use __call__" hint
+            self.model.tokenizer.deprecation_warnings["Asking-to-pad-a-fast-tokenizer"] = True
+        
+        # All model calls go through one worker: interactive lane first, bulk in small batches
+        self.scheduler = (
+            InferenceScheduler(
+                "embeddings",
+                self._encode,
+                cost_fn=self.estimate_tokens,
+                pass_size=settings.EMBEDDING_FORWARD_BATCH
+            )
+            if settings.INFERENCE_SCHEDULER_ENABLED else None
+        )
+    
+    def close(self):
+        """
+        Stop the inference worker (blocking), after the work already queued on it
+        
+        The worker holds the model, so a replaced service is only freed once it stops.
+        Calls made through this service afterwards encode directly.
+        """
+        scheduler, self.scheduler = self.scheduler, None
+        if scheduler is None:
+            return
+        time.sleep(self.CLOSE_GRACE_SECONDS)
+        scheduler.stop()
+        print(f"Inference worker of embedding model {self.model_name} stopped")
+    
+    def estimate_tokens(self, text: str) -> int:
+        """Approximate tokens the model will process for a text (after truncation)"""
+        return min(approx_tokens(text), self.model.max_seq_length)
+    
+    def _tokenize(self, texts: List[str]) -> dict:
+        """Tokenize without padding, truncated to max_seq_length (as SentenceTransformer.tokenize does)"""
+        max_length = self.model.max_seq_length
+        max_chars = max_length * self.MAX_CHARS_PER_TOKEN
+        prepared = [text.strip()[:max_chars] for text in texts]
+        if self._transformer.do_lower_case:
+            prepared = [text.lower() for text in prepared]
+        return self.model.tokenizer(prepared, truncation=True, max_length=max_length)
+    
+    def _encode(self, texts: List[str], show_progress_bar: bool = False) -> np.ndarray:
+        """
+        Run the model on a batch of non-empty texts (the scheduler's worker calls this)
+        
+        Texts are tokenized once, sorted by token length and run in forward passes of
+        EMBEDDING_FORWARD_BATCH texts, so each pass is padded only to its own longest
+        text. Rows are returned in input order.
+        
+        Args:
+            texts: Texts to embed
+            show_progress_bar: Show a progress bar over the forward passes
+            
+        Returns:
+            Array of shape (len(texts), dimension)
+        """
+        if self._transformer is None:
+            embeddings = self.model.encode(texts, convert_to_numpy=True, show_progress_bar=show_progress_bar)
+            return embeddings.astype(np.float32, copy=False)
+        
+        encoded = self._tokenize(texts)
+        lengths = np.fromiter((len(ids) for ids in encoded["input_ids"]), dtype=np.int64, count=len(texts))
+        order = np.argsort(-lengths, kind="stable")
+        output = None
+        real_tokens = padded_tokens = 0
+        
+        step = settings.EMBEDDING_FORWARD_BATCH
+        for start in trange(0, len(texts), step, desc="Batches", disable=not show_progress_bar):
+            rows = order[start:start + step]
+            features = self.model.tokenizer.pad(
+                {key: [values[i] for i in rows] for key, values in encoded.items()},
+                return_tensors="pt"
+            )
+            with torch.inference_mode():
+                embeddings = self.model(dict(features))["sentence_embedding"].numpy()
+            if output is None:
+                output = np.empty((len(texts), embeddings.shape[1]), dtype=np.float32)
+            output[rows] = embeddings
+            real_tokens += int(lengths[rows].sum())
+            padded_tokens += len(rows) * int(lengths[rows[0]])
+        
+        EMBEDDING_TOKENS.labels("real").inc(real_tokens)
+        EMBEDDING_TOKENS.labels("padding").inc(padded_tokens - real_tokens)
+        EMBEDDING_TRUNCATED.inc(int((lengths >= self.model.max_seq_length).sum()))
+        return output
+    
+    def _infer(self, texts: List[str], priority: str) -> np.ndarray:
+        """Encode texts through the scheduler lane (or directly when scheduling is off)"""
+        scheduler = self.scheduler
+        if scheduler is None:
+            return self._encode(texts)
+        return np.vstack(scheduler.run(texts, priority))
     
-    def generate_embedding(self, text: str) -> List[float]:
+    @timed("embeddings", "encode")
+    def generate_embedding(self, text: str, priority: str = INTERACTIVE) -> List[float]:
         """
         Generate embedding for a single text
         
         Args:
             text: Input text to embed
+            priority: Scheduler lane (INTERACTIVE or BULK)
             
         Returns:
             List of floats representing the embedding vector
@@ -42,21 +166,36 @@ class EmbeddingsService:
             # Return zero vector for empty text
             return [0.0] * self.dimension
         
-        # Disable multiprocessing and use single batch
-        embedding = self.model.encode(
-            text, 
-            convert_to_numpy=True,
-            show_progress_bar=False,
-            batch_size=1
-        )
-        return embedding.tolist()
+        return self._infer([text], priority)[0].tolist()
+    
+    @timed("embeddings", "encode")
+    async def generate_embedding_async(self, text: str, priority: str = INTERACTIVE) -> List[float]:
+        """
+        Generate embedding for a single text without holding a worker thread while queued
+        
+        Args:
+            text: Input text to embed
+            priority: Scheduler lane (INTERACTIVE or BULK)
+            
+        Returns:
+            List of floats representing the embedding vector
+        """
+        if not text or not text.strip():
+            return [0.0] * self.dimension
+        scheduler = self.scheduler
+        if scheduler is None:
+            return await anyio.to_thread.run_sync(self.generate_embedding, text, priority)
+        
+        results = await scheduler.run_async([text], priority)
+        return results[0].tolist()
     
-    def generate_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
+    def generate_embeddings_batch(self, texts: List[str], priority: str = BULK) -> List[List[float]]:
         """
         Generate embeddings for multiple texts (more efficient)
         
         Args:
             texts: List of input texts to embed
+            priority: Scheduler lane (defaults to BULK; callers are offline jobs)
             
         Returns:
             List of embedding vectors
@@ -64,11 +203,153 @@ class EmbeddingsService:
         if not texts:
             return []
         
+        return self.encode_batch(texts, show_progress_bar=True, priority=priority).tolist()
+    
+    @timed("embeddings", "encode_batch")
+    def encode_batch(
+        self,
+        texts: List[str],
+        normalize: bool = False,
+        show_progress_bar: bool = False,
+        priority: str = INTERACTIVE
+    ) -> np.ndarray:
+        """
+        Encode texts into a float32 matrix without converting to Python lists
+        
+        Args:
+            texts: List of input texts to embed
+            normalize: Scale each embedding to unit length
+            show_progress_bar: Show a progress bar (for long offline jobs; only without the scheduler)
+            priority: Scheduler lane (INTERACTIVE or BULK)
+            
+        Returns:
+            Array of shape (len(texts), dimension)
+        """
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        observe_batch("encode", len(texts))
+        
         # Replace empty strings with placeholder
         processed_texts = [text if text.strip() else " " for text in texts]
         
-        embeddings = self.model.encode(processed_texts, convert_to_numpy=True, show_progress_bar=True)
-        return embeddings.tolist()
+        if self.scheduler is None:
+            embeddings = self._encode(processed_texts, show_progress_bar)
+        else:
+            embeddings = self._infer(processed_texts, priority)
+        
+        if normalize:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings = embeddings / np.maximum(norms, 1e-12)
+        return embeddings
+    
+    def chunk_texts(self, texts: List[str]) -> List[List[Tuple[str, int]]]:
+        """
+        Split texts into windows that fit the model, at most EMBEDDING_MAX_CHUNKS each
+        
+        Windows end on word boundaries. Texts that fit in one window come back whole.
+        
+        Args:
+            texts: Texts to split
+            
+        Returns:
+            Per text, a list of (window text, token count) pairs
+        """
+        # Room for [CLS]/[SEP], and one short of the cap so full windows do not count as truncated
+        window = self.model.max_seq_length - 3
+        max_chunks = max(1, settings.EMBEDDING_MAX_CHUNKS)
+        max_chars = window * max_chunks * self.MAX_CHARS_PER_TOKEN
+        
+        chunks: List[List[Tuple[str, int]]] = [[(text, 0)] for text in texts]
+        if self._transformer is None:
+            return chunks
+        
+        # A subword token covers at least one character, so short texts need no tokenizing here
+        long_rows = [i for i, text in enumerate(texts) if len(text.strip()) > window]
+        if not long_rows:
+            return chunks
+        
+        stripped = [texts[i].strip()[:max_chars] for i in long_rows]
+        encoded = self.model.tokenizer(stripped, add_special_tokens=False, return_offsets_mapping=True)
+        
+        for k, row in enumerate(long_rows):
+            offsets = encoded["offset_mapping"][k]
+            if len(offsets) <= window:
+                chunks[row] = [(texts[row], len(offsets))]
+                continue
+            
+            word_ids = encoded.word_ids(k)
+            windows = []
+            start = 0
+            while start < len(offsets) and len(windows) < max_chunks:
+                end = min(start + window, len(offsets))
+                # Back off to the start of the word that straddles the boundary
+                cut = end
+                while end < len(offsets) and cut > start + 1 and word_ids[cut] == word_ids[cut - 1]:
+                    cut -= 1
+                if cut > start + 1:
+                    end = cut
+                windows.append((stripped[k][offsets[start][0]:offsets[end - 1][1]], end - start))
+                start = end
+            chunks[row] = windows
+        
+        return chunks
+    
+    def encode_documents(self, texts: List[str], priority: str = INTERACTIVE) -> np.ndarray:
+        """
+        Encode texts that may be longer than the model's window
+        
+        Long texts are split by chunk_texts; all windows of all texts go to the
+        model in one batch and are pooled per text (EMBEDDING_CHUNK_POOLING: token-
+        weighted mean or element-wise max). Texts that fit one window get exactly
+        the embedding encode_batch would give them.
+        
+        Args:
+            texts: Input texts
+            priority: Scheduler lane (INTERACTIVE or BULK)
+            
+        Returns:
+            Array of shape (len(texts), dimension)
+        """
+        pooling = settings.EMBEDDING_CHUNK_POOLING
+        if pooling == "none" or not texts:
+            return self.encode_batch(texts, priority=priority)
+        
+        chunks = self.chunk_texts(texts)
+        vectors = self.encode_batch([chunk for windows in chunks for chunk, _ in windows], priority=priority)
+        if len(vectors) == len(texts):
+            return vectors
+        
+        pooled = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+        row = 0
+        chunked = 0
+        for i, windows in enumerate(chunks):
+            block = vectors[row:row + len(windows)]
+            row += len(windows)
+            if len(windows) == 1:
+                pooled[i] = block[0]
+                continue
+            chunked += 1
+            if pooling == "max":
+                pooled[i] = block.max(axis=0)
+            else:
+                weights = np.array([tokens for _, tokens in windows], dtype=np.float32)
+                pooled[i] = weights @ block / weights.sum()
+        
+        EMBEDDING_CHUNKED.inc(chunked)
+        return pooled
+    
+    def encode_posts(self, posts: List[dict], priority: str = BULK) -> np.ndarray:
+        """
+        Encode posts in one batch, pooling long posts over token windows
+        
+        Args:
+            posts: Post documents
+            priority: Scheduler lane (defaults to BULK; callers are indexing jobs)
+            
+        Returns:
+            Array of shape (len(posts), dimension)
+        """
+        return self.encode_documents([self.post_text(post) for post in posts], priority)
     
     def compute_similarity(self, embedding1: List[float], embedding2: List[float]) -> float:
         """
@@ -88,15 +369,16 @@ class EmbeddingsService:
         similarity = np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2))
         return float(similarity)
     
-    def generate_user_embedding(self, user_data: dict) -> List[float]:
+    @staticmethod
+    def user_text(user_data: dict) -> str:
         """
-        Generate embedding for a user based on their profile
+        Build the text that represents a user profile
         
         Args:
             user_data: Dictionary containing user information (firstName, lastName, bio, etc.)
             
         Returns:
-            Embedding vector for the user
+            Text to embed for the user
         """
         # Combine user information into a single text
         text_parts = []
@@ -114,22 +396,49 @@ class EmbeddingsService:
         if not user_text.strip():
             user_text = "user profile"  # Fallback for empty profiles
         
-        return self.generate_embedding(user_text)
+        return user_text
     
-    def generate_post_embedding(self, post_data: dict) -> List[float]:
+    @staticmethod
+    def post_text(post_data: dict) -> str:
         """
-        Generate embedding for a post
+        Build the text that represents a post
         
         Args:
             post_data: Dictionary containing post information (post text, etc.)
             
         Returns:
-            Embedding vector for the post
+            Text to embed for the post
         """
         post_text = post_data.get('post', '')
         
         if not post_text.strip():
             post_text = "post content"  # Fallback for empty posts
         
-        return self.generate_embedding(post_text)
+        return post_text
+    
+    def generate_user_embedding(self, user_data: dict, priority: str = INTERACTIVE) -> List[float]:
+        """
+        Generate embedding for a user based on their profile
+        
+        Args:
+            user_data: Dictionary containing user information (firstName, lastName, bio, etc.)
+            priority: Scheduler lane (INTERACTIVE or BULK)
+            
+        Returns:
+            Embedding vector for the user
+        """
+        return self.generate_embedding(self.user_text(user_data), priority)
+    
+    def generate_post_embedding(self, post_data: dict, priority: str = INTERACTIVE) -> List[float]:
+        """
+        Generate embedding for a post (long posts are pooled over token windows)
+        
+        Args:
+            post_data: Dictionary containing post information (post text, etc.)
+            priority: Scheduler lane (INTERACTIVE or BULK)
+            
+        Returns:
+            Embedding vector for the post
+        """
+        return self.encode_documents([self.post_text(post_data)], priority)[0].tolist()
 
@@ -0,0 +1,126 @@
+from typing import Dict, Any, Callable, Tuple, Optional
+import asyncio
+import threading
+import time
+import anyio.to_thread
+from src.core.config import settings
+from src.services.vector_db_service import VectorDBService
+from src.services.mongo_service import MongoService
+
+
+class HealthService:
+    """
+    Service for cheap liveness/readiness probes
+
+    Connection state and collection statistics are refreshed by a background task
+    (approximate counts, one Mongo ping) and served from memory, so probes never
+    touch Qdrant or MongoDB themselves.
+    """
+
+    def __init__(self, vector_db_service: VectorDBService, mongo_service: MongoService):
+        """Initialize health service with dependencies"""
+        self.vector_db = vector_db_service
+        self.mongo = mongo_service
+        self.started_at = time.time()
+
+        # Models /readyz waits for (only those being warmed at startup)
+        self.models: Dict[str, Dict[str, Any]] = {}
+        self.checks: Dict[str, Dict[str, Any]] = {
+            "vector_db": {"ok": False, "checked_at": None, "error": "not checked yet"},
+            "mongodb": {"ok": False, "checked_at": None, "error": "not checked yet"},
+        }
+        self.collections: Dict[str, Dict[str, Any]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def warm_models(self, loaders: Dict[str, Callable[[], Any]]):
+        """
+        Load models in a background thread; readiness waits until they are loaded
+
+        Args:
+            loaders: Model name -> function that loads (and caches) it
+        """
+        for name in loaders:
+            self.models[name] = {"loaded": False, "error": None}
+
+        def load():
+            for name, loader in loaders.items():
+                try:
+                    loader()
+                    self.models[name]["loaded"] = True
+                    print(f"✓ Model warmed: {name}")
+                except Exception as e:
+                    print(f"✗ Error warming model {name}: {e}")
+                    self.models[name]["error"] = str(e)
+
+        threading.Thread(target=load, daemon=True, name="model-warmup").start()
+
+    def refresh(self):
+        """Refresh connection state and approximate collection counts (blocking)"""
+        now = time.time()
+
+        try:
+            collections = {}
+            for collection_name in [self.vector_db.USERS_COLLECTION, self.vector_db.POSTS_COLLECTION]:
+                info = self.vector_db.get_collection_info(collection_name, exact=False)
+                if info["status"] == "error":
+                    raise RuntimeError(info["error"])
+                collections[collection_name] = {"points_count": info["points_count"], "exact": False}
+            self.collections = collections
+            self.checks["vector_db"] = {"ok": True, "checked_at": now, "error": None}
+        except Exception as e:
+            self.checks["vector_db"] = {"ok": False, "checked_at": now, "error": str(e)}
+
+        ok = self.mongo.ping()
+        self.checks["mongodb"] = {"ok": ok, "checked_at": now, "error": None if ok else "ping failed"}
+
+    async def run_refresh_loop(self, interval: Optional[float] = None):
+        """Refresh in a worker thread every `interval` seconds until cancelled"""
+        interval = interval or settings.HEALTH_REFRESH_SECONDS
+        while True:
+            try:
+                await anyio.to_thread.run_sync(self.refresh)
+            except Exception as e:
+                print(f"Error refreshing health checks: {e}")
+            await asyncio.sleep(interval)
+
+    def start(self):
+        """Start the background refresh task (call from the event loop)"""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run_refresh_loop())
+
+    def stop(self):
+        """Cancel the background refresh task"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def liveness(self) -> Dict[str, Any]:
+        """The process is up and serving requests"""
+        return {"status": "alive", "uptime_seconds": round(time.time() - self.started_at, 1)}
+
+    def readiness(self) -> Tuple[bool, Dict[str, Any]]:
+        """
+        Whether the service can handle traffic, from in-memory state only
+
+        Returns:
+            Tuple of (ready, details)
+        """
+        now = time.time()
+        failures = []
+
+        for name, model in self.models.items():
+            if not model["loaded"]:
+                failures.append(f"model {name} " + ("failed to load" if model["error"] else "loading"))
+
+        for name, check in self.checks.items():
+            if not check["ok"]:
+                failures.append(f"{name}: {check['error']}")
+            elif now - check["checked_at"] > settings.HEALTH_STALE_SECONDS:
+                failures.append(f"{name}: last check {now - check['checked_at']:.0f}s ago")
+
+        return not failures, {
+            "status": "ready" if not failures else "not ready",
+            "failures": failures,
+            "models": self.models,
+            "checks": self.checks,
+        }
@@ -0,0 +1,372 @@
+from typing import List, Dict, Any, Callable, Optional, Tuple
+import os
+import sqlite3
+import threading
+import time
+from bson import ObjectId
+from src.core.config import settings
+from src.core.metrics import WRITE_BEHIND_FLUSHED, WRITE_BEHIND_FAILED, WRITE_BEHIND_DEPTH, WRITE_BEHIND_LAG
+from src.services.embeddings_service import EmbeddingsService
+from src.services.vector_db_service import VectorDBService
+from src.services.mongo_service import MongoService
+from src.services.reindex_service import ReindexService
+from src.utils.helpers import build_user_metadata, build_post_metadata
+from src.utils.inference_scheduler import BULK
+
+ENTITY_TYPES = ("user", "post")
+
+
+class IndexingService:
+    """
+    Service for (re)indexing users and posts by ID, inline or write-behind
+
+    Inline calls fetch, encode and upsert a whole batch at once. Write-behind calls
+    only record the IDs in a local SQLite queue and return; a background worker
+    flushes them in batches. Repeated updates to the same entity coalesce into one
+    queue row, and the queue survives restarts.
+    """
+
+    def __init__(
+        self,
+        embeddings_provider: Callable[[], EmbeddingsService],
+        vector_db_service: VectorDBService,
+        mongo_service: MongoService,
+        reindex_provider: Optional[Callable[[], ReindexService]] = None,
+        db_path: Optional[str] = None
+    ):
+        """
+        Initialize indexing service with dependencies
+
+        Args:
+            embeddings_provider: Returns the current embeddings service (it changes on promotion)
+            vector_db_service: Vector database service
+            mongo_service: MongoDB service
+            reindex_provider: Returns the reindex service, which mirrors writes into a
+                collection version being built
+            db_path: SQLite file for the write-behind queue (defaults to WRITE_BEHIND_DB_PATH)
+
+        Providers are called lazily so the worker can start before models are loaded.
+        """
+        self.embeddings_provider = embeddings_provider
+        self.vector_db = vector_db_service
+        self.mongo = mongo_service
+        self.reindex_provider = reindex_provider
+
+        self.db_path = db_path or settings.WRITE_BEHIND_DB_PATH
+        if self.db_path != ":memory:" and os.path.dirname(self.db_path):
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pending (
+                entity_type TEXT NOT NULL,
+                entity_id TEXT NOT NULL,
+                enqueued_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                version INTEGER NOT NULL DEFAULT 0,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (entity_type, entity_id)
+            )
+            """
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(pending)")}
+        if "next_attempt_at" not in columns:
+            # Queue files written before retries were backed off
+            self._db.execute("ALTER TABLE pending ADD COLUMN next_attempt_at REAL NOT NULL DEFAULT 0")
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+
+        WRITE_BEHIND_DEPTH.set_function(self.depth)
+        WRITE_BEHIND_LAG.set_function(self.lag_seconds)
+
+    # ==================== Inline indexing ====================
+
+    def index_users(self, user_ids: List[str]) -> Tuple[int, List[str]]:
+        """
+        Fetch, encode and upsert users in one batch
+
+        Args:
+            user_ids: User IDs
+
+        Returns:
+            Tuple of (number indexed, IDs not found)
+        """
+        valid_ids = list(dict.fromkeys(uid for uid in user_ids if ObjectId.is_valid(uid)))
+        # A failed fetch raises: only IDs MongoDB reports as absent count as not found
+        users = self.mongo.get_users_by_ids(valid_ids, raise_errors=True) if valid_ids else []
+        found = {str(user['_id']) for user in users}
+
+        if users:
+            embeddings_service = self.embeddings_provider()
+            embeddings = embeddings_service.encode_batch(
+                [embeddings_service.user_text(user) for user in users],
+                priority=BULK
+            ).tolist()
+            self.vector_db.upsert_user_embeddings_batch([
+                {"id": str(user['_id']), "embedding": embedding, "metadata": build_user_metadata(user)}
+                for user, embedding in zip(users, embeddings)
+            ])
+            if self.reindex_provider:
+                self.reindex_provider().mirror_users(users)
+
+        return len(users), [uid for uid in user_ids if uid not in found]
+
+    def index_posts(self, post_ids: List[str]) -> Tuple[int, List[str]]:
+        """
+        Fetch, encode and upsert posts in one batch
+
+        Args:
+            post_ids: Post IDs
+
+        Returns:
+            Tuple of (number indexed, IDs not found)
+        """
+        valid_ids = list(dict.fromkeys(pid for pid in post_ids if ObjectId.is_valid(pid)))
+        # A failed fetch raises: only IDs MongoDB reports as absent count as not found
+        posts = self.mongo.get_posts_by_ids(valid_ids, raise_errors=True) if valid_ids else []
+        found = {str(post['_id']) for post in posts}
+
+        if posts:
+            embeddings_service = self.embeddings_provider()
+            embeddings = embeddings_service.encode_posts(posts, priority=BULK).tolist()
+            self.vector_db.upsert_batch(
+                self.vector_db.POSTS_COLLECTION,
+                [
+                    {
+                        "id": str(post['_id']),
+                        "vectors": {VectorDBService.POST_CONTENT_VECTOR: embedding},
+                        "payload": build_post_metadata(post),
+                    }
+                    for post, embedding in zip(posts, embeddings)
+                ]
+            )
+            if self.reindex_provider:
+                self.reindex_provider().mirror_posts(posts)
+
+        return len(posts), [pid for pid in post_ids if pid not in found]
+
+    # ==================== Write-behind queue ====================
+
+    def enqueue(self, entity_type: str, entity_ids: List[str]) -> int:
+        """
+        Queue entities for background indexing; pending entries for the same ID coalesce
+
+        Args:
+            entity_type: 'user' or 'post'
+            entity_ids: IDs to (re)index
+
+        Returns:
+            Queue depth after enqueueing
+        """
+        if entity_type not in ENTITY_TYPES:
+            raise ValueError(f"Unknown entity type '{entity_type}'")
+
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN")
+            self._db.executemany(
+                """
+                INSERT INTO pending (entity_type, entity_id, enqueued_at, updated_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (entity_type, entity_id)
+                DO UPDATE SET updated_at = excluded.updated_at, version = version + 1,
+                    attempts = 0, next_attempt_at = 0
+                """,
+                [(entity_type, entity_id, now, now) for entity_id in entity_ids]
+            )
+            self._db.execute("COMMIT")
+        depth = self.depth()
+        if depth >= settings.WRITE_BEHIND_BATCH_SIZE:
+            self._wake.set()
+        return depth
+
+    def depth(self) -> int:
+        """Number of entities waiting to be indexed (excluding ones that exhausted their retries)"""
+        with self._lock:
+            return self._db.execute(
+                "SELECT COUNT(*) FROM pending WHERE attempts < ?", (settings.WRITE_BEHIND_MAX_ATTEMPTS,)
+            ).fetchone()[0]
+
+    def lag_seconds(self) -> float:
+        """Age of the oldest pending update (0 when the queue is empty)"""
+        with self._lock:
+            oldest = self._db.execute(
+                "SELECT MIN(enqueued_at) FROM pending WHERE attempts < ?", (settings.WRITE_BEHIND_MAX_ATTEMPTS,)
+            ).fetchone()[0]
+        return max(0.0, time.time() - oldest) if oldest is not None else 0.0
+
+    def flush(self, limit: Optional[int] = None) -> int:
+        """
+        Index one batch per entity type from the queue (blocking)
+
+        If the batch fails, its entries are retried one by one so a single bad
+        entity doesn't hold back the others. Entries that still fail are retried
+        after an exponential backoff, and parked after WRITE_BEHIND_MAX_ATTEMPTS.
+
+        Args:
+            limit: Batch size (defaults to WRITE_BEHIND_BATCH_SIZE)
+
+        Returns:
+            Number of queue entries completed
+        """
+        limit = limit or settings.WRITE_BEHIND_BATCH_SIZE
+        completed = 0
+
+        for entity_type in ENTITY_TYPES:
+            with self._lock:
+                rows = self._db.execute(
+                    """
+                    SELECT entity_id, version, attempts FROM pending
+                    WHERE entity_type = ? AND attempts < ? AND next_attempt_at <= ?
+                    ORDER BY enqueued_at LIMIT ?
+                    """,
+                    (entity_type, settings.WRITE_BEHIND_MAX_ATTEMPTS, time.time(), limit)
+                ).fetchall()
+            if not rows:
+                continue
+
+            index = self.index_users if entity_type == "user" else self.index_posts
+            try:
+                index([entity_id for entity_id, _, _ in rows])
+                done, failed = rows, []
+            except Exception as e:
+                print(f"Error flushing {len(rows)} queued {entity_type} updates: {e}")
+                done, failed = self._index_each(entity_type, index, rows) if len(rows) > 1 else ([], rows)
+
+            if failed:
+                self._retry_later(entity_type, failed)
+            if done:
+                self._complete(entity_type, done)
+            completed += len(done)
+
+        return completed
+
+    @staticmethod
+    def _index_each(entity_type: str, index: Callable, rows: List[Tuple[str, int, int]]):
+        """Index queue entries one by one, returning (indexed rows, failed rows)"""
+        done, failed = [], []
+        for row in rows:
+            try:
+                index([row[0]])
+                done.append(row)
+            except Exception as e:
+                print(f"Error indexing queued {entity_type} {row[0]}: {e}")
+                failed.append(row)
+        return done, failed
+
+    def _complete(self, entity_type: str, rows: List[Tuple[str, int, int]]):
+        """Remove indexed entries (entries updated while we were indexing stay queued)"""
+        with self._lock:
+            self._db.execute("BEGIN")
+            self._db.executemany(
+                "DELETE FROM pending WHERE entity_type = ? AND entity_id = ? AND version = ?",
+                [(entity_type, entity_id, version) for entity_id, version, _ in rows]
+            )
+            self._db.executemany(
+                """
+                UPDATE pending SET enqueued_at = updated_at, attempts = 0, next_attempt_at = 0
+                WHERE entity_type = ? AND entity_id = ?
+                """,
+                [(entity_type, entity_id) for entity_id, _, _ in rows]
+            )
+            self._db.execute("COMMIT")
+        WRITE_BEHIND_FLUSHED.labels(entity_type).inc(len(rows))
+
+    def _retry_later(self, entity_type: str, rows: List[Tuple[str, int, int]]):
+        """Count a failed attempt and back off exponentially before the next one"""
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                """
+                UPDATE pending SET attempts = attempts + 1, next_attempt_at = ?
+                WHERE entity_type = ? AND entity_id = ?
+                """,
+                [
+                    (
+                        now + min(settings.WRITE_BEHIND_RETRY_BACKOFF * 2 ** attempts, settings.WRITE_BEHIND_MAX_BACKOFF),
+                        entity_type,
+                        entity_id
+                    )
+                    for entity_id, _, attempts in rows
+                ]
+            )
+        WRITE_BEHIND_FAILED.labels(entity_type).inc(len(rows))
+
+    def requeue_failed(self, entity_type: Optional[str] = None) -> int:
+        """
+        Give entries that exhausted their retries a fresh set of attempts
+
+        Args:
+            entity_type: Only requeue 'user' or 'post' entries (all when omitted)
+
+        Returns:
+            Number of entries requeued
+        """
+        if entity_type is not None and entity_type not in ENTITY_TYPES:
+            raise ValueError(f"Unknown entity type '{entity_type}'")
+
+        query = "UPDATE pending SET attempts = 0, next_attempt_at = 0 WHERE attempts >= ?"
+        params: List[Any] = [settings.WRITE_BEHIND_MAX_ATTEMPTS]
+        if entity_type is not None:
+            query += " AND entity_type = ?"
+            params.append(entity_type)
+        with self._lock:
+            requeued = self._db.execute(query, params).rowcount
+        if requeued:
+            self._wake.set()
+        return requeued
+
+    def _run(self):
+        """Worker loop: flush when a batch is full or every WRITE_BEHIND_FLUSH_INTERVAL seconds"""
+        while not self._stop.is_set():
+            self._wake.wait(settings.WRITE_BEHIND_FLUSH_INTERVAL)
+            self._wake.clear()
+            try:
+                # Keep draining while full batches are waiting
+                while not self._stop.is_set() and self.flush() >= settings.WRITE_BEHIND_BATCH_SIZE:
+                    pass
+            except Exception as e:
+                print(f"Error in write-behind worker: {e}")
+
+    def start(self):
+        """Start the background flush worker (picks up entries left from a previous run)"""
+        if self._worker is None or not self._worker.is_alive():
+            self._stop.clear()
+            self._worker = threading.Thread(target=self._run, daemon=True, name="write-behind")
+            self._worker.start()
+            self._wake.set()
+
+    def stop(self, timeout: float = 10.0):
+        """Stop the worker; pending entries stay in the queue for the next start"""
+        self._stop.set()
+        self._wake.set()
+        if self._worker is not None:
+            self._worker.join(timeout)
+            self._worker = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, lag, entries backing off after a failure and entries that exhausted their retries"""
+        with self._lock:
+            by_type = dict(self._db.execute(
+                "SELECT entity_type, COUNT(*) FROM pending WHERE attempts < ? GROUP BY entity_type",
+                (settings.WRITE_BEHIND_MAX_ATTEMPTS,)
+            ).fetchall())
+            retrying = self._db.execute(
+                "SELECT COUNT(*) FROM pending WHERE attempts > 0 AND attempts < ?", (settings.WRITE_BEHIND_MAX_ATTEMPTS,)
+            ).fetchone()[0]
+            failed = self._db.execute(
+                "SELECT COUNT(*) FROM pending WHERE attempts >= ?", (settings.WRITE_BEHIND_MAX_ATTEMPTS,)
+            ).fetchone()[0]
+        return {
+            "depth": sum(by_type.values()),
+            "by_type": by_type,
+            "lag_seconds": round(self.lag_seconds(), 3),
+            "retrying": retrying,
+            "failed": failed,
+            "worker_running": self._worker is not None and self._worker.is_alive(),
+        }
@@ -0,0 +1,879 @@
+"""
+In-process vector store implementing the part of the QdrantClient API that
+VectorDBService uses
+
+Every named vector of a collection is a contiguous float32 matrix with one row per
+point (memory-mapped from disk when the store has a path). A search is one
+matrix-vector product over the candidate rows followed by argpartition, which is
+exact and well under a millisecond for tens of thousands of 384-d vectors. Above
+LOCAL_VECTOR_IVF_THRESHOLD points an inverted-file index (k-means partitions)
+limits the scan to the partitions closest to the query.
+
+Persistence is incremental: vector rows are written in place in '<vector>.f32'
+files, and point IDs, payloads and deletions are appended to a per-collection log
+that is compacted when the store is opened.
+"""
+from typing import List, Dict, Any, Optional, Tuple, Sequence, Set, Union
+import json
+import os
+import shutil
+import threading
+import numpy as np
+from qdrant_client.models import (
+    AliasDescription, CollectionDescription, CollectionsAliasesResponse, CollectionsResponse,
+    CountResult, Record, ScoredPoint, UpdateResult, UpdateStatus,
+    Distance, Filter, FieldCondition, HasIdCondition, MatchValue, MatchAny, MatchExcept,
+    NamedVector, PointIdsList, FilterSelector, SearchRequest,
+    CreateAliasOperation, DeleteAliasOperation, RenameAliasOperation,
+    UpsertOperation, UpdateVectorsOperation, SetPayloadOperation, DeleteOperation
+)
+from src.core.config import settings
+
+PointId = Union[int, str]
+
+_INITIAL_CAPACITY = 1024
+
+# Log lines beyond this multiple of the live points trigger compaction on open
+_COMPACT_RATIO = 2
+
+# K-means training sample per IVF partition, and iterations
+_IVF_SAMPLE_PER_LIST = 64
+_IVF_ITERATIONS = 10
+
+# Rebuild an IVF index once this share of its rows were added or changed after the build
+_IVF_REBUILD_RATIO = 0.2
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length (cosine similarity becomes a dot product)"""
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _top_k(scores: np.ndarray, limit: int) -> np.ndarray:
+    """Indices of the `limit` highest finite scores, best first"""
+    k = min(limit, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+    top = top[np.argsort(-scores[top], kind="stable")]
+    return top[np.isfinite(scores[top])]
+
+
+class _IVFIndex:
+    """Inverted-file partitions of one named vector: k-means centroids and the rows in each"""
+
+    def __init__(self, matrix: np.ndarray, rows: np.ndarray, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        n_lists = max(1, int(np.sqrt(len(rows))))
+
+        sample_size = min(len(rows), n_lists * _IVF_SAMPLE_PER_LIST)
+        sample = matrix[np.sort(rng.choice(rows, sample_size, replace=False))]
+        centroids = sample[rng.choice(sample_size, n_lists, replace=False)].copy()
+
+        # Spherical k-means on the sample
+        for _ in range(_IVF_ITERATIONS):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, sample)
+            empty = np.bincount(assignments, minlength=n_lists) == 0
+            sums[empty] = centroids[empty]
+            centroids = _normalize(sums)
+
+        assignments = np.empty(len(rows), dtype=np.int64)
+        for start in range(0, len(rows), 65536):
+            chunk = rows[start:start + 65536]
+            assignments[start:start + len(chunk)] = np.argmax(matrix[chunk] @ centroids.T, axis=1)
+
+        order = np.argsort(assignments, kind="stable")
+        bounds = np.searchsorted(assignments[order], np.arange(n_lists + 1))
+        self.centroids = centroids
+        self.lists = [rows[order[bounds[i]:bounds[i + 1]]] for i in range(n_lists)]
+        self.indexed_rows = int(rows.max()) + 1 if len(rows) else 0
+        # Rows written after the build (their partition may be wrong); always scanned
+        self.dirty: Set[int] = set()
+
+    def needs_rebuild(self, n_rows: int) -> bool:
+        changed = (n_rows - self.indexed_rows) + len(self.dirty)
+        return changed > _IVF_REBUILD_RATIO * max(self.indexed_rows, 1)
+
+    def candidates(self, query: np.ndarray, probes: int, n_rows: int) -> np.ndarray:
+        """Rows in the `probes` partitions closest to the query, plus rows written since the build"""
+        probes = min(probes, len(self.lists))
+        nearest = np.argpartition(-(self.centroids @ query), probes - 1)[:probes]
+        parts = [self.lists[i] for i in nearest]
+        parts.append(np.arange(self.indexed_rows, n_rows))
+        if self.dirty:
+            parts.append(np.fromiter(self.dirty, dtype=np.int64, count=len(self.dirty)))
+        return np.unique(np.concatenate(parts))
+
+
+class _Collection:
+    """Rows, payloads and vector matrices of one collection"""
+
+    def __init__(self, name: str, vectors_config: Dict[str, Dict[str, Any]], directory: Optional[str]):
+        self.name = name
+        self.vectors_config = vectors_config
+        self.directory = directory
+
+        self.ids: List[Optional[PointId]] = []
+        self.payloads: List[Optional[Dict[str, Any]]] = []
+        self.rows: Dict[PointId, int] = {}
+        self.capacity = 0
+        self.live = np.zeros(0, dtype=bool)
+        self.matrices: Dict[str, np.ndarray] = {}
+        self.present: Dict[str, np.ndarray] = {}
+
+        # Payload key -> value -> rows, built the first time a filter uses the key
+        self.field_index: Dict[str, Dict[Any, Set[int]]] = {}
+        self.ivf: Dict[str, _IVFIndex] = {}
+
+        self._log = None
+        self._log_lines = 0
+
+        if directory is not None:
+            self._recover(directory)
+            os.makedirs(directory, exist_ok=True)
+            self._load()
+        else:
+            self._grow(_INITIAL_CAPACITY)
+
+    # ==================== Storage ====================
+
+    @property
+    def n_rows(self) -> int:
+        return len(self.ids)
+
+    def _matrix_path(self, vector_name: str) -> str:
+        return os.path.join(self.directory, f"{vector_name}.f32")
+
+    def _grow(self, capacity: int):
+        """Resize every matrix (and the per-row masks) to hold `capacity` rows"""
+        for vector_name, config in self.vectors_config.items():
+            size = config["size"]
+            old = self.matrices.get(vector_name)
+            if self.directory is None:
+                matrix = np.zeros((capacity, size), dtype=np.float32)
+                if old is not None:
+                    matrix[:len(old)] = old
+            else:
+                if old is not None:
+                    old.flush()
+                path = self._matrix_path(vector_name)
+                with open(path, "ab") as f:
+                    if f.tell() < capacity * size * 4:
+                        f.truncate(capacity * size * 4)
+                matrix = np.memmap(path, dtype=np.float32, mode="r+", shape=(capacity, size))
+            self.matrices[vector_name] = matrix
+
+            present = np.zeros(capacity, dtype=bool)
+            if vector_name in self.present:
+                present[:self.capacity] = self.present[vector_name]
+            self.present[vector_name] = present
+
+        live = np.zeros(capacity, dtype=bool)
+        live[:self.capacity] = self.live
+        self.live = live
+        self.capacity = capacity
+
+    def _load(self):
+        """Replay the point log; vectors are mapped from their files as they are"""
+        log_path = os.path.join(self.directory, "points.log")
+        state: Dict[int, Optional[Dict[str, Any]]] = {}
+        lines = 0
+        if os.path.exists(log_path):
+            with open(log_path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Torn final line from a crash mid-write
+                        break
+                    state[entry["row"]] = None if entry.get("deleted") else entry
+                    lines += 1
+
+        n_rows = max(state) + 1 if state else 0
+        capacity = _INITIAL_CAPACITY
+        while capacity < n_rows:
+            capacity *= 2
+        self._grow(capacity)
+
+        self.ids = [None] * n_rows
+        self.payloads = [None] * n_rows
+        for row, entry in state.items():
+            if entry is None:
+                continue
+            self.ids[row] = entry["id"]
+            self.payloads[row] = entry["payload"]
+            self.rows[entry["id"]] = row
+            self.live[row] = True
+            for vector_name in entry["vectors"]:
+                if vector_name in self.present:
+                    self.present[vector_name][row] = True
+
+        self._log_lines = lines
+        if lines > _COMPACT_RATIO * len(self.rows) + _INITIAL_CAPACITY or n_rows > 2 * len(self.rows) + _INITIAL_CAPACITY:
+            self._compact()
+        self._log = open(log_path, "a")
+
+    def _compact(self):
+        """
+        Drop deleted rows from the matrices and rewrite the log with one line per point
+
+        The compacted files are written to '<collection>.compact' and swapped in with
+        two directory renames, so a crash at any point leaves either the old or the
+        new files complete (see _recover).
+        """
+        keep = np.flatnonzero(self.live[:self.n_rows])
+        print(f"Compacting local collection '{self.name}' ({len(keep)} of {self.n_rows} rows live)")
+
+        capacity = _INITIAL_CAPACITY
+        while capacity < len(keep):
+            capacity *= 2
+
+        staging = self.directory + ".compact"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        for vector_name, config in self.vectors_config.items():
+            matrix = np.memmap(
+                os.path.join(staging, f"{vector_name}.f32"), dtype=np.float32, mode="w+", shape=(capacity, config["size"])
+            )
+            matrix[:len(keep)] = self.matrices[vector_name][keep]
+            matrix.flush()
+            del matrix
+
+        present = {name: mask[keep] for name, mask in self.present.items()}
+        ids = [self.ids[row] for row in keep]
+        payloads = [self.payloads[row] for row in keep]
+        with open(os.path.join(staging, "points.log"), "w") as f:
+            for row in range(len(keep)):
+                f.write(json.dumps({
+                    "row": row,
+                    "id": ids[row],
+                    "payload": payloads[row],
+                    "vectors": [name for name, mask in present.items() if mask[row]],
+                }) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+        for matrix in self.matrices.values():
+            matrix.flush()
+        self.matrices = {}
+        previous = self.directory + ".old"
+        os.rename(self.directory, previous)
+        os.rename(staging, self.directory)
+        shutil.rmtree(previous)
+
+        self.present, self.capacity = {}, 0
+        self.live = np.zeros(0, dtype=bool)
+        self._grow(capacity)
+        for vector_name, mask in present.items():
+            self.present[vector_name][:len(keep)] = mask
+        self.live[:len(keep)] = True
+        self.ids, self.payloads = ids, payloads
+        self.rows = {point_id: row for row, point_id in enumerate(ids)}
+        self.field_index, self.ivf = {}, {}
+        self._log_lines = len(ids)
+
+    @staticmethod
+    def _recover(directory: str):
+        """Finish or roll back a compaction interrupted by a crash"""
+        staging, previous = directory + ".compact", directory + ".old"
+        if os.path.exists(previous):
+            if not os.path.exists(directory):
+                # Crashed between the two renames: the staged files are complete
+                os.rename(staging, directory)
+            shutil.rmtree(previous)
+        elif os.path.exists(staging):
+            # Crashed while staging: the current files were never touched
+            shutil.rmtree(staging)
+
+    def _log_entry(self, row: int) -> Dict[str, Any]:
+        return {
+            "row": row,
+            "id": self.ids[row],
+            "payload": self.payloads[row],
+            "vectors": [name for name, mask in self.present.items() if mask[row]],
+        }
+
+    def _append_log(self, entries: List[Dict[str, Any]]):
+        if self._log is None:
+            return
+        self._log.write("".join(json.dumps(entry) + "\n" for entry in entries))
+        self._log.flush()
+        self._log_lines += len(entries)
+
+    def close(self):
+        for matrix in self.matrices.values():
+            if isinstance(matrix, np.memmap):
+                matrix.flush()
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    # ==================== Writes ====================
+
+    def _prepare(self, vector_name: str, vector: Sequence[float]) -> np.ndarray:
+        config = self.vectors_config.get(vector_name)
+        if config is None:
+            raise ValueError(f"Collection '{self.name}' has no vector named '{vector_name}'")
+        array = np.asarray(vector, dtype=np.float32)
+        if array.shape != (config["size"],):
+            raise ValueError(
+                f"Vector '{vector_name}' has dimension {array.size}, expected {config['size']}"
+            )
+        if config["distance"] == Distance.COSINE:
+            array = _normalize(array)
+        return array
+
+    def write(self, point_id: PointId, vectors: Dict[str, Any], payload: Optional[Dict[str, Any]], replace: bool) -> int:
+        """
+        Insert or update one point
+
+        Args:
+            point_id: Point ID
+            vectors: Named vectors to set
+            payload: New payload (ignored when not replacing)
+            replace: Replace the whole point (upsert) rather than only the given vectors
+
+        Returns:
+            Row of the point
+        """
+        prepared = {name: self._prepare(name, vector) for name, vector in vectors.items()}
+
+        row = self.rows.get(point_id)
+        if row is None:
+            if not replace:
+                raise ValueError(f"Point {point_id} not found in collection '{self.name}'")
+            row = self.n_rows
+            if row >= self.capacity:
+                self._grow(self.capacity * 2)
+            self.ids.append(point_id)
+            self.payloads.append(None)
+            self.rows[point_id] = row
+            self.live[row] = True
+        else:
+            for ivf in self.ivf.values():
+                if row < ivf.indexed_rows:
+                    ivf.dirty.add(row)
+
+        if replace:
+            self._unindex_payload(row)
+            self.payloads[row] = payload or {}
+            self._index_payload(row)
+            for present in self.present.values():
+                present[row] = False
+
+        for vector_name, array in prepared.items():
+            self.matrices[vector_name][row] = array
+            self.present[vector_name][row] = True
+        return row
+
+    def set_payload(self, point_id: PointId, payload: Dict[str, Any]) -> int:
+        """Merge `payload` into the payload of an existing point, returning its row"""
+        row = self.rows.get(point_id)
+        if row is None:
+            raise ValueError(f"Point {point_id} not found in collection '{self.name}'")
+        self._unindex_payload(row)
+        self.payloads[row] = {**(self.payloads[row] or {}), **payload}
+        self._index_payload(row)
+        return row
+
+    def delete(self, point_id: PointId) -> Optional[int]:
+        row = self.rows.pop(point_id, None)
+        if row is None:
+            return None
+        self._unindex_payload(row)
+        self.ids[row] = None
+        self.payloads[row] = None
+        self.live[row] = False
+        for present in self.present.values():
+            present[row] = False
+        return row
+
+    # ==================== Payload filters ====================
+
+    @staticmethod
+    def _values(value: Any) -> List[Any]:
+        """Indexable values of a payload field (list fields match on any element)"""
+        values = value if isinstance(value, list) else [value]
+        return [item for item in values if isinstance(item, (str, int, float, bool))]
+
+    def _index_payload(self, row: int):
+        payload = self.payloads[row] or {}
+        for key, index in self.field_index.items():
+            for value in self._values(payload.get(key)):
+                index.setdefault(value, set()).add(row)
+
+    def _unindex_payload(self, row: int):
+        payload = self.payloads[row] or {}
+        for key, index in self.field_index.items():
+            for value in self._values(payload.get(key)):
+                rows = index.get(value)
+                if rows is not None:
+                    rows.discard(row)
+                    if not rows:
+                        del index[value]
+
+    def field(self, key: str) -> Dict[Any, Set[int]]:
+        """Value -> rows index of a payload key (built on first use, then kept up to date)"""
+        index = self.field_index.get(key)
+        if index is None:
+            index = {}
+            for row, payload in enumerate(self.payloads):
+                if payload is not None:
+                    for value in self._values(payload.get(key)):
+                        index.setdefault(value, set()).add(row)
+            self.field_index[key] = index
+        return index
+
+    def _rows_mask(self, rows: Sequence[int]) -> np.ndarray:
+        mask = np.zeros(self.n_rows, dtype=bool)
+        if rows:
+            mask[np.fromiter(rows, dtype=np.int64, count=len(rows))] = True
+        return mask
+
+    def _condition_mask(self, condition: Any) -> np.ndarray:
+        if isinstance(condition, Filter):
+            return self.filter_mask(condition)
+
+        if isinstance(condition, HasIdCondition):
+            return self._rows_mask([self.rows[i] for i in condition.has_id if i in self.rows])
+
+        if isinstance(condition, FieldCondition):
+            index = self.field(condition.key)
+            match = condition.match
+            if isinstance(match, MatchValue):
+                return self._rows_mask(list(index.get(match.value, ())))
+            if isinstance(match, MatchAny):
+                return self._rows_mask(list(set().union(*(index.get(value, ()) for value in match.any))))
+            if isinstance(match, MatchExcept):
+                excluded = set(match.except_)
+                return self._rows_mask(list(set().union(
+                    *(rows for value, rows in index.items() if value not in excluded)
+                )))
+            if match is None and condition.range is not None:
+                bounds = condition.range
+                matched: Set[int] = set()
+                for value, rows in index.items():
+                    if isinstance(value, bool) or not isinstance(value, (int, float)):
+                        continue
+                    if ((bounds.gt is None or value > bounds.gt) and (bounds.gte is None or value >= bounds.gte)
+                            and (bounds.lt is None or value < bounds.lt) and (bounds.lte is None or value <= bounds.lte)):
+                        matched |= rows
+                return self._rows_mask(list(matched))
+
+        raise NotImplementedError(f"Unsupported filter condition for the local vector store: {condition!r}")
+
+    def filter_mask(self, query_filter: Optional[Filter]) -> np.ndarray:
+        """Boolean mask over rows of live points matching the filter"""
+        mask = self.live[:self.n_rows].copy()
+        if query_filter is None:
+            return mask
+        for condition in query_filter.must or []:
+            mask &= self._condition_mask(condition)
+        for condition in query_filter.must_not or []:
+            mask &= ~self._condition_mask(condition)
+        if query_filter.should:
+            any_match = np.zeros(self.n_rows, dtype=bool)
+            for condition in query_filter.should:
+                any_match |= self._condition_mask(condition)
+            mask &= any_match
+        return mask
+
+    # ==================== Reads ====================
+
+    def ivf_for(self, vector_name: str) -> Optional[_IVFIndex]:
+        """IVF index of a vector, (re)built when the collection is large enough; None for exact search"""
+        threshold = settings.LOCAL_VECTOR_IVF_THRESHOLD
+        present = self.present[vector_name][:self.n_rows]
+        if threshold <= 0 or int(present.sum()) < threshold:
+            self.ivf.pop(vector_name, None)
+            return None
+
+        ivf = self.ivf.get(vector_name)
+        if ivf is None or ivf.needs_rebuild(self.n_rows):
+            ivf = _IVFIndex(self.matrices[vector_name], np.flatnonzero(present))
+            self.ivf[vector_name] = ivf
+        return ivf
+
+    def record(self, row: int, with_payload: Any, with_vectors: Any, score: Optional[float] = None):
+        """Build a Record (or ScoredPoint when a score is given) for a row"""
+        payload = None
+        if with_payload:
+            payload = self.payloads[row] or {}
+            if not isinstance(with_payload, bool):
+                payload = {key: payload[key] for key in with_payload if key in payload}
+
+        vector = None
+        if with_vectors:
+            names = self.vectors_config if isinstance(with_vectors, bool) else with_vectors
+            vector = {
+                name: self.matrices[name][row].tolist()
+                for name in names
+                if name in self.present and self.present[name][row]
+            }
+
+        if score is None:
+            return Record(id=self.ids[row], payload=payload, vector=vector)
+        return ScoredPoint(id=self.ids[row], version=0, score=score, payload=payload, vector=vector)
+
+
+class LocalVectorStore:
+    """
+    In-process replacement for QdrantClient (the subset VectorDBService uses)
+
+    HNSW, quantization and optimizer settings are accepted and ignored; search is
+    exact below LOCAL_VECTOR_IVF_THRESHOLD points and IVF above it.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Open (or create) a store
+
+        Args:
+            path: Storage directory; None keeps everything in memory (tests, CI)
+        """
+        self.path = path
+        self._lock = threading.RLock()
+        self.collections: Dict[str, _Collection] = {}
+        self.aliases: Dict[str, str] = {}
+
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+            meta_path = os.path.join(path, "meta.json")
+            if os.path.exists(meta_path):
+                with open(meta_path) as f:
+                    meta = json.load(f)
+                self.aliases = meta.get("aliases", {})
+                for name, vectors_config in meta.get("collections", {}).items():
+                    self.collections[name] = _Collection(name, vectors_config, os.path.join(path, name))
+
+    def _save_meta(self):
+        if self.path is None:
+            return
+        meta = {
+            "collections": {name: col.vectors_config for name, col in self.collections.items()},
+            "aliases": self.aliases,
+        }
+        meta_path = os.path.join(self.path, "meta.json")
+        with open(meta_path + ".tmp", "w") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(meta_path + ".tmp", meta_path)
+
+    def _collection(self, collection_name: str) -> _Collection:
+        name = self.aliases.get(collection_name, collection_name)
+        collection = self.collections.get(name)
+        if collection is None:
+            raise ValueError(f"Collection {collection_name} not found")
+        return collection
+
+    @staticmethod
+    def _completed() -> UpdateResult:
+        return UpdateResult(operation_id=0, status=UpdateStatus.COMPLETED)
+
+    def close(self, **kwargs):
+        """Flush matrices and close the point logs"""
+        with self._lock:
+            for collection in self.collections.values():
+                collection.close()
+
+    # ==================== Collections and aliases ====================
+
+    def get_collections(self) -> CollectionsResponse:
+        with self._lock:
+            return CollectionsResponse(
+                collections=[CollectionDescription(name=name) for name in self.collections]
+            )
+
+    def get_aliases(self) -> CollectionsAliasesResponse:
+        with self._lock:
+            return CollectionsAliasesResponse(aliases=[
+                AliasDescription(alias_name=alias, collection_name=target)
+                for alias, target in self.aliases.items()
+            ])
+
+    def create_collection(self, collection_name: str, vectors_config: Dict[str, Any], **kwargs) -> bool:
+        """Create a collection of named vectors (only cosine and dot distances are supported)"""
+        if not isinstance(vectors_config, dict):
+            raise ValueError("The local vector store only supports named vectors")
+
+        config = {}
+        for vector_name, params in vectors_config.items():
+            if params.distance not in (Distance.COSINE, Distance.DOT):
+                raise ValueError(f"Unsupported distance '{params.distance}' for the local vector store")
+            config[vector_name] = {"size": params.size, "distance": params.distance.value}
+
+        with self._lock:
+            if collection_name in self.collections or collection_name in self.aliases:
+                raise ValueError(f"Collection '{collection_name}' already exists")
+            directory = os.path.join(self.path, collection_name) if self.path is not None else None
+            if directory is not None and os.path.exists(directory):
+                shutil.rmtree(directory)
+            self.collections[collection_name] = _Collection(collection_name, config, directory)
+            self._save_meta()
+        return True
+
+    def update_collection(self, collection_name: str, **kwargs) -> bool:
+        """Index and storage settings have no equivalent here"""
+        self._collection(collection_name)
+        return True
+
+    def delete_collection(self, collection_name: str, **kwargs) -> bool:
+        with self._lock:
+            collection = self.collections.pop(collection_name, None)
+            if collection is None:
+                return False
+            collection.close()
+            if collection.directory is not None:
+                shutil.rmtree(collection.directory, ignore_errors=True)
+            self.aliases = {alias: target for alias, target in self.aliases.items() if target != collection_name}
+            self._save_meta()
+        return True
+
+    def update_collection_aliases(self, change_aliases_operations: Sequence[Any], **kwargs) -> bool:
+        """Apply alias operations atomically (all or none)"""
+        with self._lock:
+            aliases = dict(self.aliases)
+            for operation in change_aliases_operations:
+                if isinstance(operation, CreateAliasOperation):
+                    target = operation.create_alias.collection_name
+                    if target not in self.collections:
+                        raise ValueError(f"Collection {target} not found")
+                    aliases[operation.create_alias.alias_name] = target
+                elif isinstance(operation, DeleteAliasOperation):
+                    aliases.pop(operation.delete_alias.alias_name, None)
+                elif isinstance(operation, RenameAliasOperation):
+                    rename = operation.rename_alias
+                    aliases[rename.new_alias_name] = aliases.pop(rename.old_alias_name)
+                else:
+                    raise NotImplementedError(f"Unsupported alias operation {operation!r}")
+            self.aliases = aliases
+            self._save_meta()
+        return True
+
+    def create_payload_index(self, collection_name: str, field_name: str, **kwargs) -> UpdateResult:
+        """Build the value index of a payload field now instead of on first use"""
+        with self._lock:
+            self._collection(collection_name).field(field_name)
+        return self._completed()
+
+    # ==================== Points ====================
+
+    def upsert(self, collection_name: str, points: Sequence[Any], **kwargs) -> UpdateResult:
+        with self._lock:
+            collection = self._collection(collection_name)
+            rows = []
+            for point in points:
+                if not isinstance(point.vector, dict):
+                    raise ValueError("The local vector store only supports named vectors")
+                rows.append(collection.write(point.id, point.vector, point.payload, replace=True))
+            collection._append_log([collection._log_entry(row) for row in rows])
+        return self._completed()
+
+    def update_vectors(self, collection_name: str, points: Sequence[Any], **kwargs) -> UpdateResult:
+        with self._lock:
+            collection = self._collection(collection_name)
+            rows = [collection.write(point.id, point.vector, None, replace=False) for point in points]
+            collection._append_log([collection._log_entry(row) for row in rows])
+        return self._completed()
+
+    def set_payload(self, collection_name: str, payload: Dict[str, Any], points: Sequence[PointId], **kwargs) -> UpdateResult:
+        """Merge `payload` into the payloads of the given (existing) points"""
+        if isinstance(points, PointIdsList):
+            points = points.points
+        with self._lock:
+            collection = self._collection(collection_name)
+            rows = [collection.set_payload(point_id, payload) for point_id in points]
+            collection._append_log([collection._log_entry(row) for row in rows])
+        return self._completed()
+
+    def batch_update_points(self, collection_name: str, update_operations: Sequence[Any], **kwargs) -> List[UpdateResult]:
+        """Apply upsert, update-vectors, set-payload and delete operations in order under one lock"""
+        results = []
+        with self._lock:
+            for operation in update_operations:
+                if isinstance(operation, UpsertOperation):
+                    results.append(self.upsert(collection_name, operation.upsert.points))
+                elif isinstance(operation, UpdateVectorsOperation):
+                    results.append(self.update_vectors(collection_name, operation.update_vectors.points))
+                elif isinstance(operation, SetPayloadOperation):
+                    results.append(self.set_payload(
+                        collection_name, operation.set_payload.payload, operation.set_payload.points
+                    ))
+                elif isinstance(operation, DeleteOperation):
+                    results.append(self.delete(collection_name, operation.delete))
+                else:
+                    raise NotImplementedError(f"Unsupported update operation {operation!r}")
+        return results
+
+    def delete(self, collection_name: str, points_selector: Any, **kwargs) -> UpdateResult:
+        """Delete by a list of IDs, PointIdsList, Filter, FilterSelector or their dict forms"""
+        if isinstance(points_selector, dict):
+            if "filter" in points_selector:
+                points_selector = FilterSelector(**points_selector)
+            else:
+                points_selector = PointIdsList(**points_selector)
+        if isinstance(points_selector, FilterSelector):
+            points_selector = points_selector.filter
+
+        with self._lock:
+            collection = self._collection(collection_name)
+            if isinstance(points_selector, Filter):
+                rows = np.flatnonzero(collection.filter_mask(points_selector))
+                point_ids = [collection.ids[row] for row in rows]
+            elif isinstance(points_selector, PointIdsList):
+                point_ids = points_selector.points
+            else:
+                point_ids = list(points_selector)
+
+            deleted = [row for row in (collection.delete(point_id) for point_id in point_ids) if row is not None]
+            collection._append_log([{"row": row, "deleted": True} for row in deleted])
+        return self._completed()
+
+    def retrieve(
+        self,
+        collection_name: str,
+        ids: Sequence[PointId],
+        with_payload: Any = True,
+        with_vectors: Any = False,
+        **kwargs
+    ) -> List[Record]:
+        with self._lock:
+            collection = self._collection(collection_name)
+            return [
+                collection.record(collection.rows[point_id], with_payload, with_vectors)
+                for point_id in dict.fromkeys(ids)
+                if point_id in collection.rows
+            ]
+
+    def scroll(
+        self,
+        collection_name: str,
+        scroll_filter: Optional[Filter] = None,
+        limit: int = 10,
+        offset: Optional[PointId] = None,
+        with_payload: Any = True,
+        with_vectors: Any = False,
+        **kwargs
+    ) -> Tuple[List[Record], Optional[PointId]]:
+        """Page through matching points in insertion order; the offset is the next page's first ID"""
+        with self._lock:
+            collection = self._collection(collection_name)
+            rows = np.flatnonzero(collection.filter_mask(scroll_filter))
+            if offset is not None:
+                start = collection.rows.get(offset)
+                if start is None:
+                    return [], None
+                rows = rows[rows >= start]
+            page, rest = rows[:limit], rows[limit:limit + 1]
+            records = [collection.record(row, with_payload, with_vectors) for row in page]
+            return records, (collection.ids[rest[0]] if len(rest) else None)
+
+    def count(self, collection_name: str, count_filter: Optional[Filter] = None, exact: bool = True, **kwargs) -> CountResult:
+        with self._lock:
+            collection = self._collection(collection_name)
+            if count_filter is None:
+                return CountResult(count=len(collection.rows))
+            return CountResult(count=int(collection.filter_mask(count_filter).sum()))
+
+    # ==================== Search ====================
+
+    def search(
+        self,
+        collection_name: str,
+        query_vector: Any,
+        query_filter: Optional[Filter] = None,
+        limit: int = 10,
+        offset: Optional[int] = None,
+        with_payload: Any = True,
+        with_vectors: Any = False,
+        score_threshold: Optional[float] = None,
+        **kwargs
+    ) -> List[ScoredPoint]:
+        if isinstance(query_vector, NamedVector):
+            vector_name, vector = query_vector.name, query_vector.vector
+        elif isinstance(query_vector, tuple):
+            vector_name, vector = query_vector
+        else:
+            raise ValueError("The local vector store only supports named vectors")
+
+        request = SearchRequest(
+            vector=NamedVector(name=vector_name, vector=list(vector)),
+            filter=query_filter,
+            limit=limit,
+            offset=offset,
+            with_payload=with_payload,
+            with_vector=with_vectors,
+            score_threshold=score_threshold
+        )
+        return self.search_batch(collection_name, [request])[0]
+
+    def search_batch(self, collection_name: str, requests: Sequence[SearchRequest], **kwargs) -> List[List[ScoredPoint]]:
+        """
+        Run several searches; exact queries on the same vector share one matrix product
+
+        Filters and IVF candidates are resolved under the lock; the scoring itself
+        runs outside it (NumPy releases the GIL), so concurrent searches overlap.
+        """
+        with self._lock:
+            collection = self._collection(collection_name)
+            n_rows = collection.n_rows
+            plans = []
+            for request in requests:
+                vector_name = request.vector.name
+                if vector_name not in collection.vectors_config:
+                    raise ValueError(f"Collection '{collection_name}' has no vector named '{vector_name}'")
+                allowed = collection.filter_mask(request.filter) & collection.present[vector_name][:n_rows]
+                query = collection._prepare(vector_name, request.vector.vector)
+                ivf = collection.ivf_for(vector_name)
+                candidates = ivf.candidates(query, settings.LOCAL_VECTOR_IVF_PROBES, n_rows) if ivf else None
+                plans.append((vector_name, query, allowed, candidates))
+            matrices = {name: matrix[:n_rows] for name, matrix in collection.matrices.items()}
+
+        # Exact queries grouped by vector: one (queries x rows) product per group
+        exact_scores: Dict[int, np.ndarray] = {}
+        groups: Dict[str, List[int]] = {}
+        for i, (vector_name, _, _, candidates) in enumerate(plans):
+            if candidates is None:
+                groups.setdefault(vector_name, []).append(i)
+        for vector_name, indices in groups.items():
+            queries = np.stack([plans[i][1] for i in indices])
+            scores = queries @ matrices[vector_name].T
+            for row, i in enumerate(indices):
+                exact_scores[i] = scores[row]
+
+        batch_rows = []
+        for i, (request, (vector_name, query, allowed, candidates)) in enumerate(zip(requests, plans)):
+            wanted = request.limit + (request.offset or 0)
+            rows = None
+            if candidates is not None:
+                scores = matrices[vector_name][candidates] @ query
+                scores[~allowed[candidates]] = -np.inf
+                top = _top_k(scores, wanted)
+                # Filters can empty the probed partitions; fall back to an exact scan
+                if len(top) >= min(wanted, int(allowed.sum())):
+                    rows, top_scores = candidates[top], scores[top]
+                else:
+                    exact_scores[i] = matrices[vector_name] @ query
+            if rows is None:
+                scores = exact_scores[i]
+                scores[~allowed] = -np.inf
+                top = _top_k(scores, wanted)
+                rows, top_scores = top, scores[top]
+
+            hits = list(zip(rows[request.offset or 0:], top_scores[request.offset or 0:]))
+            if request.score_threshold is not None:
+                hits = [(row, score) for row, score in hits if score >= request.score_threshold]
+            batch_rows.append(hits)
+
+        with self._lock:
+            return [
+                [
+                    collection.record(int(row), request.with_payload, request.with_vector, float(score))
+                    for row, score in hits
+                    if collection.ids[row] is not None
+                ]
+                for request, hits in zip(requests, batch_rows)
+            ]
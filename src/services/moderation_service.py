@@ -14,6 +14,9 @@ import torch
 torch.set_num_threads(1)
 
 from detoxify import Detoxify
+from src.core.config import settings
+from src.core.metrics import timed
+from src.utils.inference_scheduler import InferenceScheduler, INTERACTIVE
 
 
 class ModerationService:
@@ -35,13 +38,25 @@ class ModerationService:
         print("Loading toxicity detection model...")
         self.toxicity_model = Detoxify('original', device='cpu')
         print("Toxicity detection model loaded successfully")
+        
+        # Model calls go through one worker: interactive lane first, bulk in small batches
+        self.scheduler = (
+            InferenceScheduler("toxicity", self._predict_toxicity) if settings.INFERENCE_SCHEDULER_ENABLED else None
+        )
+    
+    def _predict_toxicity(self, texts: List[str]) -> List[Dict[str, float]]:
+        """Score a batch of texts (the scheduler's worker calls this)"""
+        results = self.toxicity_model.predict(texts)
+        return [{k: float(v[i]) for k, v in results.items()} for i in range(len(texts))]
     
-    def check_toxicity(self, text: str) -> Dict[str, float]:
+    @timed("moderation")
+    def check_toxicity(self, text: str, priority: str = INTERACTIVE) -> Dict[str, float]:
         """
         Check text for toxic content
         
         Args:
             text: Text to check
+            priority: Scheduler lane (INTERACTIVE or BULK)
             
         Returns:
             Dictionary with toxicity scores for different categories
@@ -57,6 +72,8 @@ class ModerationService:
             }
         
         try:
+            if self.scheduler is not None:
+                return self.scheduler.run([text], priority)[0]
             results = self.toxicity_model.predict(text)
             # Convert numpy types to Python floats
             return {k: float(v) for k, v in results.items()}
@@ -71,6 +88,7 @@ class ModerationService:
                 'identity_attack': 0.0
             }
     
+    @timed("moderation")
     def check_spam(self, text: str) -> Tuple[float, List[str]]:
         """
         Check text for spam patterns
@@ -121,7 +139,8 @@ class ModerationService:
         self,
         text: str,
         check_toxicity: bool = True,
-        check_spam: bool = True
+        check_spam: bool = True,
+        priority: str = INTERACTIVE
     ) -> Dict:
         """
         Perform full content moderation
@@ -130,6 +149,7 @@ class ModerationService:
             text: Text to moderate
             check_toxicity: Whether to check for toxicity
             check_spam: Whether to check for spam
+            priority: Scheduler lane for the toxicity model (INTERACTIVE or BULK)
             
         Returns:
             Dictionary with moderation results
@@ -144,7 +164,7 @@ class ModerationService:
         
         # Check toxicity
         if check_toxicity:
-            toxicity_results = self.check_toxicity(text)
+            toxicity_results = self.check_toxicity(text, priority)
             results['toxicity_score'] = toxicity_results.get('toxicity', 0.0)
             results['categories'] = toxicity_results
             
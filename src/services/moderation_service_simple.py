@@ -4,6 +4,8 @@ Uses rule-based toxicity detection instead of Detoxify
 """
 from typing import Dict, List, Tuple
 import re
+from src.core.metrics import timed
+from src.utils.inference_scheduler import INTERACTIVE
 
 
 class ModerationService:
@@ -36,12 +38,14 @@ class ModerationService:
         """Initialize moderation service"""
         print("Moderation service initialized (rule-based)")
     
-    def check_toxicity(self, text: str) -> Dict[str, float]:
+    @timed("moderation")
+    def check_toxicity(self, text: str, priority: str = INTERACTIVE) -> Dict[str, float]:
         """
         Check text for toxic content using rule-based approach
         
         Args:
             text: Text to check
+            priority: Accepted for interface parity (no model, nothing to schedule)
             
         Returns:
             Dictionary with toxicity scores
@@ -91,6 +95,7 @@ class ModerationService:
             'identity_attack': 0.0  # Would need more sophisticated detection
         }
     
+    @timed("moderation")
     def check_spam(self, text: str) -> Tuple[float, List[str]]:
         """
         Check text for spam patterns
@@ -141,7 +146,8 @@ class ModerationService:
         self,
         text: str,
         check_toxicity: bool = True,
-        check_spam: bool = True
+        check_spam: bool = True,
+        priority: str = INTERACTIVE
     ) -> Dict:
         """
         Perform full content moderation
@@ -150,6 +156,7 @@ class ModerationService:
             text: Text to moderate
             check_toxicity: Whether to check for toxicity
             check_spam: Whether to check for spam
+            priority: Scheduler lane for the toxicity model (INTERACTIVE or BULK)
             
         Returns:
             Dictionary with moderation results
@@ -164,7 +171,7 @@ class ModerationService:
         
         # Check toxicity
         if check_toxicity:
-            toxicity_results = self.check_toxicity(text)
+            toxicity_results = self.check_toxicity(text, priority)
             results['toxicity_score'] = toxicity_results.get('toxicity', 0.0)
             results['categories'] = toxicity_results
             
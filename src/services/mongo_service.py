@@ -1,19 +1,29 @@
 from pymongo import MongoClient
 from typing import List, Dict, Optional, Any
 from src.core.config import settings
+from src.core.metrics import timed, observe_batch
 from bson import ObjectId
 
 
 class MongoService:
     """Service for MongoDB operations"""
     
-    def __init__(self):
-        """Initialize MongoDB connection"""
-        print(f"Connecting to MongoDB: {settings.MONGODB_URI}")
-        self.client = MongoClient(settings.MONGODB_URI)
+    def __init__(self, client: Optional[MongoClient] = None):
+        """
+        Initialize MongoDB connection
+        
+        Args:
+            client: Pre-built client (e.g. mongomock for load tests); connects using
+                settings when omitted. Its URI must name the default database.
+        """
+        if client is None:
+            print(f"Connecting to MongoDB: {settings.MONGODB_URI}")
+            client = MongoClient(settings.MONGODB_URI)
+        self.client = client
         self.db = self.client.get_default_database()
         print("MongoDB connected successfully")
     
+    @timed("mongo")
     def get_user_by_id(self, user_id: str) -> Optional[Dict[str, Any]]:
         """
         Get user by ID
@@ -30,6 +40,7 @@ class MongoService:
             print(f"Error fetching user {user_id}: {e}")
             return None
     
+    @timed("mongo")
     def get_all_users(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         Get all users
@@ -45,23 +56,37 @@ class MongoService:
             query = query.limit(limit)
         return list(query)
     
-    def get_users_by_ids(self, user_ids: List[str]) -> List[Dict[str, Any]]:
+    @timed("mongo")
+    def get_users_by_ids(
+        self,
+        user_ids: List[str],
+        fields: Optional[List[str]] = None,
+        raise_errors: bool = False
+    ) -> List[Dict[str, Any]]:
         """
         Get multiple users by IDs
         
         Args:
             user_ids: List of user IDs
+            fields: Only return these fields (and _id); all fields when omitted
+            raise_errors: Raise on connection/query errors instead of returning [],
+                so callers can tell "not found" from "could not fetch"
             
         Returns:
-            List of user documents
+            List of user documents (in no particular order)
         """
         try:
+            observe_batch("mongo_users", len(user_ids))
             object_ids = [ObjectId(uid) for uid in user_ids]
-            return list(self.db.users.find({"_id": {"$in": object_ids}}))
+            projection = {field: 1 for field in fields} if fields else None
+            return list(self.db.users.find({"_id": {"$in": object_ids}}, projection))
         except Exception as e:
+            if raise_errors:
+                raise
             print(f"Error fetching users: {e}")
             return []
     
+    @timed("mongo")
     def get_post_by_id(self, post_id: str) -> Optional[Dict[str, Any]]:
         """
         Get post by ID
@@ -78,6 +103,7 @@ class MongoService:
             print(f"Error fetching post {post_id}: {e}")
             return None
     
+    @timed("mongo")
     def get_all_posts(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         Get all posts
@@ -93,23 +119,37 @@ class MongoService:
             query = query.limit(limit)
         return list(query)
     
-    def get_posts_by_ids(self, post_ids: List[str]) -> List[Dict[str, Any]]:
+    @timed("mongo")
+    def get_posts_by_ids(
+        self,
+        post_ids: List[str],
+        fields: Optional[List[str]] = None,
+        raise_errors: bool = False
+    ) -> List[Dict[str, Any]]:
         """
         Get multiple posts by IDs
         
         Args:
             post_ids: List of post IDs
+            fields: Only return these fields (and _id); all fields when omitted
+            raise_errors: Raise on connection/query errors instead of returning [],
+                so callers can tell "not found" from "could not fetch"
             
         Returns:
-            List of post documents
+            List of post documents (in no particular order)
         """
         try:
+            observe_batch("mongo_posts", len(post_ids))
             object_ids = [ObjectId(pid) for pid in post_ids]
-            return list(self.db.posts.find({"_id": {"$in": object_ids}}))
+            projection = {field: 1 for field in fields} if fields else None
+            return list(self.db.posts.find({"_id": {"$in": object_ids}}, projection))
         except Exception as e:
+            if raise_errors:
+                raise
             print(f"Error fetching posts: {e}")
             return []
     
+    @timed("mongo")
     def get_user_following(self, user_id: str) -> List[str]:
         """
         Get list of user IDs that a user is following
@@ -134,6 +174,7 @@ class MongoService:
             print(traceback.format_exc())
             return []
     
+    @timed("mongo")
     def get_user_interactions(self, user_id: str) -> Dict[str, List[str]]:
         """
         Get user's interaction history (liked posts, commented posts)
@@ -165,6 +206,108 @@ class MongoService:
             print(f"Error fetching user interactions: {e}")
             return {"liked_posts": [], "commented_posts": []}
     
+    @timed("mongo")
+    def get_liked_posts_by_users(self, user_ids: List[str]) -> Dict[str, List[str]]:
+        """
+        Get the liked posts of several users in one query
+        
+        Args:
+            user_ids: List of user IDs
+            
+        Returns:
+            Dictionary mapping each user ID to its liked post IDs
+        """
+        liked = {user_id: [] for user_id in user_ids}
+        try:
+            observe_batch("mongo_interactions", len(user_ids))
+            reactions = self.db.postreactions.find(
+                {"userId": {"$in": [ObjectId(uid) for uid in user_ids]}},
+                {"userId": 1, "postId": 1}
+            )
+            for reaction in reactions:
+                liked.setdefault(str(reaction["userId"]), []).append(str(reaction["postId"]))
+            return liked
+        except Exception as e:
+            print(f"Error fetching liked posts: {e}")
+            return {user_id: [] for user_id in user_ids}
+    
+    @timed("mongo")
+    def get_user_interaction_events(self, user_id: str, limit: int = 200) -> List[Dict[str, Any]]:
+        """
+        Get user's most recent likes and comments with their timestamps
+        
+        Args:
+            user_id: User ID
+            limit: Maximum number of events to return per interaction type
+            
+        Returns:
+            List of dictionaries with 'post_id', 'type' ('like' or 'comment') and 'timestamp'
+        """
+        try:
+            events = []
+            sources = [("like", self.db.postreactions), ("comment", self.db.comments)]
+            
+            for interaction_type, collection in sources:
+                cursor = collection.find(
+                    {"userId": ObjectId(user_id)},
+                    {"postId": 1, "createdAt": 1}
+                ).sort("createdAt", -1).limit(limit)
+                
+                for doc in cursor:
+                    events.append({
+                        "post_id": str(doc["postId"]),
+                        "type": interaction_type,
+                        # Fall back to the ObjectId creation time for documents without timestamps
+                        "timestamp": doc.get("createdAt") or doc["_id"].generation_time
+                    })
+            
+            return events
+        except Exception as e:
+            print(f"Error fetching user interaction events: {e}")
+            return []
+    
+    @timed("mongo")
+    def save_collection_version(self, version: int, model_name: str, dimension: int):
+        """
+        Record which embedding model a collection version is built with
+        
+        Every worker reads this to encode queries with the model of the version the
+        aliases point at.
+        
+        Args:
+            version: Collection version
+            model_name: Embedding model
+            dimension: Embedding dimension
+        """
+        self.db.ai_collection_versions.update_one(
+            {"_id": version},
+            {"$set": {"model": model_name, "dimension": dimension}},
+            upsert=True
+        )
+    
+    @timed("mongo")
+    def get_collection_version(self, version: int) -> Optional[Dict[str, Any]]:
+        """
+        Get the embedding model a collection version is built with
+        
+        Args:
+            version: Collection version
+            
+        Returns:
+            Document with 'model' and 'dimension', or None if the version was never recorded
+        """
+        return self.db.ai_collection_versions.find_one({"_id": version})
+    
+    @timed("mongo")
+    def ping(self) -> bool:
+        """Check the connection with a server round-trip (no collection access)"""
+        try:
+            self.client.admin.command("ping")
+            return True
+        except Exception as e:
+            print(f"MongoDB ping failed: {e}")
+            return False
+    
     def close(self):
         """Close MongoDB connection"""
         self.client.close()
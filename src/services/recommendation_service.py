@@ -1,12 +1,26 @@
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Optional
+from datetime import datetime, timezone
+import threading
+import time
+import numpy as np
+from src.core.config import settings
+from src.core.metrics import timed, stage_timer, record_cache
+from src.utils.single_flight import single_flight
 from src.services.embeddings_service import EmbeddingsService
 from src.services.vector_db_service import VectorDBService
 from src.services.mongo_service import MongoService
+from src.utils.helpers import (
+    recency_weight, merge_recommendations,
+    build_user_card, build_post_card, USER_CARD_FIELDS, POST_CARD_FIELDS
+)
 
 
 class RecommendationService:
     """Service for generating recommendations"""
     
+    # Interest updates of a user are serialized on one of these locks (by user ID hash)
+    INTEREST_LOCK_STRIPES = 64
+    
     def __init__(
         self,
         embeddings_service: EmbeddingsService,
@@ -17,7 +31,22 @@ class RecommendationService:
         self.embeddings = embeddings_service
         self.vector_db = vector_db_service
         self.mongo = mongo_service
+        # Set by ReindexService while a new collection version is being compared
+        self.shadow_reader = None
+        self._interest_locks = [threading.Lock() for _ in range(self.INTEREST_LOCK_STRIPES)]
+    
+    def _interest_lock(self, user_id: str) -> threading.Lock:
+        """Lock guarding the read-modify-write of a user's interest vector"""
+        return self._interest_locks[hash(user_id) % self.INTEREST_LOCK_STRIPES]
     
+    def _shadow(self, method: str, kwargs: Dict[str, Any], result_ids: List[str]):
+        """Hand a completed read to the shadow reader, if one is attached"""
+        shadow_reader = self.shadow_reader
+        if shadow_reader is not None:
+            shadow_reader.shadow(method, kwargs, result_ids)
+    
+    @single_flight()
+    @timed("recommendation")
     def recommend_users(
         self,
         user_id: str,
@@ -58,11 +87,13 @@ class RecommendationService:
         )
         
         # Extract user IDs and scores
-        user_ids = [u["user_id"] for u in similar_users[:limit]]
-        scores = [u["score"] for u in similar_users[:limit]]
+        user_ids = [u.id for u in similar_users[:limit]]
+        scores = [u.score for u in similar_users[:limit]]
         
         return user_ids, scores
     
+    @single_flight()
+    @timed("recommendation")
     def recommend_posts(
         self,
         user_id: str,
@@ -78,32 +109,66 @@ class RecommendationService:
         Returns:
             Tuple of (post_ids, scores)
         """
-        # Get user data
-        user = self.mongo.get_user_by_id(user_id)
-        if not user:
-            print(f"User {user_id} not found")
-            return [], []
+        # Stored vectors avoid a profile fetch and model inference
+        user_vectors = self.vector_db.get_user_vectors(user_id)
+        profile_embedding = user_vectors.get(VectorDBService.USER_PROFILE_VECTOR)
+        interest_embedding = user_vectors.get(VectorDBService.USER_INTEREST_VECTOR)
+        record_cache("user_vectors", bool(user_vectors))
+        
+        if profile_embedding is None and interest_embedding is None:
+            # Fall back to content-based filtering using the user profile
+            user = self.mongo.get_user_by_id(user_id)
+            if not user:
+                print(f"User {user_id} not found")
+                return [], []
+            profile_embedding = self.embeddings.generate_user_embedding(user)
         
         # Get user's interaction history
         interactions = self.mongo.get_user_interactions(user_id)
-        liked_posts = interactions.get("liked_posts", [])
+        liked_posts = interactions.get("liked_posts", [])  # Don't recommend already liked posts
         
-        # Strategy 1: Content-based filtering using user profile
-        user_embedding = self.embeddings.generate_user_embedding(user)
+        if profile_embedding is None or interest_embedding is None:
+            # Single signal: one search
+            similar_posts = self.vector_db.search_similar_posts(
+                embedding=interest_embedding if interest_embedding is not None else profile_embedding,
+                limit=limit,
+                exclude_post_ids=liked_posts
+            )
+            post_ids = [p.id for p in similar_posts]
+            scores = [p.score for p in similar_posts]
+            self._shadow("recommend_posts", {"user_id": user_id, "limit": limit}, post_ids)
+            return post_ids, scores
         
-        # Search for posts similar to user's interests
-        similar_posts = self.vector_db.search_similar_posts(
-            embedding=user_embedding,
-            limit=limit,
-            exclude_post_ids=liked_posts  # Don't recommend already liked posts
+        # Both signals: search with interest and profile vectors in one round-trip
+        query = {
+            "vector_name": VectorDBService.POST_CONTENT_VECTOR,
+            "limit": limit,
+            "exclude_ids": liked_posts,
+        }
+        interest_posts, profile_posts = self.vector_db.search_batch(
+            self.vector_db.POSTS_COLLECTION,
+            [
+                {**query, "embedding": interest_embedding},
+                {**query, "embedding": profile_embedding},
+            ]
         )
         
-        # Extract post IDs and scores
-        post_ids = [p["post_id"] for p in similar_posts]
-        scores = [p["score"] for p in similar_posts]
+        with stage_timer("recommendation", "merge"):
+            merged = merge_recommendations(
+                [(p.id, p.score) for p in interest_posts],
+                [(p.id, p.score) for p in profile_posts],
+                weight1=settings.INTEREST_BLEND_WEIGHT,
+                weight2=1.0 - settings.INTEREST_BLEND_WEIGHT
+            )[:limit]
+        
+        post_ids = [p[0] for p in merged]
+        scores = [p[1] for p in merged]
+        self._shadow("recommend_posts", {"user_id": user_id, "limit": limit}, post_ids)
         
         return post_ids, scores
     
+    @single_flight()
+    @timed("recommendation")
     def recommend_posts_collaborative(
         self,
         user_id: str,
@@ -130,13 +195,12 @@ class RecommendationService:
         if not similar_user_ids:
             return [], []
         
-        # Get posts liked by similar users
-        all_post_ids = []
+        # Get posts liked by similar users (one query for all of them)
+        liked_by_user = self.mongo.get_liked_posts_by_users(similar_user_ids)
         post_score_map = {}
         
         for similar_user_id, user_score in zip(similar_user_ids, user_scores):
-            interactions = self.mongo.get_user_interactions(similar_user_id)
-            liked_posts = interactions.get("liked_posts", [])
+            liked_posts = liked_by_user.get(similar_user_id, [])
             
             # Weight posts by how similar the user is
             for post_id in liked_posts:
@@ -156,6 +220,8 @@ class RecommendationService:
         
         return post_ids, scores
     
+    @single_flight()
+    @timed("recommendation")
     def search_posts_semantic(
         self,
         query: str,
@@ -181,11 +247,14 @@ class RecommendationService:
         )
         
         # Extract post IDs and scores
-        post_ids = [p["post_id"] for p in similar_posts]
-        scores = [p["score"] for p in similar_posts]
+        post_ids = [p.id for p in similar_posts]
+        scores = [p.score for p in similar_posts]
+        self._shadow("search_posts_semantic", {"query": query, "limit": limit}, post_ids)
         
         return post_ids, scores
     
+    @single_flight()
+    @timed("recommendation")
     def search_users_semantic(
         self,
         query: str,
@@ -211,8 +280,271 @@ class RecommendationService:
         )
         
         # Extract user IDs and scores
-        user_ids = [u["user_id"] for u in similar_users]
-        scores = [u["score"] for u in similar_users]
+        user_ids = [u.id for u in similar_users]
+        scores = [u.score for u in similar_users]
+        self._shadow("search_users_semantic", {"query": query, "limit": limit}, user_ids)
         
         return user_ids, scores
+    
+    @single_flight("search_posts_semantic")
+    @timed("recommendation")
+    async def search_posts_semantic_async(
+        self,
+        query: str,
+        limit: int = 20
+    ) -> Tuple[List[str], List[float]]:
+        """
+        Async variant of search_posts_semantic: awaits the query embedding from the
+        inference scheduler and searches with the async Qdrant client
+        
+        Args:
+            query: Search query text
+            limit: Number of results to return
+            
+        Returns:
+            Tuple of (post_ids, scores)
+        """
+        query_embedding = await self.embeddings.generate_embedding_async(query)
+        
+        similar_posts = await self.vector_db.search_async(
+            self.vector_db.POSTS_COLLECTION,
+            query_embedding,
+            VectorDBService.POST_CONTENT_VECTOR,
+            limit=limit
+        )
+        
+        post_ids = [p.id for p in similar_posts]
+        scores = [p.score for p in similar_posts]
+        self._shadow("search_posts_semantic", {"query": query, "limit": limit}, post_ids)
+        
+        return post_ids, scores
+    
+    @single_flight("search_users_semantic")
+    @timed("recommendation")
+    async def search_users_semantic_async(
+        self,
+        query: str,
+        limit: int = 10
+    ) -> Tuple[List[str], List[float]]:
+        """
+        Async variant of search_users_semantic
+        
+        Args:
+            query: Search query text
+            limit: Number of results to return
+            
+        Returns:
+            Tuple of (user_ids, scores)
+        """
+        query_embedding = await self.embeddings.generate_embedding_async(query)
+        
+        similar_users = await self.vector_db.search_async(
+            self.vector_db.USERS_COLLECTION,
+            query_embedding,
+            VectorDBService.USER_PROFILE_VECTOR,
+            limit=limit
+        )
+        
+        user_ids = [u.id for u in similar_users]
+        scores = [u.score for u in similar_users]
+        self._shadow("search_users_semantic", {"query": query, "limit": limit}, user_ids)
+        
+        return user_ids, scores
+
 
+    
+    @timed("recommendation")
+    def hydrate_users(self, user_ids: List[str], scores: List[float]) -> List[Dict[str, Any]]:
+        """
+        Turn user results into cards with one projected MongoDB query
+        
+        Args:
+            user_ids: Result user IDs, best first
+            scores: Score of each result
+            
+        Returns:
+            Cards in result order (users missing from MongoDB are skipped)
+        """
+        if not user_ids:
+            return []
+        users = {str(user['_id']): user for user in self.mongo.get_users_by_ids(user_ids, fields=USER_CARD_FIELDS)}
+        return [
+            build_user_card(users[user_id], score)
+            for user_id, score in zip(user_ids, scores)
+            if user_id in users
+        ]
+    
+    @timed("recommendation")
+    def hydrate_posts(self, post_ids: List[str], scores: List[float]) -> List[Dict[str, Any]]:
+        """
+        Turn post results into cards with one projected MongoDB query
+        
+        Args:
+            post_ids: Result post IDs, best first
+            scores: Score of each result
+            
+        Returns:
+            Cards in result order (posts missing from MongoDB are skipped)
+        """
+        if not post_ids:
+            return []
+        posts = {str(post['_id']): post for post in self.mongo.get_posts_by_ids(post_ids, fields=POST_CARD_FIELDS)}
+        return [
+            build_post_card(posts[post_id], score)
+            for post_id, score in zip(post_ids, scores)
+            if post_id in posts
+        ]
+    
+    def _interaction_weight(self, interaction_type: str) -> float:
+        """Base weight of an interaction before recency decay"""
+        if interaction_type == "comment":
+            return settings.INTEREST_COMMENT_WEIGHT
+        return settings.INTEREST_LIKE_WEIGHT
+    
+    @staticmethod
+    def _to_epoch(timestamp: Optional[datetime]) -> float:
+        """Convert a (possibly naive UTC) datetime from MongoDB to epoch seconds"""
+        if timestamp is None:
+            return time.time()
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        return timestamp.timestamp()
+    
+    @timed("recommendation")
+    def record_interaction(
+        self,
+        user_id: str,
+        post_id: str,
+        interaction_type: str = "like",
+        timestamp: Optional[datetime] = None
+    ) -> bool:
+        """
+        Fold a new like or comment into the user's interest vector
+        
+        The interest vector is a recency-weighted mean of interacted post embeddings.
+        Older contributions decay exponentially with INTEREST_HALF_LIFE_DAYS, so the
+        update only needs the previous mean, its total weight and its timestamp.
+        
+        Updates of one user are serialized within this process only; Qdrant has no
+        conditional write, so concurrent updates of the same user in different
+        workers can still drop a contribution (rebuild_user_interest repairs it).
+        
+        Args:
+            user_id: ID of the user who interacted
+            post_id: ID of the post that was liked or commented on
+            interaction_type: 'like' or 'comment'
+            timestamp: When the interaction happened (defaults to now)
+            
+        Returns:
+            True if the interest vector was updated, False if the post has no embedding
+        """
+        post_vectors = self.vector_db.get_post_vectors([post_id])
+        if post_id not in post_vectors:
+            print(f"Post {post_id} has no embedding, skipping interest update")
+            return False
+        
+        now = self._to_epoch(timestamp)
+        half_life = settings.INTEREST_HALF_LIFE_DAYS * 86400
+        event_weight = self._interaction_weight(interaction_type)
+        post_vector = np.asarray(post_vectors[post_id], dtype=np.float32)
+        
+        # Concurrent interactions of the same user would otherwise both read the old
+        # mean and the last write would drop the other's contribution. The lock only
+        # covers this process: with several workers, see DEPLOYMENT.md
+        with self._interest_lock(user_id):
+            interest = self.vector_db.get_user_interest(user_id)
+            if interest:
+                vector, state = interest
+                # Qdrant stores cosine vectors normalized, so rescale to the stored mean
+                previous_mean = np.asarray(vector, dtype=np.float32) * state.get("interest_norm", 1.0)
+                previous_weight = state.get("interest_weight", 0.0) * recency_weight(
+                    now - state.get("interest_updated_at", now), half_life
+                )
+                total_weight = previous_weight + event_weight
+                mean = (previous_mean * previous_weight + post_vector * event_weight) / total_weight
+                updated_at = max(now, state.get("interest_updated_at", now))
+            else:
+                total_weight = event_weight
+                mean = post_vector
+                updated_at = now
+            
+            interest = self._interest_state(mean, total_weight, updated_at)
+            if interest is None:
+                return False
+            
+            self.vector_db.upsert_user_interest(user_id, interest[0], interest[1])
+        return True
+    
+    @timed("recommendation")
+    def compute_user_interest(self, user_id: str) -> Optional[Tuple[List[float], Dict[str, Any]]]:
+        """
+        Compute a user's interest vector from their interaction history without storing it
+        
+        Args:
+            user_id: User ID
+            
+        Returns:
+            Tuple of (unit interest vector, state payload), or None if the user has no usable interactions
+        """
+        events = self.mongo.get_user_interaction_events(
+            user_id,
+            limit=settings.INTEREST_HISTORY_LIMIT
+        )
+        if not events:
+            return None
+        
+        post_vectors = self.vector_db.get_post_vectors(
+            list({event["post_id"] for event in events})
+        )
+        
+        now = time.time()
+        half_life = settings.INTEREST_HALF_LIFE_DAYS * 86400
+        weighted_sum = None
+        total_weight = 0.0
+        
+        for event in events:
+            vector = post_vectors.get(event["post_id"])
+            if vector is None:
+                continue
+            weight = self._interaction_weight(event["type"]) * recency_weight(
+                now - self._to_epoch(event["timestamp"]), half_life
+            )
+            contribution = np.asarray(vector, dtype=np.float32) * weight
+            weighted_sum = contribution if weighted_sum is None else weighted_sum + contribution
+            total_weight += weight
+        
+        if weighted_sum is None or total_weight <= 0:
+            return None
+        
+        return self._interest_state(weighted_sum / total_weight, total_weight, now)
+    
+    def rebuild_user_interest(self, user_id: str) -> bool:
+        """
+        Recompute a user's interest vector from their full interaction history
+        
+        Args:
+            user_id: User ID
+            
+        Returns:
+            True if an interest vector was stored, False if the user has no usable interactions
+        """
+        with self._interest_lock(user_id):
+            interest = self.compute_user_interest(user_id)
+            if interest is None:
+                return False
+            
+            self.vector_db.upsert_user_interest(user_id, interest[0], interest[1])
+        return True
+    
+    @staticmethod
+    def _interest_state(mean: np.ndarray, weight: float, updated_at: float) -> Optional[Tuple[List[float], Dict[str, Any]]]:
+        """Split an interest mean into the unit vector Qdrant stores and the state needed for incremental updates"""
+        norm = float(np.linalg.norm(mean))
+        if norm == 0.0:
+            return None
+        
+        return (mean / norm).tolist(), {
+            "interest_weight": float(weight),
+            "interest_norm": norm,
+            "interest_updated_at": float(updated_at),
+        }
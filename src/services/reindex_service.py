@@ -0,0 +1,365 @@
+from typing import List, Dict, Any, Optional, Callable
+from concurrent.futures import ThreadPoolExecutor
+import random
+import threading
+import time
+from src.core.config import settings
+from src.core.metrics import BACKGROUND_QUEUE_DEPTH
+from src.services.embeddings_service import EmbeddingsService
+from src.services.vector_db_service import VectorDBService
+from src.services.mongo_service import MongoService
+from src.services.recommendation_service import RecommendationService
+from src.utils.helpers import build_user_metadata, build_post_metadata
+
+
+class ReindexService:
+    """
+    Service for zero-downtime model upgrades via versioned collections
+
+    A new version ('users_v{n}' / 'posts_v{n}') is built in a background thread with
+    its own embedding model while live traffic keeps using the 'users' / 'posts'
+    aliases. Writes are mirrored to the new version, reads can be shadowed against it
+    for comparison, and promotion swaps the aliases atomically.
+
+    The build, mirrored writes and shadow reads run in the process that started the
+    job. Every process follows promotions: the model of each version is recorded in
+    MongoDB, and sync_live_version (run periodically by the app) loads the model of
+    the version the aliases point at.
+    """
+
+    def __init__(
+        self,
+        recommendation_service: RecommendationService,
+        vector_db_service: VectorDBService,
+        mongo_service: MongoService,
+        on_promote: Optional[Callable[[EmbeddingsService], None]] = None
+    ):
+        """
+        Initialize reindex service with dependencies
+
+        Args:
+            recommendation_service: Live recommendation service (shadow reads hook into it)
+            vector_db_service: Live vector database service
+            mongo_service: MongoDB service
+            on_promote: Called with the new embeddings service once its version is live
+        """
+        self.live = recommendation_service
+        self.vector_db = vector_db_service
+        self.mongo = mongo_service
+        self.on_promote = on_promote
+
+        self.job: Optional[Dict[str, Any]] = None
+        self.candidate: Optional[RecommendationService] = None
+        self.shadow_sample_rate = 0.0
+        self.shadow_stats = self._empty_shadow_stats()
+
+        self._lock = threading.Lock()
+        self._pending = 0
+        # Single worker: shadow reads and mirrored writes never compete with live traffic for threads
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reindex")
+
+        # Collection the 'posts' alias pointed at when this process last synced its query model,
+        # and its version. The live model is self.live.embeddings; settings only name the
+        # model a process starts with
+        self.live_target: Optional[str] = None
+        self.live_version: Optional[int] = None
+
+    @staticmethod
+    def _empty_shadow_stats() -> Dict[str, Any]:
+        return {"compared": 0, "dropped": 0, "errors": 0, "overlap_sum": 0.0, "top1_matches": 0}
+
+    def status(self) -> Dict[str, Any]:
+        """Get the current job state and shadow-read comparison summary"""
+        stats = dict(self.shadow_stats)
+        compared = stats["compared"]
+        stats["mean_overlap"] = stats.pop("overlap_sum") / compared if compared else None
+        stats["top1_agreement"] = stats["top1_matches"] / compared if compared else None
+
+        return {
+            "live_version": self.live_version,
+            "live_model": self.live.embeddings.model_name,
+            "job": dict(self.job) if self.job else None,
+            "shadow_sample_rate": self.shadow_sample_rate,
+            "shadow": stats,
+        }
+
+    def start(self, version: int, model_name: str, dimension: int) -> Dict[str, Any]:
+        """
+        Start building a new collection version in the background
+
+        Args:
+            version: Version number of the new collections
+            model_name: Embedding model for the new version
+            dimension: Embedding dimension of that model
+
+        Returns:
+            The job state
+        """
+        with self._lock:
+            if self.job and self.job["status"] == "building":
+                raise RuntimeError(f"Version {self.job['version']} is already being built")
+
+            live_target = self.vector_db.get_alias_target(self.vector_db.POSTS_COLLECTION)
+            if live_target == VectorDBService.versioned_name(self.vector_db.POSTS_COLLECTION, version):
+                raise ValueError(f"Version {version} is already live")
+
+            self.job = {
+                "version": version,
+                "model": model_name,
+                "dimension": dimension,
+                "status": "building",
+                "users_indexed": 0,
+                "posts_indexed": 0,
+                "interest_vectors_built": 0,
+                "started_at": time.time(),
+                "finished_at": None,
+                "error": None,
+            }
+            self.candidate = None
+            self.shadow_stats = self._empty_shadow_stats()
+
+        threading.Thread(target=self._build, args=(dict(self.job),), daemon=True).start()
+        return dict(self.job)
+
+    def _build(self, job: Dict[str, Any]):
+        """Build the new version: posts first, then users and their interest vectors"""
+        try:
+            self.mongo.save_collection_version(job["version"], job["model"], job["dimension"])
+            embeddings = EmbeddingsService(model_name=job["model"], dimension=job["dimension"])
+            view = self.vector_db.for_version(job["version"], dimension=job["dimension"])
+            view.create_collection(view.USERS_COLLECTION)
+            view.create_collection(view.POSTS_COLLECTION)
+
+            # Mirror live writes from here on so the new version doesn't miss updates
+            candidate = RecommendationService(embeddings, view, self.mongo)
+            self.candidate = candidate
+            batch_size = settings.REINDEX_BATCH_SIZE
+
+            posts = self.mongo.get_all_posts()
+            for start in range(0, len(posts), batch_size):
+                batch = posts[start:start + batch_size]
+                self._index_posts(candidate, batch)
+                self.job["posts_indexed"] += len(batch)
+
+            users = self.mongo.get_all_users()
+            for start in range(0, len(users), batch_size):
+                batch = users[start:start + batch_size]
+                self._index_users(candidate, batch)
+                self.job["users_indexed"] += len(batch)
+
+            # Interest vectors depend on the new post vectors, so they come last
+            for user in users:
+                try:
+                    if candidate.rebuild_user_interest(str(user['_id'])):
+                        self.job["interest_vectors_built"] += 1
+                except Exception as e:
+                    print(f"Error building interest vector for user {user.get('_id')}: {e}")
+
+            self.job["status"] = "ready"
+            print(f"Collection version {job['version']} built successfully")
+        except Exception as e:
+            import traceback
+            print(f"Error building collection version {job['version']}: {traceback.format_exc()}")
+            self.job["status"] = "failed"
+            self.job["error"] = str(e)
+            self.candidate = None
+        finally:
+            self.job["finished_at"] = time.time()
+
+    @staticmethod
+    def _index_posts(candidate: RecommendationService, posts: List[Dict[str, Any]]):
+        """Encode and upsert a batch of posts into the candidate version"""
+        embeddings = candidate.embeddings.encode_posts(posts).tolist()
+        candidate.vector_db.upsert_batch(
+            candidate.vector_db.POSTS_COLLECTION,
+            [
+                {
+                    "id": str(post['_id']),
+                    "vectors": {VectorDBService.POST_CONTENT_VECTOR: embedding},
+                    "payload": build_post_metadata(post),
+                }
+                for post, embedding in zip(posts, embeddings)
+            ]
+        )
+
+    @staticmethod
+    def _index_users(candidate: RecommendationService, users: List[Dict[str, Any]]):
+        """Encode and upsert a batch of user profiles into the candidate version"""
+        embeddings = candidate.embeddings.generate_embeddings_batch(
+            [candidate.embeddings.user_text(user) for user in users]
+        )
+        # Keeps interest vectors already built in the candidate (mirrored profile edits)
+        candidate.vector_db.upsert_user_embeddings_batch([
+            {"id": str(user['_id']), "embedding": embedding, "metadata": build_user_metadata(user)}
+            for user, embedding in zip(users, embeddings)
+        ])
+
+    def _submit(self, fn: Callable, *args) -> bool:
+        """Run work on the background worker, dropping it if the backlog is full"""
+        with self._lock:
+            if self._pending >= settings.SHADOW_READ_MAX_PENDING:
+                return False
+            self._pending += 1
+            BACKGROUND_QUEUE_DEPTH.labels("reindex").set(self._pending)
+
+        def run():
+            try:
+                fn(*args)
+            finally:
+                with self._lock:
+                    self._pending -= 1
+                    BACKGROUND_QUEUE_DEPTH.labels("reindex").set(self._pending)
+
+        self._executor.submit(run)
+        return True
+
+    def mirror_post(self, post: Dict[str, Any]):
+        """Write a created/updated post to the version being built (no-op otherwise)"""
+        self.mirror_posts([post])
+
+    def mirror_posts(self, posts: List[Dict[str, Any]]):
+        """Write created/updated posts to the version being built in one batch (no-op otherwise)"""
+        candidate = self.candidate
+        if candidate is not None and posts:
+            self._submit(self._index_posts, candidate, posts)
+
+    def mirror_user(self, user: Dict[str, Any]):
+        """Write a created/updated user to the version being built (no-op otherwise)"""
+        self.mirror_users([user])
+
+    def mirror_users(self, users: List[Dict[str, Any]]):
+        """Write created/updated users to the version being built in one batch (no-op otherwise)"""
+        candidate = self.candidate
+        if candidate is not None and users:
+            self._submit(self._index_users, candidate, users)
+
+    def mirror_interaction(self, user_id: str, post_id: str, interaction_type: str):
+        """Fold an interaction into the version being built (no-op otherwise)"""
+        candidate = self.candidate
+        if candidate is not None:
+            self._submit(candidate.record_interaction, user_id, post_id, interaction_type)
+
+    def set_shadow(self, sample_rate: float):
+        """
+        Enable or disable shadow reads against the candidate version
+
+        Args:
+            sample_rate: Fraction of live reads to replay (0 disables shadowing)
+        """
+        self.shadow_sample_rate = max(0.0, min(1.0, sample_rate))
+        self.live.shadow_reader = self if self.shadow_sample_rate > 0 else None
+
+    def shadow(self, method: str, kwargs: Dict[str, Any], primary_ids: List[str]):
+        """
+        Replay a live read against the candidate version and record how results compare
+
+        Runs off the request path; if the worker is backed up the sample is dropped.
+
+        Args:
+            method: RecommendationService method name
+            kwargs: Arguments the live call was made with
+            primary_ids: IDs returned by the live call
+        """
+        candidate = self.candidate
+        if candidate is None or self.job is None or self.job["status"] != "ready":
+            return
+        if random.random() >= self.shadow_sample_rate:
+            return
+
+        if not self._submit(self._compare, candidate, method, kwargs, primary_ids):
+            self.shadow_stats["dropped"] += 1
+
+    def _compare(self, candidate: RecommendationService, method: str, kwargs: Dict[str, Any], primary_ids: List[str]):
+        """Run the shadow read and accumulate overlap statistics"""
+        try:
+            shadow_ids, _ = getattr(candidate, method)(**kwargs)
+        except Exception as e:
+            print(f"Shadow read for {method} failed: {e}")
+            self.shadow_stats["errors"] += 1
+            return
+
+        k = max(len(primary_ids), len(shadow_ids))
+        overlap = len(set(primary_ids) & set(shadow_ids)) / k if k else 1.0
+
+        self.shadow_stats["compared"] += 1
+        self.shadow_stats["overlap_sum"] += overlap
+        if primary_ids[:1] == shadow_ids[:1]:
+            self.shadow_stats["top1_matches"] += 1
+
+    def promote(self, drop_unversioned: bool = False) -> Dict[str, Any]:
+        """
+        Point the 'users' and 'posts' aliases at the built version
+
+        Both aliases move in one request. This process encodes queries with the new
+        model right away; other processes switch on their next live version sync
+        (LIVE_VERSION_REFRESH_SECONDS).
+
+        Args:
+            drop_unversioned: Replace unversioned 'users' / 'posts' collections (see
+                VectorDBService.swap_aliases)
+
+        Returns:
+            Dictionary with the new and previous collection names
+        """
+        with self._lock:
+            if not self.job or self.job["status"] != "ready" or self.candidate is None:
+                raise RuntimeError("No built version is ready to promote")
+            candidate = self.candidate
+
+        targets = {
+            self.vector_db.POSTS_COLLECTION: candidate.vector_db.POSTS_COLLECTION,
+            self.vector_db.USERS_COLLECTION: candidate.vector_db.USERS_COLLECTION,
+        }
+        self.mongo.save_collection_version(self.job["version"], self.job["model"], self.job["dimension"])
+        previous = self.vector_db.swap_aliases(targets, drop_unversioned=drop_unversioned)
+        swapped = {
+            alias: {"collection": collection_name, "previous": previous[alias]}
+            for alias, collection_name in targets.items()
+        }
+
+        # Queries must now be encoded with the new model
+        self.set_shadow(0.0)
+        self._use_embeddings(candidate.embeddings, self.job["version"])
+        self.live_target = candidate.vector_db.POSTS_COLLECTION
+
+        self.job["status"] = "promoted"
+        self.candidate = None
+        print(f"Promoted collection version {self.job['version']}: {swapped}")
+
+        return swapped
+
+    def _use_embeddings(self, embeddings: EmbeddingsService, version: int):
+        """Encode live queries with the model of a collection version"""
+        self.vector_db.dimension = embeddings.dimension
+        self.live.embeddings = embeddings
+        self.live_version = version
+        if self.on_promote:
+            self.on_promote(embeddings)
+
+    def sync_live_version(self) -> bool:
+        """
+        Load the model of the version the 'posts' alias points at, if it changed (blocking)
+
+        Picks up promotions made by other processes. Versions without a recorded
+        model (built before models were recorded) keep the current one.
+
+        Returns:
+            True if the query model was switched
+        """
+        target = self.vector_db.get_alias_target(self.vector_db.POSTS_COLLECTION)
+        if target is None or target == self.live_target:
+            return False
+
+        version = VectorDBService.version_of(target)
+        record = self.mongo.get_collection_version(version) if version is not None else None
+        live = self.live.embeddings
+        if record is None or (record["model"], record["dimension"]) == (live.model_name, live.dimension):
+            self.live_target = target
+            self.live_version = version
+            return False
+
+        print(f"Collection version {version} was promoted elsewhere, loading its model {record['model']}")
+        embeddings = EmbeddingsService(model_name=record["model"], dimension=record["dimension"])
+        self._use_embeddings(embeddings, version)
+        self.live_target = target
+        return True
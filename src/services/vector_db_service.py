@@ -1,113 +1,1013 @@
-from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue
-from typing import List, Dict, Any, Optional
+from qdrant_client import QdrantClient, AsyncQdrantClient
+from qdrant_client.models import (
+    Distance, VectorParams, PointStruct, PointVectors, Filter, FieldCondition, MatchAny,
+    PointsList, UpdateVectors, SetPayload, UpsertOperation, UpdateVectorsOperation, SetPayloadOperation,
+    NamedVector, SearchRequest, ScoredPoint,
+    CreateAlias, CreateAliasOperation, DeleteAlias, DeleteAliasOperation,
+    HnswConfigDiff, VectorParamsDiff, SearchParams, QuantizationSearchParams,
+    ScalarQuantization, ScalarQuantizationConfig, ScalarType,
+    BinaryQuantization, BinaryQuantizationConfig, Disabled
+)
+from typing import List, Dict, Any, Optional, Tuple, Union
 from src.core.config import settings
+from src.core.metrics import timed, observe_batch
+from src.core.tracing import set_span_attributes
+from src.services.local_vector_store import LocalVectorStore
+import copy
+import re
+import httpx
+import anyio.to_thread
 import uuid
 import os
 
 
+class LegacyCollectionError(RuntimeError):
+    """Raised when a collection from before named vectors holds the 'users' or 'posts' name"""
+
+
+class SearchHit:
+    """
+    One search result: the entity's MongoDB ID, its score and any requested payload fields
+    
+    Uses __slots__ since searches build one per hit on the request path.
+    """
+    __slots__ = ("id", "score", "payload")
+    
+    def __init__(self, id: str, score: float, payload: Optional[Dict[str, Any]] = None):
+        self.id = id
+        self.score = score
+        self.payload = payload
+    
+    def __repr__(self) -> str:
+        return f"SearchHit(id={self.id!r}, score={self.score:.4f})"
+
+
 class VectorDBService:
-    """Service for Qdrant vector database operations"""
+    """
+    Service for vector database operations
+    
+    The backend is a QdrantClient, or a LocalVectorStore (in-process NumPy store with
+    the same API subset) when VECTOR_BACKEND is "local".
+    """
     
     # Collection names
     USERS_COLLECTION = "users"
     POSTS_COLLECTION = "posts"
     
-    def __init__(self):
-        """Initialize Qdrant client"""
+    # Named vectors in the users collection
+    USER_PROFILE_VECTOR = "profile"
+    USER_INTEREST_VECTOR = "interest"
+    
+    # Named vectors in the posts collection
+    POST_CONTENT_VECTOR = "content"
+    
+    # Named vectors stored per collection (extra vectors from settings are added to each)
+    COLLECTION_VECTORS = {
+        USERS_COLLECTION: [USER_PROFILE_VECTOR, USER_INTEREST_VECTOR],
+        POSTS_COLLECTION: [POST_CONTENT_VECTOR],
+    }
+    
+    # Payload field holding the MongoDB ID of each point
+    ID_FIELDS = {
+        USERS_COLLECTION: "user_id",
+        POSTS_COLLECTION: "post_id",
+    }
+    
+    # Payload fields describing the state of a user's interest vector
+    INTEREST_PAYLOAD_FIELDS = ["interest_weight", "interest_norm", "interest_updated_at"]
+    
+    def __init__(self, client: Optional[Union[QdrantClient, LocalVectorStore]] = None):
+        """
+        Initialize the vector store client
+        
+        Args:
+            client: Pre-built client (e.g. a local or in-memory Qdrant for benchmarks);
+                connects using settings when omitted
+        """
+        backend = settings.VECTOR_BACKEND.lower()
+        # Arguments for the AsyncQdrantClient, when connecting to a Qdrant server from settings
+        self._async_options: Optional[Dict[str, Any]] = None
+        self._async_client: Optional[AsyncQdrantClient] = None
+        
+        if client is not None:
+            self.client = client
+        elif backend == "local":
+            path = settings.LOCAL_VECTOR_PATH or None
+            print(f"Opening local vector store at {path or 'memory'}")
+            self.client = LocalVectorStore(path)
+        elif backend != "qdrant":
+            raise ValueError(f"Unknown VECTOR_BACKEND '{settings.VECTOR_BACKEND}', expected 'qdrant' or 'local'")
+        else:
+            options = self.connection_options()
+            transport = "gRPC" if settings.QDRANT_PREFER_GRPC else "REST"
+            if "url" in options:
+                # Qdrant Cloud connection (uses HTTPS, no port)
+                print(f"Connecting to Qdrant Cloud at {options['url']} ({transport})")
+            else:
+                # Local Qdrant connection (uses host:port)
+                print(f"Connecting to Qdrant at {settings.QDRANT_HOST}:{settings.QDRANT_PORT} ({transport})")
+            self.client = QdrantClient(**options)
+            self._async_options = options
+        
+        self.dimension = settings.EMBEDDING_DIMENSION
+        self.search_params = self.build_search_params()
+        print("Vector store connected successfully")
+    
+    @staticmethod
+    def connection_options() -> Dict[str, Any]:
+        """
+        QdrantClient / AsyncQdrantClient arguments from settings
+        
+        qdrant-client turns keep-alive off for localhost unless pool limits are given,
+        so they are always passed explicitly: searches then reuse open connections
+        instead of paying a TCP handshake each.
+        """
         # Check if using Qdrant Cloud (has API key)
         qdrant_api_key = os.getenv('QDRANT_API_KEY') or settings.QDRANT_API_KEY
-        
         if qdrant_api_key:
-            # Qdrant Cloud connection (uses HTTPS, no port)
-            qdrant_url = f"https://{settings.QDRANT_HOST}"
-            print(f"Connecting to Qdrant Cloud at {qdrant_url}")
-            self.client = QdrantClient(
-                url=qdrant_url,
-                api_key=qdrant_api_key
-            )
+            location = {"url": f"https://{settings.QDRANT_HOST}", "api_key": qdrant_api_key}
         else:
-            # Local Qdrant connection (uses host:port)
-            print(f"Connecting to Qdrant at {settings.QDRANT_HOST}:{settings.QDRANT_PORT}")
-            self.client = QdrantClient(
-                host=settings.QDRANT_HOST,
-                port=settings.QDRANT_PORT
+            location = {"host": settings.QDRANT_HOST, "port": settings.QDRANT_PORT}
+        
+        return {
+            **location,
+            "prefer_grpc": settings.QDRANT_PREFER_GRPC,
+            "grpc_port": settings.QDRANT_GRPC_PORT,
+            "timeout": settings.QDRANT_TIMEOUT,
+            "http2": settings.QDRANT_HTTP2,
+            "limits": httpx.Limits(
+                max_connections=settings.QDRANT_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.QDRANT_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.QDRANT_KEEPALIVE_SECONDS
+            ),
+            "grpc_options": {
+                "grpc.keepalive_time_ms": int(settings.QDRANT_KEEPALIVE_SECONDS * 1000),
+                "grpc.keepalive_permit_without_calls": 1,
+            },
+        }
+    
+    @property
+    def async_client(self) -> Optional[AsyncQdrantClient]:
+        """
+        AsyncQdrantClient sharing the sync client's settings (created on first use)
+        
+        None for injected clients and the local backend; async methods then run the
+        sync call in a worker thread instead.
+        """
+        if self._async_client is None and self._async_options is not None:
+            self._async_client = AsyncQdrantClient(**self._async_options)
+        return self._async_client
+    
+    async def close_async(self):
+        """Close the async client's connections (call from the event loop on shutdown)"""
+        if self._async_client is not None:
+            await self._async_client.close()
+            self._async_client = None
+    
+    @staticmethod
+    def base_name(collection_name: str) -> str:
+        """Strip the version suffix from a physical collection name ('posts_v2' -> 'posts')"""
+        return re.sub(r"_v\d+$", "", collection_name)
+    
+    @staticmethod
+    def versioned_name(base_name: str, version: int) -> str:
+        """Physical collection name for a version of a logical collection"""
+        return f"{base_name}_v{version}"
+    
+    @staticmethod
+    def version_of(collection_name: str) -> Optional[int]:
+        """Version number of a physical collection name ('posts_v2' -> 2), None if unversioned"""
+        match = re.search(r"_v(\d+)$", collection_name)
+        return int(match.group(1)) if match else None
+    
+    def for_version(self, version: int, dimension: Optional[int] = None) -> "VectorDBService":
+        """
+        Get a view of this service bound to one version of the collections
+        
+        The view shares the client and works on 'users_v{n}' / 'posts_v{n}' directly,
+        bypassing the aliases that live reads go through.
+        
+        Args:
+            version: Collection version
+            dimension: Embedding dimension of that version (defaults to the current one)
+            
+        Returns:
+            VectorDBService bound to the versioned collections
+        """
+        view = copy.copy(self)
+        view.USERS_COLLECTION = self.versioned_name(self.base_name(self.USERS_COLLECTION), version)
+        view.POSTS_COLLECTION = self.versioned_name(self.base_name(self.POSTS_COLLECTION), version)
+        view.dimension = dimension or self.dimension
+        return view
+    
+    def get_vectors_config(self, collection_name: str) -> Dict[str, VectorParams]:
+        """
+        Build the named vectors configuration for a collection
+        
+        Args:
+            collection_name: Collection name
+            
+        Returns:
+            Dictionary mapping vector name to its parameters
+        """
+        vectors_config = {
+            vector_name: VectorParams(
+                size=self.dimension,
+                distance=Distance.COSINE,
+                on_disk=settings.VECTORS_ON_DISK
             )
+            for vector_name in self.COLLECTION_VECTORS[self.base_name(collection_name)]
+        }
         
-        print("Qdrant connected successfully")
+        # Additional vectors, e.g. a second embedding model under evaluation
+        for vector_name, dimension in settings.EXTRA_NAMED_VECTORS.items():
+            vectors_config[vector_name] = VectorParams(
+                size=dimension,
+                distance=Distance.COSINE,
+                on_disk=settings.VECTORS_ON_DISK
+            )
+        
+        return vectors_config
+    
+    @staticmethod
+    def get_hnsw_config() -> HnswConfigDiff:
+        """HNSW index parameters from settings"""
+        return HnswConfigDiff(
+            m=settings.HNSW_M,
+            ef_construct=settings.HNSW_EF_CONSTRUCT
+        )
+    
+    @staticmethod
+    def get_quantization_config(quantization: Optional[str] = None):
+        """
+        Quantization parameters from settings
+        
+        Args:
+            quantization: Override for QUANTIZATION ("none", "scalar" or "binary")
+            
+        Returns:
+            Qdrant quantization config, or None when quantization is disabled
+        """
+        quantization = (quantization or settings.QUANTIZATION).lower()
+        
+        if quantization == "scalar":
+            return ScalarQuantization(
+                scalar=ScalarQuantizationConfig(
+                    type=ScalarType.INT8,
+                    quantile=0.99,
+                    always_ram=settings.QUANTIZATION_ALWAYS_RAM
+                )
+            )
+        if quantization == "binary":
+            return BinaryQuantization(
+                binary=BinaryQuantizationConfig(always_ram=settings.QUANTIZATION_ALWAYS_RAM)
+            )
+        if quantization == "none":
+            return None
+        
+        raise ValueError(f"Unknown quantization '{quantization}', expected 'none', 'scalar' or 'binary'")
+    
+    @staticmethod
+    def build_search_params(
+        hnsw_ef: Optional[int] = None,
+        quantization: Optional[str] = None
+    ) -> Optional[SearchParams]:
+        """
+        Search-time parameters from settings
+        
+        Args:
+            hnsw_ef: Override for HNSW_EF_SEARCH
+            quantization: Override for QUANTIZATION
+            
+        Returns:
+            SearchParams, or None to use Qdrant's defaults
+        """
+        hnsw_ef = hnsw_ef if hnsw_ef is not None else settings.HNSW_EF_SEARCH
+        quantization = (quantization or settings.QUANTIZATION).lower()
+        
+        quantization_params = None
+        if quantization != "none":
+            quantization_params = QuantizationSearchParams(
+                rescore=settings.QUANTIZATION_RESCORE,
+                oversampling=settings.QUANTIZATION_OVERSAMPLING
+            )
+        
+        if hnsw_ef is None and quantization_params is None:
+            return None
+        
+        return SearchParams(hnsw_ef=hnsw_ef, quantization=quantization_params)
+    
+    def collection_exists(self, collection_name: str) -> bool:
+        """Check whether a physical collection exists (aliases are not collections)"""
+        collections = self.client.get_collections().collections
+        return any(collection.name == collection_name for collection in collections)
+    
+    def is_legacy_collection(self, collection_name: str) -> bool:
+        """
+        Check whether a physical collection predates named vectors
+        
+        Those collections store one unnamed vector per point under a random point ID,
+        so named-vector searches and upserts by point_id() cannot use them.
+        
+        Args:
+            collection_name: Collection name (base or versioned)
+            
+        Returns:
+            True if the collection lacks the named vectors of its base collection
+        """
+        if isinstance(self.client, LocalVectorStore):
+            # Only ever holds named vectors
+            return False
+        
+        vectors = self.client.get_collection(collection_name).config.params.vectors
+        if not isinstance(vectors, dict):
+            return True
+        return any(
+            vector_name not in vectors
+            for vector_name in self.COLLECTION_VECTORS[self.base_name(collection_name)]
+        )
+    
+    def get_alias_target(self, alias_name: str) -> Optional[str]:
+        """
+        Get the collection an alias points to
+        
+        Args:
+            alias_name: Alias name
+            
+        Returns:
+            Physical collection name, or None if the alias does not exist
+        """
+        for alias in self.client.get_aliases().aliases:
+            if alias.alias_name == alias_name:
+                return alias.collection_name
+        return None
+    
+    def create_collection(self, collection_name: str) -> bool:
+        """
+        Create a physical collection if it doesn't exist
+        
+        Args:
+            collection_name: Collection name (base or versioned)
+            
+        Returns:
+            True if the collection was created
+        """
+        if self.collection_exists(collection_name):
+            print(f"Collection '{collection_name}' already exists")
+            return False
+        
+        self.client.create_collection(
+            collection_name=collection_name,
+            vectors_config=self.get_vectors_config(collection_name),
+            hnsw_config=self.get_hnsw_config(),
+            quantization_config=self.get_quantization_config()
+        )
+        print(f"Collection '{collection_name}' created successfully")
+        return True
+    
+    def apply_collection_config(self, collection_name: str) -> str:
+        """
+        Apply the current HNSW, on-disk and quantization settings to an existing collection
+        
+        Qdrant rebuilds indexes and quantized vectors in the background; searches keep
+        working on the old structures meanwhile.
+        
+        Args:
+            collection_name: Collection or alias name
+            
+        Returns:
+            Name of the physical collection that was updated
+        """
+        target = self.get_alias_target(collection_name) or collection_name
+        vector_names = list(self.get_vectors_config(target).keys())
+        quantization_config = self.get_quantization_config()
+        
+        self.client.update_collection(
+            collection_name=target,
+            vectors_config={
+                vector_name: VectorParamsDiff(on_disk=settings.VECTORS_ON_DISK)
+                for vector_name in vector_names
+            },
+            hnsw_config=self.get_hnsw_config(),
+            quantization_config=quantization_config if quantization_config is not None else Disabled.DISABLED
+        )
+        
+        # Searches here pick up the rescoring parameters now; other workers on their next refresh
+        self.refresh_search_params()
+        print(f"Collection '{target}' config updated")
+        return target
+    
+    def refresh_search_params(self):
+        """
+        Rebuild the search parameters from the quantization the live collection has
+        
+        Quantization is applied to the collection by whichever worker handles
+        apply_collection_config, so every worker re-reads it instead of trusting its
+        own settings (the app calls this every LIVE_VERSION_REFRESH_SECONDS).
+        """
+        if isinstance(self.client, LocalVectorStore):
+            return
+        
+        config = self.client.get_collection(self.POSTS_COLLECTION).config.quantization_config
+        if config is None:
+            quantization = "none"
+        elif isinstance(config, BinaryQuantization):
+            quantization = "binary"
+        else:
+            quantization = "scalar"
+        self.search_params = self.build_search_params(quantization=quantization)
     
     def create_collections(self):
-        """Create collections for users and posts if they don't exist"""
+        """
+        Create versioned collections for users and posts behind their aliases
+        
+        'users' and 'posts' are aliases to 'users_v{n}' / 'posts_v{n}' so that a new
+        version can be built in the background and swapped in atomically.
+        Unversioned collections with named vectors keep being used until a version is
+        promoted over them; ones from before named vectors cannot be served and raise
+        LegacyCollectionError (migrate them with scripts/migrate_collections.py).
+        """
         collections = [self.USERS_COLLECTION, self.POSTS_COLLECTION]
         
         for collection_name in collections:
-            try:
-                # Check if collection exists
-                self.client.get_collection(collection_name)
-                print(f"Collection '{collection_name}' already exists")
-            except Exception:
-                # Create collection
-                self.client.create_collection(
-                    collection_name=collection_name,
-                    vectors_config=VectorParams(
-                        size=settings.EMBEDDING_DIMENSION,
-                        distance=Distance.COSINE
+            target = self.get_alias_target(collection_name)
+            if target:
+                print(f"Collection '{collection_name}' is an alias for '{target}'")
+                continue
+            
+            if self.collection_exists(collection_name):
+                if self.is_legacy_collection(collection_name):
+                    raise LegacyCollectionError(
+                        f"Collection '{collection_name}' has a single unnamed vector (created before named "
+                        "vectors) and cannot be searched or written by this version. Stop the API and run "
+                        "'python scripts/migrate_collections.py' first (see DEPLOYMENT.md)"
                     )
-                )
-                print(f"Collection '{collection_name}' created successfully")
+                print(f"Collection '{collection_name}' already exists (unversioned)")
+                continue
+            
+            versioned = self.versioned_name(collection_name, settings.COLLECTION_VERSION)
+            self.create_collection(versioned)
+            self.client.update_collection_aliases(
+                change_aliases_operations=[
+                    CreateAliasOperation(
+                        create_alias=CreateAlias(collection_name=versioned, alias_name=collection_name)
+                    )
+                ]
+            )
+            print(f"Alias '{collection_name}' -> '{versioned}' created")
     
+    def swap_aliases(self, targets: Dict[str, str], drop_unversioned: bool = False) -> Dict[str, Optional[str]]:
+        """
+        Atomically point several aliases at other collections
+        
+        All alias operations go in one request, so readers never see a missing alias
+        or a mix of old and new targets.
+        
+        Args:
+            targets: Alias (e.g. 'posts') -> collection to point it at (e.g. 'posts_v2')
+            drop_unversioned: Delete unversioned collections that hold an alias name
+                first. Qdrant cannot replace a collection with an alias atomically, so
+                reads of that name fail until the alias exists.
+            
+        Returns:
+            Alias -> the collection it pointed to before (None if it did not exist)
+        """
+        previous = {alias_name: self.get_alias_target(alias_name) for alias_name in targets}
+        unversioned = [
+            alias_name for alias_name, target in previous.items()
+            if target is None and self.collection_exists(alias_name)
+        ]
+        if unversioned and not drop_unversioned:
+            raise RuntimeError(
+                f"Unversioned collections {unversioned} hold the alias names; "
+                "promote with drop_unversioned to replace them (reads fail briefly)"
+            )
+        
+        operations = []
+        for alias_name, collection_name in targets.items():
+            if previous[alias_name]:
+                operations.append(DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=alias_name)))
+            operations.append(
+                CreateAliasOperation(create_alias=CreateAlias(collection_name=collection_name, alias_name=alias_name))
+            )
+        
+        for alias_name in unversioned:
+            print(f"Deleting unversioned collection '{alias_name}' to replace it with an alias")
+            self.client.delete_collection(alias_name)
+            previous[alias_name] = alias_name
+        
+        self.client.update_collection_aliases(change_aliases_operations=operations)
+        return previous
+    
+    @staticmethod
+    def point_id(entity_id: str) -> str:
+        """
+        Deterministic point ID for an entity, so upserts replace the existing point
+        
+        Args:
+            entity_id: MongoDB ID of the user or post
+            
+        Returns:
+            UUID string usable as a Qdrant point ID
+        """
+        return str(uuid.uuid5(uuid.NAMESPACE_OID, entity_id))
+    
+    @timed("qdrant")
     def upsert_user_embedding(self, user_id: str, embedding: List[float], metadata: Optional[Dict] = None):
         """
-        Insert or update user embedding
+        Insert or update user embedding (other named vectors of the user are kept)
         
         Args:
             user_id: User ID
             embedding: Embedding vector
             metadata: Additional metadata to store
         """
-        point = PointStruct(
-            id=str(uuid.uuid4()),
-            vector=embedding,
-            payload={
-                "user_id": user_id,
-                **(metadata or {})
-            }
-        )
+        self.upsert_batch(self.USERS_COLLECTION, [
+            {"id": user_id, "vectors": {self.USER_PROFILE_VECTOR: embedding}, "payload": metadata}
+        ])
+    
+    @timed("qdrant")
+    def upsert_user_embeddings_batch(self, users: List[Dict[str, Any]]):
+        """
+        Insert or update many user profile embeddings, keeping their interest vectors
         
-        self.client.upsert(
+        Args:
+            users: List of dictionaries with 'id' (user ID), 'embedding' and 'metadata'
+        """
+        self.upsert_batch(self.USERS_COLLECTION, [
+            {"id": user["id"], "vectors": {self.USER_PROFILE_VECTOR: user["embedding"]}, "payload": user.get("metadata")}
+            for user in users
+        ])
+    
+    @timed("qdrant")
+    def upsert_batch(self, collection_name: str, items: List[Dict[str, Any]]):
+        """
+        Insert or update many points in one request
+        
+        Only the given named vectors are written; vectors of existing points that are
+        not in an item (interest, EXTRA_NAMED_VECTORS) are left as they are.
+        
+        Args:
+            collection_name: Collection name
+            items: List of dictionaries with 'id' (MongoDB ID), 'vectors' (name -> embedding)
+                and 'payload'
+        """
+        if not items:
+            return
+        observe_batch("qdrant_upsert", len(items))
+        
+        id_field = self.ID_FIELDS[self.base_name(collection_name)]
+        points = [
+            PointStruct(
+                id=self.point_id(item["id"]),
+                vector=item["vectors"],
+                payload={id_field: item["id"], **(item.get("payload") or {})}
+            )
+            for item in items
+        ]
+        
+        self.write_points(collection_name, points)
+    
+    @timed("qdrant")
+    def get_user_interest(self, user_id: str) -> Optional[Tuple[List[float], Dict[str, Any]]]:
+        """
+        Get a user's stored interest vector and its running state
+        
+        Args:
+            user_id: User ID
+            
+        Returns:
+            Tuple of (unit interest vector, state payload) or None if the user has no interest vector
+        """
+        records = self.client.retrieve(
             collection_name=self.USERS_COLLECTION,
-            points=[point]
+            ids=[self.point_id(user_id)],
+            with_payload=self.INTEREST_PAYLOAD_FIELDS,
+            with_vectors=[self.USER_INTEREST_VECTOR]
         )
+        if not records or not records[0].vector:
+            return None
+        
+        vector = records[0].vector.get(self.USER_INTEREST_VECTOR)
+        if not vector:
+            return None
+        
+        return vector, records[0].payload or {}
     
+    @timed("qdrant")
+    def write_points(self, collection_name: str, points: List[PointStruct]):
+        """
+        Insert new points and update existing ones without dropping their other vectors
+        
+        An upsert replaces the whole point, which would wipe named vectors written
+        elsewhere (the interest vector, EXTRA_NAMED_VECTORS). Existing points get
+        their given vectors set and their payload merged instead, all in one request.
+        
+        Args:
+            collection_name: Collection name
+            points: Points with the named vectors and payload fields to write
+        """
+        if not points:
+            return
+        
+        existing = {
+            record.id
+            for record in self.client.retrieve(
+                collection_name=collection_name,
+                ids=[point.id for point in points],
+                with_payload=False,
+                with_vectors=False
+            )
+        }
+        
+        operations = []
+        new_points = [point for point in points if point.id not in existing]
+        if new_points:
+            operations.append(UpsertOperation(upsert=PointsList(points=new_points)))
+        updated = [point for point in points if point.id in existing]
+        if updated:
+            operations.append(UpdateVectorsOperation(update_vectors=UpdateVectors(
+                points=[PointVectors(id=point.id, vector=point.vector) for point in updated]
+            )))
+            operations.extend(
+                SetPayloadOperation(set_payload=SetPayload(payload=point.payload, points=[point.id]))
+                for point in updated
+                if point.payload
+            )
+        
+        self.client.batch_update_points(collection_name=collection_name, update_operations=operations)
+    
+    @timed("qdrant")
+    def upsert_user_interest(
+        self,
+        user_id: str,
+        embedding: List[float],
+        state: Dict[str, Any]
+    ):
+        """
+        Store a user's interest vector without touching the profile vector
+        
+        Only the interest vector and its state fields are written, so a concurrent
+        profile update is never overwritten with stale data.
+        
+        Args:
+            user_id: User ID
+            embedding: Interest vector
+            state: Running state (interest_weight, interest_norm, interest_updated_at)
+        """
+        self.write_points(self.USERS_COLLECTION, [
+            PointStruct(
+                id=self.point_id(user_id),
+                vector={self.USER_INTEREST_VECTOR: embedding},
+                payload={"user_id": user_id, **state}
+            )
+        ])
+    
+    @timed("qdrant")
     def upsert_post_embedding(self, post_id: str, embedding: List[float], metadata: Optional[Dict] = None):
         """
-        Insert or update post embedding
+        Insert or update post embedding (other named vectors of the post are kept)
         
         Args:
             post_id: Post ID
             embedding: Embedding vector
             metadata: Additional metadata to store
         """
-        point = PointStruct(
-            id=str(uuid.uuid4()),
-            vector=embedding,
-            payload={
-                "post_id": post_id,
-                **(metadata or {})
-            }
+        self.upsert_batch(self.POSTS_COLLECTION, [
+            {"id": post_id, "vectors": {self.POST_CONTENT_VECTOR: embedding}, "payload": metadata}
+        ])
+    
+    @timed("qdrant")
+    def update_named_vectors(
+        self,
+        collection_name: str,
+        entity_id: str,
+        vectors: Dict[str, List[float]]
+    ):
+        """
+        Set some named vectors of an existing point, leaving the others untouched
+        
+        Args:
+            collection_name: Collection name
+            entity_id: MongoDB ID of the user or post
+            vectors: Dictionary mapping vector name to embedding
+        """
+        self.client.update_vectors(
+            collection_name=collection_name,
+            points=[PointVectors(id=self.point_id(entity_id), vector=vectors)]
+        )
+    
+    @timed("qdrant")
+    def get_user_vectors(self, user_id: str) -> Dict[str, List[float]]:
+        """
+        Get all stored named vectors of a user
+        
+        Args:
+            user_id: User ID
+            
+        Returns:
+            Dictionary mapping vector name to embedding (empty if the user is not indexed)
+        """
+        records = self.client.retrieve(
+            collection_name=self.USERS_COLLECTION,
+            ids=[self.point_id(user_id)],
+            with_payload=False,
+            with_vectors=True
         )
+        if not records or not records[0].vector:
+            return {}
         
-        self.client.upsert(
+        return {name: vector for name, vector in records[0].vector.items() if vector}
+    
+    @timed("qdrant")
+    def get_post_vectors(self, post_ids: List[str]) -> Dict[str, List[float]]:
+        """
+        Get stored embeddings for a set of posts
+        
+        Args:
+            post_ids: List of post IDs
+            
+        Returns:
+            Dictionary mapping post ID to its embedding (missing posts are omitted)
+        """
+        if not post_ids:
+            return {}
+        observe_batch("qdrant_retrieve", len(post_ids))
+        
+        records, _ = self.client.scroll(
             collection_name=self.POSTS_COLLECTION,
-            points=[point]
+            scroll_filter=Filter(
+                must=[FieldCondition(key="post_id", match=MatchAny(any=list(post_ids)))]
+            ),
+            limit=len(post_ids),
+            with_payload=["post_id"],
+            with_vectors=[self.POST_CONTENT_VECTOR]
+        )
+        
+        return {
+            record.payload["post_id"]: record.vector[self.POST_CONTENT_VECTOR]
+            for record in records
+            if record.payload and record.vector and self.POST_CONTENT_VECTOR in record.vector
+        }
+    
+    @timed("qdrant")
+    def get_vectors(
+        self,
+        collection_name: str,
+        entity_ids: List[str],
+        vector_name: str
+    ) -> Dict[str, List[float]]:
+        """
+        Get one stored named vector for a set of users or posts
+        
+        Args:
+            collection_name: Collection name
+            entity_ids: MongoDB IDs
+            vector_name: Named vector to return
+            
+        Returns:
+            Dictionary mapping ID to its vector (missing points are omitted)
+        """
+        if not entity_ids:
+            return {}
+        observe_batch("qdrant_retrieve", len(entity_ids))
+        
+        id_field = self.ID_FIELDS[self.base_name(collection_name)]
+        records = self.client.retrieve(
+            collection_name=collection_name,
+            ids=[self.point_id(entity_id) for entity_id in entity_ids],
+            with_payload=[id_field],
+            with_vectors=[vector_name]
+        )
+        
+        return {
+            record.payload[id_field]: record.vector[vector_name]
+            for record in records
+            if record.payload and record.vector and record.vector.get(vector_name)
+        }
+    
+    def build_exclude_filter(self, collection_name: str, exclude_ids: Optional[List[str]]) -> Optional[Filter]:
+        """
+        Build a filter excluding points by their MongoDB ID
+        
+        Args:
+            collection_name: Collection name
+            exclude_ids: List of IDs to exclude
+            
+        Returns:
+            Filter, or None when there is nothing to exclude
+        """
+        if not exclude_ids:
+            return None
+        
+        # A single match-any condition instead of one condition per ID
+        return Filter(
+            must_not=[
+                FieldCondition(
+                    key=self.ID_FIELDS[self.base_name(collection_name)],
+                    match=MatchAny(any=list(exclude_ids))
+                )
+            ]
+        )
+    
+    def _payload_selector(self, collection_name: str, payload_fields: Optional[List[str]]) -> List[str]:
+        """Payload fields to fetch with each hit: the ID field plus any the caller asked for"""
+        return [self.ID_FIELDS[self.base_name(collection_name)]] + list(payload_fields or [])
+    
+    def _format_results(
+        self,
+        collection_name: str,
+        results: List[ScoredPoint],
+        payload_fields: Optional[List[str]] = None
+    ) -> List[SearchHit]:
+        """Convert scored points to hits carrying the collection's ID field"""
+        id_field = self.ID_FIELDS[self.base_name(collection_name)]
+        return [
+            SearchHit(
+                result.payload.get(id_field),
+                result.score,
+                result.payload if payload_fields else None
+            )
+            for result in results
+        ]
+    
+    def _search_kwargs(
+        self,
+        collection_name: str,
+        embedding: List[float],
+        vector_name: str,
+        limit: int,
+        exclude_ids: Optional[List[str]],
+        payload_fields: Optional[List[str]]
+    ) -> Dict[str, Any]:
+        """Arguments of a client search call (shared by the sync and async paths)"""
+        set_span_attributes(**{"qdrant.collection": collection_name, "filter.size": len(exclude_ids or [])})
+        return {
+            "collection_name": collection_name,
+            "query_vector": NamedVector(name=vector_name, vector=embedding),
+            "limit": limit,
+            "query_filter": self.build_exclude_filter(collection_name, exclude_ids),
+            "search_params": self.search_params,
+            "with_payload": self._payload_selector(collection_name, payload_fields),
+            "with_vectors": False,
+        }
+    
+    def _search_requests(self, collection_name: str, queries: List[Dict[str, Any]]) -> List[SearchRequest]:
+        """Search requests of a batch (shared by the sync and async paths)"""
+        observe_batch("qdrant_search", len(queries))
+        set_span_attributes(**{
+            "qdrant.collection": collection_name,
+            "filter.size": sum(len(query.get("exclude_ids") or []) for query in queries),
+        })
+        
+        return [
+            SearchRequest(
+                vector=NamedVector(name=query["vector_name"], vector=query["embedding"]),
+                limit=query.get("limit", 10),
+                filter=self.build_exclude_filter(collection_name, query.get("exclude_ids")),
+                params=self.search_params,
+                with_payload=self._payload_selector(collection_name, query.get("payload_fields")),
+                with_vector=False
+            )
+            for query in queries
+        ]
+    
+    @timed("qdrant")
+    def search(
+        self,
+        collection_name: str,
+        embedding: List[float],
+        vector_name: str,
+        limit: int = 10,
+        exclude_ids: Optional[List[str]] = None,
+        payload_fields: Optional[List[str]] = None
+    ) -> List[SearchHit]:
+        """
+        Search a collection by one of its named vectors
+        
+        Args:
+            collection_name: Collection name
+            embedding: Query embedding vector
+            vector_name: Named vector to search against
+            limit: Maximum number of results
+            exclude_ids: List of IDs to exclude from results
+            payload_fields: Payload fields to return with each hit (only the ID by default)
+            
+        Returns:
+            List of hits, best first
+        """
+        results = self.client.search(
+            **self._search_kwargs(collection_name, embedding, vector_name, limit, exclude_ids, payload_fields)
+        )
+        
+        return self._format_results(collection_name, results, payload_fields)
+    
+    @timed("qdrant")
+    async def search_async(
+        self,
+        collection_name: str,
+        embedding: List[float],
+        vector_name: str,
+        limit: int = 10,
+        exclude_ids: Optional[List[str]] = None,
+        payload_fields: Optional[List[str]] = None
+    ) -> List[SearchHit]:
+        """
+        Async variant of search, for async routes (does not hold a worker thread
+        while waiting on Qdrant)
+        
+        Args:
+            collection_name: Collection name
+            embedding: Query embedding vector
+            vector_name: Named vector to search against
+            limit: Maximum number of results
+            exclude_ids: List of IDs to exclude from results
+            payload_fields: Payload fields to return with each hit (only the ID by default)
+            
+        Returns:
+            List of hits, best first
+        """
+        kwargs = self._search_kwargs(collection_name, embedding, vector_name, limit, exclude_ids, payload_fields)
+        async_client = self.async_client
+        if async_client is not None:
+            results = await async_client.search(**kwargs)
+        else:
+            results = await anyio.to_thread.run_sync(lambda: self.client.search(**kwargs))
+        
+        return self._format_results(collection_name, results, payload_fields)
+    
+    @timed("qdrant")
+    def search_batch(
+        self,
+        collection_name: str,
+        queries: List[Dict[str, Any]]
+    ) -> List[List[SearchHit]]:
+        """
+        Run several searches against one collection in a single request
+        
+        Args:
+            collection_name: Collection name
+            queries: List of dictionaries with 'embedding', 'vector_name' and
+                optional 'limit', 'exclude_ids' and 'payload_fields'
+            
+        Returns:
+            One list of hits per query, in query order
+        """
+        if not queries:
+            return []
+        
+        batch_results = self.client.search_batch(
+            collection_name=collection_name,
+            requests=self._search_requests(collection_name, queries)
         )
+        
+        return [
+            self._format_results(collection_name, results, query.get("payload_fields"))
+            for query, results in zip(queries, batch_results)
+        ]
+    
+    @timed("qdrant")
+    async def search_batch_async(
+        self,
+        collection_name: str,
+        queries: List[Dict[str, Any]]
+    ) -> List[List[SearchHit]]:
+        """
+        Async variant of search_batch
+        
+        Args:
+            collection_name: Collection name
+            queries: List of dictionaries with 'embedding', 'vector_name' and
+                optional 'limit', 'exclude_ids' and 'payload_fields'
+            
+        Returns:
+            One list of hits per query, in query order
+        """
+        if not queries:
+            return []
+        
+        requests = self._search_requests(collection_name, queries)
+        async_client = self.async_client
+        if async_client is not None:
+            batch_results = await async_client.search_batch(collection_name=collection_name, requests=requests)
+        else:
+            batch_results = await anyio.to_thread.run_sync(
+                lambda: self.client.search_batch(collection_name=collection_name, requests=requests)
+            )
+        
+        return [
+            self._format_results(collection_name, results, query.get("payload_fields"))
+            for query, results in zip(queries, batch_results)
+        ]
     
     def search_similar_users(
         self, 
         embedding: List[float], 
         limit: int = 10,
-        exclude_user_ids: Optional[List[str]] = None
-    ) -> List[Dict[str, Any]]:
+        exclude_user_ids: Optional[List[str]] = None,
+        vector_name: str = USER_PROFILE_VECTOR,
+        payload_fields: Optional[List[str]] = None
+    ) -> List[SearchHit]:
         """
         Search for similar users based on embedding
         
@@ -115,44 +1015,29 @@ class VectorDBService:
             embedding: Query embedding vector
             limit: Maximum number of results
             exclude_user_ids: List of user IDs to exclude from results
+            vector_name: Named vector to search against (profile by default)
+            payload_fields: Payload fields to return with each hit (only the ID by default)
             
         Returns:
             List of similar users with scores
         """
-        # Build filter if needed
-        search_filter = None
-        if exclude_user_ids:
-            search_filter = Filter(
-                must_not=[
-                    FieldCondition(
-                        key="user_id",
-                        match=MatchValue(value=uid)
-                    ) for uid in exclude_user_ids
-                ]
-            )
-        
-        results = self.client.search(
-            collection_name=self.USERS_COLLECTION,
-            query_vector=embedding,
+        return self.search(
+            self.USERS_COLLECTION,
+            embedding,
+            vector_name,
             limit=limit,
-            query_filter=search_filter
+            exclude_ids=exclude_user_ids,
+            payload_fields=payload_fields
         )
-        
-        return [
-            {
-                "user_id": result.payload.get("user_id"),
-                "score": result.score,
-                "metadata": result.payload
-            }
-            for result in results
-        ]
     
     def search_similar_posts(
         self, 
         embedding: List[float], 
         limit: int = 20,
-        exclude_post_ids: Optional[List[str]] = None
-    ) -> List[Dict[str, Any]]:
+        exclude_post_ids: Optional[List[str]] = None,
+        vector_name: str = POST_CONTENT_VECTOR,
+        payload_fields: Optional[List[str]] = None
+    ) -> List[SearchHit]:
         """
         Search for similar posts based on embedding
         
@@ -160,38 +1045,22 @@ class VectorDBService:
             embedding: Query embedding vector
             limit: Maximum number of results
             exclude_post_ids: List of post IDs to exclude from results
+            vector_name: Named vector to search against (content by default)
+            payload_fields: Payload fields to return with each hit (only the ID by default)
             
         Returns:
             List of similar posts with scores
         """
-        # Build filter if needed
-        search_filter = None
-        if exclude_post_ids:
-            search_filter = Filter(
-                must_not=[
-                    FieldCondition(
-                        key="post_id",
-                        match=MatchValue(value=pid)
-                    ) for pid in exclude_post_ids
-                ]
-            )
-        
-        results = self.client.search(
-            collection_name=self.POSTS_COLLECTION,
-            query_vector=embedding,
+        return self.search(
+            self.POSTS_COLLECTION,
+            embedding,
+            vector_name,
             limit=limit,
-            query_filter=search_filter
+            exclude_ids=exclude_post_ids,
+            payload_fields=payload_fields
         )
-        
-        return [
-            {
-                "post_id": result.payload.get("post_id"),
-                "score": result.score,
-                "metadata": result.payload
-            }
-            for result in results
-        ]
     
+    @timed("qdrant")
     def delete_user_embedding(self, user_id: str):
         """Delete user embedding by user ID"""
         self.client.delete(
@@ -208,6 +1077,7 @@ class VectorDBService:
             }
         )
     
+    @timed("qdrant")
     def delete_post_embedding(self, post_id: str):
         """Delete post embedding by post ID"""
         self.client.delete(
@@ -224,15 +1094,20 @@ class VectorDBService:
             }
         )
     
-    def get_collection_info(self, collection_name: str) -> Dict[str, Any]:
-        """Get information about a collection"""
+    @timed("qdrant")
+    def get_collection_info(self, collection_name: str, exact: bool = True) -> Dict[str, Any]:
+        """
+        Get information about a collection
+        
+        Args:
+            collection_name: Collection name
+            exact: Exact count (scans the collection) or Qdrant's cheap estimate
+        """
         try:
             # Use the count API which is more reliable
-            from qdrant_client.models import CountRequest
-            
             count_result = self.client.count(
                 collection_name=collection_name,
-                exact=True
+                exact=exact
             )
             
             return {
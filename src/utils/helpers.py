@@ -1,6 +1,14 @@
-from typing import List, Any
+from typing import List, Any, Dict
+from datetime import datetime
 import numpy as np
 
+# MongoDB fields fetched (projected) when hydrating results into cards
+USER_CARD_FIELDS = ['firstName', 'lastName', 'bio']
+POST_CARD_FIELDS = ['userId', 'post', 'type', 'reactions', 'comments', 'createdAt']
+
+# Longest text (bio, post body) included in a card
+CARD_TEXT_LIMIT = 280
+
 
 def normalize_scores(scores: List[float]) -> List[float]:
     """
@@ -75,3 +83,103 @@ def merge_recommendations(
     merged = sorted(score_map.items(), key=lambda x: x[1], reverse=True)
     return merged
 
+
+
+def recency_weight(age_seconds: float, half_life_seconds: float) -> float:
+    """
+    Exponential decay weight for an event of a given age
+    
+    Args:
+        age_seconds: How long ago the event happened
+        half_life_seconds: Age at which the weight halves
+        
+    Returns:
+        Weight in (0, 1]; future timestamps are treated as age 0
+    """
+    if half_life_seconds <= 0:
+        return 1.0
+    return float(0.5 ** (max(age_seconds, 0.0) / half_life_seconds))
+
+
+def build_user_metadata(user: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Payload stored alongside a user's vectors
+    
+    Args:
+        user: User document from MongoDB
+        
+    Returns:
+        Metadata dictionary
+    """
+    return {
+        'firstName': user.get('firstName', ''),
+        'lastName': user.get('lastName', ''),
+        'bio': user.get('bio', ''),
+    }
+
+
+def build_post_metadata(post: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Payload stored alongside a post's vector
+    
+    Args:
+        post: Post document from MongoDB
+        
+    Returns:
+        Metadata dictionary
+    """
+    return {
+        'userId': str(post.get('userId', '')),
+        'type': post.get('type', 0),
+        'reactions': post.get('reactions', 0),
+        'comments': post.get('comments', 0),
+    }
+
+
+def _card_text(text: Any) -> str:
+    text = text or ''
+    return text if len(text) <= CARD_TEXT_LIMIT else text[:CARD_TEXT_LIMIT - 1] + '…'
+
+
+def build_user_card(user: Dict[str, Any], score: float) -> Dict[str, Any]:
+    """
+    Compact, renderable representation of a user search/recommendation result
+    
+    Args:
+        user: User document from MongoDB (projected to USER_CARD_FIELDS)
+        score: Result score
+        
+    Returns:
+        Card dictionary
+    """
+    return {
+        'id': str(user['_id']),
+        'score': score,
+        'firstName': user.get('firstName', ''),
+        'lastName': user.get('lastName', ''),
+        'bio': _card_text(user.get('bio')),
+    }
+
+
+def build_post_card(post: Dict[str, Any], score: float) -> Dict[str, Any]:
+    """
+    Compact, renderable representation of a post search/recommendation result
+    
+    Args:
+        post: Post document from MongoDB (projected to POST_CARD_FIELDS)
+        score: Result score
+        
+    Returns:
+        Card dictionary
+    """
+    created_at = post.get('createdAt')
+    return {
+        'id': str(post['_id']),
+        'score': score,
+        'userId': str(post.get('userId', '')),
+        'text': _card_text(post.get('post')),
+        'type': post.get('type', 0),
+        'reactions': post.get('reactions', 0),
+        'comments': post.get('comments', 0),
+        'createdAt': created_at.isoformat() if isinstance(created_at, datetime) else created_at,
+    }
@@ -0,0 +1,452 @@
+"""
+Priority scheduling of model inference
+
+Each model (the embedding model, the toxicity model) is fed by one worker thread
+pulling from two lanes:
+
+- interactive: user-facing calls (search queries, single embeddings, moderation
+  checks). Concurrent interactive items are coalesced into one model call, and
+  they always get the next batch slot.
+- bulk: indexing, re-indexing and other background work. Bulk jobs are cut into
+  small batches that only run while no interactive item is waiting, so an
+  interactive request waits for at most one bulk batch in front of it.
+
+Callers block on (or await) a future; a bulk job's future completes once all of
+its batches have run. When a coalesced batch fails, each request in it is re-run
+on its own, so a bad input fails only the request that sent it.
+
+With INFERENCE_AUTOTUNE, batch sizes and the interactive coalescing wait are not
+fixed: a BatchAutotuner fits the model's batch latency online and picks the
+batch sizes with the best throughput that fit the per-lane latency budgets in
+Settings (the bulk budget only while interactive traffic is flowing).
+"""
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence
+from collections import deque
+from concurrent.futures import Future
+import asyncio
+import threading
+import time
+import numpy as np
+from src.core.config import settings
+from src.core.metrics import (
+    INFERENCE_QUEUE_DEPTH,
+    INFERENCE_QUEUE_WAIT,
+    INFERENCE_LATENCY,
+    INFERENCE_BATCH_LIMIT,
+    INFERENCE_COALESCE_WAIT,
+    INFERENCE_THROUGHPUT,
+    observe_batch,
+)
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+LANES = (INTERACTIVE, BULK)
+
+
+def approx_tokens(text: str) -> int:
+    """Cheap token count estimate (~4 characters per subword token, plus [CLS]/[SEP])"""
+    return len(text) // 4 + 2
+
+
+def padded_tokens(costs: Sequence[float], pass_size: Optional[int] = None) -> float:
+    """
+    Tokens a padding model computes for a batch
+
+    Items run longest first in forward passes of pass_size items (the whole batch
+    by default), each padded to its longest item.
+    """
+    ordered = sorted(costs, reverse=True)
+    step = pass_size or len(ordered)
+    return sum(len(ordered[start:start + step]) * ordered[start] for start in range(0, len(ordered), step))
+
+
+class BatchAutotuner:
+    """
+    Online batch-latency model of one inference model, and the batch limits it implies
+
+    Batch latency is fitted as overhead + per_token * padded tokens by
+    exponentially weighted least squares over recent batches. Padding matters: a
+    forward pass costs as if every item were as long as its longest one, and with
+    long-tailed inputs a larger batch is more likely to hold a long outlier. So
+    batching amortizes the overhead but pays more padding per item; from recent
+    item costs the tuner predicts both for every batch size, and each lane gets
+    the size with the best predicted throughput among those that fit its SLO.
+    An interactive item can land just as a batch starts and wait for it before
+    its own, so interactive batches (with their coalescing wait) get half the
+    interactive SLO.
+
+    The interactive coalescing wait is bounded by the per-call overhead (waiting
+    longer than the time a merged call saves does not pay off) and is only used
+    while items arrive often enough that another one is expected within it.
+
+    The bulk SLO only holds while the interactive lane is active (an interactive
+    item arrived within IDLE_AFTER); with no interactive traffic to protect, bulk
+    batches are sized for throughput alone.
+    """
+
+    DECAY = 0.95  # Weight of the history at each new batch (roughly the last 20 batches count)
+    IDLE_AFTER = 1.0  # Seconds without interactive items before the interactive lane counts as idle
+    COST_SAMPLES = 256  # Recent item costs per lane that padding is predicted from
+    NEAR_BEST = 0.99  # Sizes within this share of the best predicted throughput count as best (the largest wins)
+
+    def __init__(self, name: str, initial_limits: Dict[str, int], pass_size: Optional[int] = None):
+        """
+        Args:
+            name: Model name for metrics
+            initial_limits: Batch limit per lane until enough batches have been measured
+            pass_size: Items per padded forward pass of the model (defaults to the whole batch)
+        """
+        self.name = name
+        self.limits = dict(initial_limits)
+        self.pass_size = pass_size
+        self.coalesce_wait = 0.0
+        self.tokens_per_second = 0.0
+        self.slo = {
+            INTERACTIVE: settings.INFERENCE_INTERACTIVE_SLO_MS / 1000,
+            BULK: settings.INFERENCE_BULK_SLO_MS / 1000,
+        }
+        self.max_batch = settings.INFERENCE_AUTOTUNE_MAX_BATCH
+        self.max_wait = settings.INFERENCE_MAX_COALESCE_WAIT_MS / 1000
+
+        # Weighted sums for the least-squares fit of latency (y) against padded tokens (x)
+        self._sw = self._sx = self._sy = self._sxx = self._sxy = 0.0
+        self._costs: Dict[str, Deque[float]] = {lane: deque(maxlen=self.COST_SAMPLES) for lane in LANES}
+        self._longest_weights: Optional[np.ndarray] = None  # Depends only on the sample size, which stays at COST_SAMPLES
+        self._arrival_gap: Optional[float] = None  # Mean seconds between interactive items
+        self._last_arrival: Optional[float] = None
+
+        self._limit_gauges = {lane: INFERENCE_BATCH_LIMIT.labels(name, lane) for lane in LANES}
+        self._wait_gauge = INFERENCE_COALESCE_WAIT.labels(name)
+        self._throughput_gauge = INFERENCE_THROUGHPUT.labels(name)
+        self._publish()
+
+    @staticmethod
+    def _ewma(previous: Optional[float], value: float, alpha: float = 0.2) -> float:
+        return value if previous is None else previous + alpha * (value - previous)
+
+    def interactive_active(self, now: float) -> bool:
+        """Whether an interactive item arrived recently enough for the bulk SLO to apply"""
+        return self._last_arrival is not None and now - self._last_arrival <= self.IDLE_AFTER
+
+    def expects_interactive(self, now: float) -> bool:
+        """Whether another interactive item is expected within the coalescing wait"""
+        return self.coalesce_wait > 0 and self.interactive_active(now)
+
+    def next_arrival_by(self) -> float:
+        """Time by which another interactive item is due at the recent arrival rate (coalescing stops after it)"""
+        return self._last_arrival + 2 * self._arrival_gap
+
+    def record_arrival(self, count: int, now: float):
+        """Note interactive items being submitted (drives the coalescing decision)"""
+        was_active = self.interactive_active(now)
+        if self._last_arrival is not None:
+            self._arrival_gap = self._ewma(self._arrival_gap, (now - self._last_arrival) / count)
+        self._last_arrival = now
+        if not was_active:
+            # Bring the bulk limit back under its SLO before the next bulk batch
+            self._retune()
+
+    def record_batch(self, lane: str, costs: Sequence[float], seconds: float):
+        """
+        Add a measured model call and re-derive the limits
+
+        Args:
+            lane: Lane the batch came from
+            costs: Estimated tokens of each item in the batch
+            seconds: Model call duration
+        """
+        x = padded_tokens(costs, self.pass_size)
+        d = self.DECAY
+        self._sw = d * self._sw + 1.0
+        self._sx = d * self._sx + x
+        self._sy = d * self._sy + seconds
+        self._sxx = d * self._sxx + x * x
+        self._sxy = d * self._sxy + x * seconds
+        self._costs[lane].extend(costs)
+        if seconds > 0:
+            self.tokens_per_second = self._ewma(self.tokens_per_second or None, sum(costs) / seconds)
+        self._retune()
+
+    def cost_model(self) -> Optional[tuple]:
+        """Fitted (overhead seconds, seconds per padded token), or None before two batches"""
+        if self._sw < 2:
+            return None
+        mean_x = self._sx / self._sw
+        mean_y = self._sy / self._sw
+        if mean_x <= 0:
+            return None
+        var = self._sxx / self._sw - mean_x * mean_x
+        cov = self._sxy / self._sw - mean_x * mean_y
+        if var > 1e-6 * mean_x * mean_x and cov > 0:
+            per_token = cov / var
+            return max(0.0, mean_y - per_token * mean_x), per_token
+        # Batches too alike to separate overhead from per-token cost: charge it all per token
+        return 0.0, mean_y / mean_x
+
+    def expected_padded_tokens(self, costs: Sequence[float]) -> np.ndarray:
+        """
+        Expected padded tokens of batches of 1..max_batch items drawn from costs
+
+        A batch of n items is charged n times the expected longest of min(n, pass_size)
+        items (exact for a single pass, an upper bound beyond it).
+        """
+        values = np.sort(np.asarray(costs, dtype=np.float64))
+        sizes = np.arange(1, self.max_batch + 1)
+        if self._longest_weights is None or self._longest_weights.shape[0] != len(values):
+            # P(the longest of k draws is the i-th smallest value) = F(i)^k - F(i-1)^k
+            widest = np.minimum(sizes, self.pass_size or self.max_batch)
+            cdf = np.arange(len(values) + 1) / len(values)
+            self._longest_weights = cdf[1:, None] ** widest - cdf[:-1, None] ** widest
+        return sizes * (values @ self._longest_weights)
+
+    def _retune(self):
+        model = self.cost_model()
+        if model is None:
+            return
+        overhead, per_token = model
+
+        wait = min(self.max_wait, overhead, self.slo[INTERACTIVE] / 4)
+        if self._arrival_gap is None or self._arrival_gap > wait:
+            wait = 0.0
+        self.coalesce_wait = wait
+        active = self.interactive_active(time.perf_counter())
+
+        for lane in LANES:
+            costs = self._costs[lane] or self._costs[INTERACTIVE] or self._costs[BULK]
+            latency = np.maximum(overhead + per_token * self.expected_padded_tokens(costs), 1e-9)
+            # An interactive item can arrive just as a batch starts, and then runs in the next one
+            budget = self.slo[BULK] if lane == BULK else self.slo[INTERACTIVE] / 2 - wait
+            sizes = np.arange(1, self.max_batch + 1)
+            throughput = sizes / latency
+            if lane == INTERACTIVE or active:
+                throughput[latency > budget] = 0.0
+            if throughput.max() <= 0:
+                self.limits[lane] = 1
+            else:
+                self.limits[lane] = int(sizes[throughput >= self.NEAR_BEST * throughput.max()][-1])
+        self._publish()
+
+    def _publish(self):
+        for lane in LANES:
+            self._limit_gauges[lane].set(self.limits[lane])
+        self._wait_gauge.set(self.coalesce_wait)
+        self._throughput_gauge.set(self.tokens_per_second)
+
+
+class _Job:
+    """One submitted list of items and the progress of its batches"""
+
+    __slots__ = ("items", "lane", "future", "results", "next", "remaining", "submitted")
+
+    def __init__(self, items: List[Any], lane: str):
+        self.items = items
+        self.lane = lane
+        self.future: Future = Future()
+        self.results: List[Any] = [None] * len(items)
+        self.next = 0  # first item not yet handed to a batch
+        self.remaining = len(items)  # items without a result yet
+        self.submitted = time.perf_counter()
+
+
+class InferenceScheduler:
+    """Runs a batch function on one worker thread, interactive lane first"""
+
+    def __init__(
+        self,
+        name: str,
+        batch_fn: Callable[[List[Any]], Sequence[Any]],
+        max_batch_size: Optional[int] = None,
+        bulk_batch_size: Optional[int] = None,
+        cost_fn: Optional[Callable[[Any], float]] = None,
+        autotune: Optional[bool] = None,
+        pass_size: Optional[int] = None
+    ):
+        """
+        Args:
+            name: Model name for metrics and the worker thread ('embeddings', 'toxicity')
+            batch_fn: Maps a list of items to a sequence of results of the same length
+            max_batch_size: Interactive items coalesced per call (defaults to INFERENCE_MAX_BATCH_SIZE)
+            bulk_batch_size: Bulk items per call (defaults to INFERENCE_BULK_BATCH_SIZE)
+            cost_fn: Estimated tokens of an item, for the autotuner (defaults to approx_tokens for
+                strings, 1 otherwise)
+            autotune: Tune batch sizes and the coalescing wait (defaults to INFERENCE_AUTOTUNE);
+                the sizes above are then only starting points
+            pass_size: Items per padded forward pass inside batch_fn, for the autotuner's
+                padding estimate (defaults to the whole batch)
+        """
+        self.name = name
+        self.batch_fn = batch_fn
+        self.cost_fn = cost_fn or (lambda item: approx_tokens(item) if isinstance(item, str) else 1)
+        self.limits = {
+            INTERACTIVE: max_batch_size or settings.INFERENCE_MAX_BATCH_SIZE,
+            BULK: bulk_batch_size or settings.INFERENCE_BULK_BATCH_SIZE,
+        }
+        if autotune is None:
+            autotune = settings.INFERENCE_AUTOTUNE
+        self.tuner = BatchAutotuner(name, self.limits, pass_size) if autotune else None
+        if self.tuner is not None:
+            self.limits = self.tuner.limits
+
+        self._queues: Dict[str, Deque[_Job]] = {lane: deque() for lane in LANES}
+        self._depth = {lane: 0 for lane in LANES}
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._worker: Optional[threading.Thread] = None
+
+        self._depth_gauges = {lane: INFERENCE_QUEUE_DEPTH.labels(name, lane) for lane in LANES}
+        self._wait = {lane: INFERENCE_QUEUE_WAIT.labels(name, lane) for lane in LANES}
+        self._latency = {lane: INFERENCE_LATENCY.labels(name, lane) for lane in LANES}
+
+    def submit(self, items: Sequence[Any], lane: str = INTERACTIVE) -> Future:
+        """
+        Queue items for inference
+
+        Args:
+            items: Inputs of batch_fn
+            lane: INTERACTIVE or BULK
+
+        Returns:
+            Future resolving to the list of results, in the order of items
+        """
+        if lane not in LANES:
+            raise ValueError(f"Unknown inference lane '{lane}'")
+        job = _Job(list(items), lane)
+        if not job.items:
+            job.future.set_result([])
+            return job.future
+
+        with self._cond:
+            if self._stopped:
+                raise RuntimeError(f"Inference scheduler '{self.name}' is stopped")
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, daemon=True, name=f"inference-{self.name}")
+                self._worker.start()
+            if lane == INTERACTIVE and self.tuner is not None:
+                self.tuner.record_arrival(len(job.items), job.submitted)
+            self._queues[lane].append(job)
+            self._depth[lane] += len(job.items)
+            self._depth_gauges[lane].set(self._depth[lane])
+            self._cond.notify()
+        return job.future
+
+    def run(self, items: Sequence[Any], lane: str = INTERACTIVE) -> List[Any]:
+        """Submit items and wait for their results"""
+        return self.submit(items, lane).result()
+
+    async def run_async(self, items: Sequence[Any], lane: str = INTERACTIVE) -> List[Any]:
+        """Submit items and await their results without holding a worker thread"""
+        return await asyncio.wrap_future(self.submit(items, lane))
+
+    def depth(self) -> Dict[str, int]:
+        """Items waiting per lane"""
+        with self._cond:
+            return dict(self._depth)
+
+    def stop(self, timeout: float = 10.0):
+        """Finish the queued work, then stop the worker"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+            worker = self._worker
+        if worker is not None:
+            worker.join(timeout)
+
+    def _next_batch(self) -> Optional[List[tuple]]:
+        """Take the next batch as (job, start, end) slices, waiting for work"""
+        with self._cond:
+            while not any(self._queues.values()):
+                if self._stopped:
+                    return None
+                self._cond.wait()
+
+            lane = INTERACTIVE if self._queues[INTERACTIVE] else BULK
+            wait = self.tuner.coalesce_wait if self.tuner is not None else 0.0
+
+            # Interactive items are about to arrive: hold the bulk batch back that long for them
+            if lane == BULK and self.tuner is not None and self.tuner.expects_interactive(time.perf_counter()):
+                deadline = time.perf_counter() + wait
+                while not self._queues[INTERACTIVE] and not self._stopped:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                lane = INTERACTIVE if self._queues[INTERACTIVE] else BULK
+            limit = self.limits[lane]
+
+            # Give concurrent interactive items a moment to join the batch
+            if lane == INTERACTIVE and wait > 0:
+                deadline = self._queues[INTERACTIVE][0].submitted + wait
+                while self._depth[INTERACTIVE] < limit and not self._stopped:
+                    # Stop early once arrivals pause (a burst that is already complete)
+                    remaining = min(deadline, self.tuner.next_arrival_by()) - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+            queue = self._queues[lane]
+            slices = []
+            taken = 0
+            while queue and taken < limit:
+                job = queue[0]
+                end = min(len(job.items), job.next + limit - taken)
+                slices.append((job, job.next, end))
+                taken += end - job.next
+                job.next = end
+                if end == len(job.items):
+                    queue.popleft()
+            self._depth[lane] -= taken
+            self._depth_gauges[lane].set(self._depth[lane])
+            return slices
+
+    def _run(self):
+        """Worker loop"""
+        while True:
+            slices = self._next_batch()
+            if slices is None:
+                return
+
+            # Jobs whose earlier batch failed were already answered
+            slices = [(job, start, end) for job, start, end in slices if not job.future.done()]
+            if not slices:
+                continue
+
+            now = time.perf_counter()
+            for job, start, _ in slices:
+                if start == 0:
+                    self._wait[job.lane].observe(now - job.submitted)
+
+            lane = slices[0][0].lane
+            items = [item for job, start, end in slices for item in job.items[start:end]]
+            observe_batch(f"{self.name}_{lane}", len(items))
+            try:
+                results = self.batch_fn(items)
+            except BaseException as e:
+                if len(slices) == 1:
+                    slices[0][0].future.set_exception(e)
+                    continue
+                # Coalesced requests: run each on its own so a bad input fails only its request
+                for job, start, end in slices:
+                    try:
+                        self._deliver([(job, start, end)], self.batch_fn(job.items[start:end]))
+                    except BaseException as e:
+                        job.future.set_exception(e)
+                continue
+
+            if self.tuner is not None:
+                elapsed = time.perf_counter() - now
+                with self._cond:
+                    self.tuner.record_batch(lane, [self.cost_fn(item) for item in items], elapsed)
+
+            self._deliver(slices, results)
+
+    def _deliver(self, slices: List[tuple], results: Sequence[Any]):
+        """Hand batch results to their jobs, completing the jobs that have all their results"""
+        offset = 0
+        done = time.perf_counter()
+        for job, start, end in slices:
+            job.results[start:end] = results[offset:offset + end - start]
+            offset += end - start
+            job.remaining -= end - start
+            if job.remaining == 0:
+                self._latency[job.lane].observe(done - job.submitted)
+                job.future.set_result(job.results)
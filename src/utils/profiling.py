@@ -0,0 +1,183 @@
+"""
+On-demand CPU and memory profiling of the running worker
+
+Both profilers only exist while a capture is running (a sampler thread and
+tracemalloc respectively), so they cost nothing otherwise. Results use the
+speedscope file format (https://www.speedscope.app), which renders as a
+flamegraph.
+"""
+from typing import List, Dict, Any, Tuple
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+# One capture at a time per process
+_capture_lock = threading.Lock()
+
+# Innermost frames of threads that are blocked rather than running
+_IDLE_FUNCTIONS = {"select", "poll", "wait", "_wait_for_tstate_lock", "accept"}
+
+
+class ProfileInProgressError(RuntimeError):
+    """Raised when a capture is requested while another one is running"""
+
+
+class _FrameTable:
+    """Interns (name, file, line) frames into speedscope's shared frame list"""
+
+    def __init__(self):
+        self.frames: List[Dict[str, Any]] = []
+        self._index: Dict[Tuple[str, str, int], int] = {}
+
+    def intern(self, name: str, filename: str, line: int) -> int:
+        key = (name, filename, line)
+        index = self._index.get(key)
+        if index is None:
+            index = len(self.frames)
+            self._index[key] = index
+            self.frames.append({"name": name, "file": filename, "line": line})
+        return index
+
+
+def _speedscope(name: str, frames: _FrameTable, profiles: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "$schema": SPEEDSCOPE_SCHEMA,
+        "name": name,
+        "exporter": "postal-ai-service",
+        "activeProfileIndex": 0,
+        "shared": {"frames": frames.frames},
+        "profiles": profiles,
+    }
+
+
+def _sampled_profile(name: str, unit: str, stacks: Dict[Tuple[int, ...], float]) -> Dict[str, Any]:
+    """Build a speedscope 'sampled' profile from aggregated stack -> weight"""
+    samples = [list(stack) for stack in stacks]
+    weights = list(stacks.values())
+    return {
+        "type": "sampled",
+        "name": name,
+        "unit": unit,
+        "startValue": 0,
+        "endValue": sum(weights),
+        "samples": samples,
+        "weights": weights,
+    }
+
+
+def _acquire():
+    if not _capture_lock.acquire(blocking=False):
+        raise ProfileInProgressError("A profile capture is already running")
+
+
+def profile_cpu(seconds: float, interval: float = 0.005, include_idle: bool = False) -> Dict[str, Any]:
+    """
+    Sample the stacks of all threads for a while (blocks the calling thread)
+
+    Args:
+        seconds: Capture duration
+        interval: Time between samples in seconds
+        include_idle: Keep threads whose innermost frame is a known wait (select, lock, queue)
+
+    Returns:
+        Speedscope document with one sampled profile per thread (weights in seconds)
+    """
+    _acquire()
+    try:
+        frames = _FrameTable()
+        code_frames: Dict[Any, int] = {}
+        per_thread: Dict[int, Dict[Tuple[int, ...], float]] = {}
+        own_id = threading.get_ident()
+
+        deadline = time.perf_counter() + seconds
+        last = time.perf_counter()
+        while True:
+            time.sleep(interval)
+            now = time.perf_counter()
+            elapsed, last = now - last, now
+
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                if not include_idle and frame.f_code.co_name in _IDLE_FUNCTIONS:
+                    continue
+
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    key = (code, frame.f_lineno)
+                    index = code_frames.get(key)
+                    if index is None:
+                        index = frames.intern(code.co_name, code.co_filename, frame.f_lineno)
+                        code_frames[key] = index
+                    stack.append(index)
+                    frame = frame.f_back
+                stack.reverse()
+
+                thread_stacks = per_thread.setdefault(thread_id, {})
+                key = tuple(stack)
+                thread_stacks[key] = thread_stacks.get(key, 0.0) + elapsed
+
+            if now >= deadline:
+                break
+
+        # Main thread (the event loop under uvicorn) first, then busiest threads
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        main_id = threading.main_thread().ident
+        profiles = [
+            _sampled_profile(f"{names.get(thread_id, 'thread')} ({thread_id})", "seconds", stacks)
+            for thread_id, stacks in sorted(
+                per_thread.items(),
+                key=lambda item: (item[0] != main_id, -len(item[1]))
+            )
+        ]
+        return _speedscope(f"CPU profile ({seconds:g}s, {interval * 1000:g}ms interval)", frames, profiles)
+    finally:
+        _capture_lock.release()
+
+
+def profile_memory(seconds: float, nframes: int = 25, limit: int = 500) -> Dict[str, Any]:
+    """
+    Trace allocations for a while and diff snapshots (blocks the calling thread)
+
+    Args:
+        seconds: Capture duration
+        nframes: Stack depth recorded per allocation
+        limit: Keep only this many allocation sites with the largest growth
+
+    Returns:
+        Speedscope document weighted by bytes allocated and still alive at the end
+    """
+    _acquire()
+    started_here = not tracemalloc.is_tracing()
+    try:
+        if started_here:
+            tracemalloc.start(nframes)
+        before = tracemalloc.take_snapshot()
+        time.sleep(seconds)
+        after = tracemalloc.take_snapshot()
+    finally:
+        if started_here:
+            tracemalloc.stop()
+        _capture_lock.release()
+
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+    diff = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), "traceback")
+
+    frames = _FrameTable()
+    stacks: Dict[Tuple[int, ...], float] = {}
+    growth = sorted((stat for stat in diff if stat.size_diff > 0), key=lambda stat: -stat.size_diff)
+    for stat in growth[:limit]:
+        # Traceback frames are ordered oldest first, like speedscope stacks
+        stack = tuple(
+            frames.intern(f"{os.path.basename(frame.filename)}:{frame.lineno}", frame.filename, frame.lineno)
+            for frame in stat.traceback
+        )
+        stacks[stack] = stacks.get(stack, 0) + stat.size_diff
+
+    profile = _sampled_profile("Allocated and not freed", "bytes", stacks)
+    return _speedscope(f"Memory growth over {seconds:g}s", frames, [profile])
@@ -0,0 +1,139 @@
+"""
+Single-flight deduplication of identical concurrent calls
+
+When many identical requests arrive at once (a viral search term, a push
+notification sending everyone to their feed), only the first one computes; the
+others wait for it and get the same result (or exception). Nothing is cached:
+once the call finishes, the next identical call computes again.
+
+Shared results are handed to every caller, so callers must not mutate them.
+"""
+from typing import Any, Callable, Dict, Hashable, Optional
+from concurrent.futures import Future
+from functools import wraps
+import asyncio
+import inspect
+import threading
+from src.core.config import settings
+from src.core.metrics import SINGLE_FLIGHT_EXECUTED, SINGLE_FLIGHT_COLLAPSED
+
+
+class SingleFlight:
+    """Groups of identical in-flight calls, for one operation"""
+
+    def __init__(self, operation: str):
+        self.operation = operation
+        self._lock = threading.Lock()
+        # key -> (future, thread of the call computing it)
+        self._calls: Dict[Hashable, Any] = {}
+        # key -> task, for coroutine calls (all on the app's event loop)
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self._executed = SINGLE_FLIGHT_EXECUTED.labels(operation)
+        self._collapsed = SINGLE_FLIGHT_COLLAPSED.labels(operation)
+
+    def do(self, key: Hashable, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Run fn(*args, **kwargs), or wait for an identical call already running in another thread
+
+        Args:
+            key: Identity of the call
+            fn: Function computing the result
+
+        Returns:
+            The result of the call that computed it
+        """
+        thread_id = threading.get_ident()
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                future = Future()
+                self._calls[key] = (future, thread_id)
+
+        if call is not None:
+            future, owner = call
+            # A recursive identical call would wait for itself
+            if owner != thread_id:
+                self._collapsed.inc()
+                return future.result()
+            return fn(*args, **kwargs)
+
+        self._executed.inc()
+        try:
+            result = fn(*args, **kwargs)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    async def do_async(self, key: Hashable, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Await fn(*args, **kwargs), or an identical call already in flight
+
+        The computation runs as its own task, so a caller that is cancelled (client
+        disconnected) does not cancel it for the others.
+
+        Args:
+            key: Identity of the call
+            fn: Coroutine function computing the result
+
+        Returns:
+            The result of the call that computed it
+        """
+        task = self._tasks.get(key)
+        if task is None:
+            self._executed.inc()
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        else:
+            self._collapsed.inc()
+        return await asyncio.shield(task)
+
+
+def _call_key(args: tuple, kwargs: Dict[str, Any]) -> Optional[Hashable]:
+    """Hashable identity of a call's arguments, or None if an argument is unhashable"""
+    key = (args, tuple(sorted(kwargs.items())))
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+def single_flight(operation: Optional[str] = None) -> Callable:
+    """
+    Decorator collapsing identical concurrent calls of a method (sync or async)
+
+    Calls are identical when they are made on the same instance with equal
+    arguments. Disabled by SINGLE_FLIGHT_ENABLED=false.
+
+    Args:
+        operation: Metrics label (defaults to the function name)
+    """
+    def decorator(fn: Callable) -> Callable:
+        flight = SingleFlight(operation or fn.__name__)
+
+        if inspect.iscoroutinefunction(fn):
+            @wraps(fn)
+            async def async_wrapper(self, *args, **kwargs):
+                key = _call_key(args, kwargs)
+                if not settings.SINGLE_FLIGHT_ENABLED or key is None:
+                    return await fn(self, *args, **kwargs)
+                return await flight.do_async((id(self), key), fn, self, *args, **kwargs)
+
+            return async_wrapper
+
+        @wraps(fn)
+        def wrapper(self, *args, **kwargs):
+            key = _call_key(args, kwargs)
+            if not settings.SINGLE_FLIGHT_ENABLED or key is None:
+                return fn(self, *args, **kwargs)
+            return flight.do((id(self), key), fn, self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,138 @@
+"""
+Binary encodings for embedding vectors
+
+JSON float lists are several times larger than the vectors themselves and cost
+float formatting/parsing on both ends. For service-to-service calls and bulk jobs
+vectors can instead travel as packed little-endian float32 (or float16) matrices:
+
+- application/octet-stream: the raw matrix; shape and small fields go in X-* headers
+- application/msgpack: a map with the same fields as the JSON body, where
+  'vectors' is the raw matrix as a msgpack bin
+
+Node reads the octet-stream body with `new Float32Array(buf.buffer, buf.byteOffset, n)`.
+"""
+from typing import Dict, Any, Optional, Sequence, Union
+import numpy as np
+import msgpack
+from fastapi import HTTPException
+from fastapi.responses import Response, JSONResponse
+
+JSON = "json"
+BINARY = "binary"
+MSGPACK = "msgpack"
+
+BINARY_MEDIA_TYPE = "application/octet-stream"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+_MEDIA_TYPES = {
+    "application/json": JSON,
+    BINARY_MEDIA_TYPE: BINARY,
+    MSGPACK_MEDIA_TYPE: MSGPACK,
+    "application/x-msgpack": MSGPACK,
+}
+
+_DTYPES = {"float32": np.dtype("<f4"), "float16": np.dtype("<f2")}
+
+VectorMatrix = Union[np.ndarray, Sequence[Sequence[float]]]
+
+
+def negotiate_format(accept: Optional[str], requested: Optional[str] = None) -> str:
+    """
+    Pick the response encoding from an explicit choice or the Accept header
+
+    Args:
+        accept: Accept header value
+        requested: Explicit format ('json', 'binary' or 'msgpack'), overrides Accept
+
+    Returns:
+        One of JSON, BINARY, MSGPACK (JSON when nothing better is acceptable)
+    """
+    if requested:
+        if requested not in (JSON, BINARY, MSGPACK):
+            raise HTTPException(status_code=400, detail=f"Unknown format '{requested}'")
+        return requested
+    if not accept:
+        return JSON
+
+    # First listed supported type wins (q-values are not needed by our clients)
+    for part in accept.split(","):
+        media_type = part.split(";")[0].strip().lower()
+        if media_type in _MEDIA_TYPES:
+            return _MEDIA_TYPES[media_type]
+    return JSON
+
+
+def pack_vectors(vectors: VectorMatrix, dtype: str = "float32") -> bytes:
+    """
+    Pack vectors into a row-major little-endian matrix
+
+    Args:
+        vectors: 2-D array or list of equal-length vectors
+        dtype: 'float32' or 'float16'
+
+    Returns:
+        Raw bytes (rows * dimension * itemsize)
+    """
+    return np.ascontiguousarray(vectors, dtype=_DTYPES[dtype]).tobytes()
+
+
+def unpack_vectors(data: bytes, dimension: int, dtype: str = "float32") -> np.ndarray:
+    """
+    Unpack a matrix produced by pack_vectors
+
+    Args:
+        data: Raw bytes
+        dimension: Vector dimension
+        dtype: 'float32' or 'float16'
+
+    Returns:
+        Array of shape (rows, dimension)
+    """
+    matrix = np.frombuffer(data, dtype=_DTYPES[dtype])
+    if dimension <= 0 or matrix.size % dimension:
+        raise ValueError(f"Buffer of {len(data)} bytes is not a whole number of {dimension}-d {dtype} vectors")
+    return matrix.reshape(-1, dimension)
+
+
+def vectors_response(
+    vectors: VectorMatrix,
+    fmt: str,
+    body: Dict[str, Any],
+    dtype: str = "float32"
+) -> Response:
+    """
+    Build a response carrying a matrix of vectors in the negotiated format
+
+    Args:
+        vectors: Vectors, one row per item
+        fmt: JSON, BINARY or MSGPACK
+        body: Other response fields; for BINARY they become X-* headers, so
+            they must be scalars (no per-row ID lists)
+        dtype: Element type of the binary encodings ('float32' or 'float16')
+
+    Returns:
+        Response with the vectors under 'vectors'
+    """
+    matrix = np.asarray(vectors, dtype=np.float32)
+    rows = int(matrix.shape[0]) if matrix.ndim == 2 else 0
+    dimension = int(matrix.shape[1]) if matrix.ndim == 2 else 0
+    shape = {"count": rows, "dimension": dimension}
+
+    if fmt == BINARY:
+        headers = {
+            "X-Vector-Count": str(rows),
+            "X-Vector-Dimension": str(dimension),
+            "X-Vector-Dtype": dtype,
+        }
+        for key, value in body.items():
+            if isinstance(value, (list, tuple, dict)):
+                raise ValueError(f"Field '{key}' cannot be sent as a header; send its size instead")
+            headers[f"X-{key.replace('_', '-').title()}"] = str(value)
+        return Response(content=pack_vectors(matrix, dtype), media_type=BINARY_MEDIA_TYPE, headers=headers)
+
+    if fmt == MSGPACK:
+        payload = {**body, **shape, "dtype": dtype, "vectors": pack_vectors(matrix, dtype)}
+        return Response(content=msgpack.packb(payload, use_bin_type=True), media_type=MSGPACK_MEDIA_TYPE)
+
+    payload = {**body, **shape, "vectors": matrix.tolist()}
+    return JSONResponse(content=payload)
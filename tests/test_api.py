@@ -0,0 +1,117 @@
+import asyncio
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from src.api.main import app
+from src.core.config import settings
+from src.core.dependencies import get_vector_db_service, get_indexing_service
+from src.services.local_vector_store import LocalVectorStore
+from src.services.vector_db_service import VectorDBService
+from src.utils.vector_codec import unpack_vectors
+
+POST_ID = "65a000000000000000000001"
+MISSING_ID = "65a000000000000000000002"
+
+
+def unit(dimension: int):
+    return [1.0] + [0.0] * (dimension - 1)
+
+
+@pytest.fixture
+def vector_db(monkeypatch):
+    monkeypatch.setattr(settings, "EXTRA_NAMED_VECTORS", {"image": 4})
+    vector_db = VectorDBService(client=LocalVectorStore())
+    vector_db.create_collections()
+    # Unit vectors, which cosine collections store unchanged
+    vector_db.upsert_post_embedding(POST_ID, unit(vector_db.dimension), {"author": "u1"})
+    vector_db.update_named_vectors(vector_db.POSTS_COLLECTION, POST_ID, {"image": unit(4)})
+    return vector_db
+
+
+@pytest.fixture
+def client(vector_db):
+    # Without the context manager the startup hooks (Mongo, model loading) do not run
+    app.dependency_overrides[get_vector_db_service] = lambda: vector_db
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def test_stored_vectors_as_json(client, vector_db):
+    response = client.post("/api/embeddings/vectors", json={"collection": "posts", "ids": [POST_ID, MISSING_ID]})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["ids"] == [POST_ID]
+    assert body["missing"] == [MISSING_ID]
+    assert body["dimension"] == vector_db.dimension
+    assert body["vectors"] == [unit(vector_db.dimension)]
+
+
+def test_stored_vectors_as_binary_align_rows_with_the_request(client, vector_db):
+    response = client.post(
+        "/api/embeddings/vectors",
+        json={"collection": "posts", "ids": [MISSING_ID, POST_ID]},
+        headers={"Accept": "application/octet-stream"}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["x-missing-count"] == "1"
+    assert response.headers["x-vector-count"] == "2"
+    matrix = unpack_vectors(response.content, vector_db.dimension)
+    assert np.isnan(matrix[0]).all()
+    np.testing.assert_array_equal(matrix[1], unit(vector_db.dimension))
+
+
+def test_extra_vector_is_sized_by_its_own_dimension(client):
+    response = client.post(
+        "/api/embeddings/vectors",
+        json={"collection": "posts", "ids": [POST_ID, MISSING_ID], "vector_name": "image", "format": "binary"}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["x-vector-dimension"] == "4"
+    matrix = unpack_vectors(response.content, 4)
+    np.testing.assert_array_equal(matrix[0], unit(4))
+    assert np.isnan(matrix[1]).all()
+
+
+def test_unknown_vector_name_is_rejected(client):
+    response = client.post(
+        "/api/embeddings/vectors",
+        json={"collection": "posts", "ids": [POST_ID], "vector_name": "bogus"}
+    )
+    assert response.status_code == 400
+
+
+class BlockingIndexer:
+    """Records whether index calls ran on the event loop"""
+
+    def __init__(self):
+        self.on_event_loop = []
+
+    def _index(self, ids):
+        try:
+            asyncio.get_running_loop()
+            self.on_event_loop.append(True)
+        except RuntimeError:
+            self.on_event_loop.append(False)
+        return len(ids), []
+
+    index_users = index_posts = _index
+
+    def embeddings_provider(self):
+        return type("Embeddings", (), {"dimension": 4})()
+
+
+@pytest.mark.parametrize("path, field", [("/api/embeddings/users/batch", "user_ids"), ("/api/embeddings/posts/batch", "post_ids")])
+def test_batch_indexing_runs_off_the_event_loop(path, field):
+    indexer = BlockingIndexer()
+    app.dependency_overrides[get_indexing_service] = lambda: indexer
+    try:
+        response = TestClient(app).post(path, json={field: [POST_ID]})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.json()["indexed"] == 1
+    assert indexer.on_event_loop == [False]
@@ -0,0 +1,52 @@
+import threading
+import numpy as np
+import pytest
+from src.core import dependencies
+from src.services.embeddings_service import EmbeddingsService
+from src.utils.inference_scheduler import InferenceScheduler
+
+
+def make_embeddings(name: str) -> EmbeddingsService:
+    """EmbeddingsService with a stand-in encoder and its own scheduler (no model is loaded)"""
+    service = EmbeddingsService.__new__(EmbeddingsService)
+    service.model_name = name
+    service._encode = lambda texts, show_progress_bar=False: np.ones((len(texts), 2), dtype=np.float32)
+    service.scheduler = InferenceScheduler(name, lambda texts: list(service._encode(texts)), autotune=False)
+    return service
+
+
+@pytest.fixture(autouse=True)
+def no_grace(monkeypatch):
+    monkeypatch.setattr(EmbeddingsService, "CLOSE_GRACE_SECONDS", 0.0)
+
+
+def test_close_stops_the_worker_and_later_calls_encode_directly():
+    service = make_embeddings("test_close")
+    scheduler = service.scheduler
+    assert service._infer(["a"], "interactive").shape == (1, 2)
+
+    service.close()
+    assert service.scheduler is None
+    assert not scheduler._worker.is_alive()
+    assert service._infer(["a", "b"], "bulk").shape == (2, 2)
+
+
+def test_replaced_embeddings_service_is_closed(monkeypatch):
+    old, new = make_embeddings("test_old"), make_embeddings("test_new")
+    old_worker = old.scheduler
+    old_worker.run(["warm"])
+    closed = threading.Event()
+    close = old.close
+
+    def close_and_signal():
+        close()
+        closed.set()
+
+    old.close = close_and_signal
+    monkeypatch.setattr(dependencies, "_embeddings_service", old)
+
+    dependencies._replace_embeddings_service(new)
+    assert dependencies.get_embeddings_service() is new
+    assert closed.wait(5)
+    assert not old_worker._worker.is_alive()
+    assert new.scheduler is not None
@@ -0,0 +1,243 @@
+import sqlite3
+import time
+import numpy as np
+import pytest
+from bson import ObjectId
+from src.core.config import settings
+from src.services.indexing_service import IndexingService
+
+
+class FakeMongo:
+    """Users by ID; fetching any ID in `broken` fails like a lost connection"""
+
+    def __init__(self, user_ids):
+        self.users = {uid: {"_id": ObjectId(uid), "firstName": uid[-4:]} for uid in user_ids}
+        self.broken = set()
+        self.fetches = []
+
+    def get_users_by_ids(self, user_ids, fields=None, raise_errors=False):
+        self.fetches.append(list(user_ids))
+        if self.broken.intersection(user_ids):
+            raise ConnectionError("mongo unavailable")
+        return [self.users[uid] for uid in user_ids if uid in self.users]
+
+
+class FakeEmbeddings:
+    def user_text(self, user):
+        return user["firstName"]
+
+    def encode_batch(self, texts, priority=None):
+        return np.zeros((len(texts), 4), dtype=np.float32)
+
+
+class FakeVectorDB:
+    def __init__(self):
+        self.indexed = []
+
+    def upsert_user_embeddings_batch(self, items):
+        self.indexed.extend(item["id"] for item in items)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "time", clock)
+    return clock
+
+
+@pytest.fixture(autouse=True)
+def queue_settings(monkeypatch):
+    monkeypatch.setattr(settings, "WRITE_BEHIND_BATCH_SIZE", 64)
+    monkeypatch.setattr(settings, "WRITE_BEHIND_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(settings, "WRITE_BEHIND_RETRY_BACKOFF", 2.0)
+    monkeypatch.setattr(settings, "WRITE_BEHIND_MAX_BACKOFF", 300.0)
+
+
+USERS = [str(ObjectId()) for _ in range(4)]
+
+
+def make_service(db_path=":memory:"):
+    mongo = FakeMongo(USERS)
+    vector_db = FakeVectorDB()
+    service = IndexingService(lambda: FakeEmbeddings(), vector_db, mongo, db_path=db_path)
+    return service, mongo, vector_db
+
+
+def test_repeated_updates_coalesce_into_one_entry(clock):
+    service, mongo, vector_db = make_service()
+    service.enqueue("user", [USERS[0], USERS[1]])
+    service.enqueue("user", [USERS[0]])
+    assert service.depth() == 2
+
+    assert service.flush() == 2
+    assert sorted(vector_db.indexed) == sorted(USERS[:2])
+    assert mongo.fetches == [[USERS[0], USERS[1]]]
+    assert service.depth() == 0
+
+
+def test_unknown_entity_type_is_rejected():
+    service, _, _ = make_service()
+    with pytest.raises(ValueError):
+        service.enqueue("comment", ["x"])
+
+
+def test_ids_missing_from_mongo_are_dropped(clock):
+    service, _, vector_db = make_service()
+    missing = str(ObjectId())
+    service.enqueue("user", [USERS[0], missing])
+
+    assert service.flush() == 2
+    assert vector_db.indexed == [USERS[0]]
+    assert service.depth() == 0
+
+
+def test_fetch_error_keeps_the_ids_queued(clock):
+    service, mongo, vector_db = make_service()
+    mongo.broken = set(USERS)
+    service.enqueue("user", USERS[:2])
+
+    assert service.flush() == 0
+    assert vector_db.indexed == []
+    stats = service.stats()
+    assert stats["depth"] == 2
+    assert stats["retrying"] == 2
+
+
+def test_failed_batch_is_retried_per_entry(clock):
+    service, mongo, vector_db = make_service()
+    mongo.broken = {USERS[1]}
+    service.enqueue("user", USERS[:3])
+
+    assert service.flush() == 2
+    assert sorted(vector_db.indexed) == sorted([USERS[0], USERS[2]])
+    # The batch, then each entry on its own
+    assert mongo.fetches[0] == USERS[:3]
+    assert sorted(map(tuple, mongo.fetches[1:])) == sorted((uid,) for uid in USERS[:3])
+    assert service.stats()["retrying"] == 1
+
+
+def test_retries_back_off_exponentially_then_park(clock):
+    service, mongo, _ = make_service()
+    mongo.broken = {USERS[0]}
+    service.enqueue("user", [USERS[0]])
+
+    assert service.flush() == 0
+    fetches = len(mongo.fetches)
+
+    # Not retried before the backoff (2s after the first failure) has passed
+    clock.now += 1.9
+    service.flush()
+    assert len(mongo.fetches) == fetches
+    clock.now += 0.2
+    service.flush()
+    assert len(mongo.fetches) == fetches + 1
+
+    # Second failure: 4s
+    clock.now += 3.9
+    service.flush()
+    assert len(mongo.fetches) == fetches + 1
+    clock.now += 0.2
+    service.flush()
+
+    # Third failure: parked
+    stats = service.stats()
+    assert stats["failed"] == 1 and stats["depth"] == 0
+    clock.now += 3600
+    service.flush()
+    assert len(mongo.fetches) == fetches + 2
+
+
+def test_new_update_resets_the_backoff(clock):
+    service, mongo, vector_db = make_service()
+    mongo.broken = {USERS[0]}
+    service.enqueue("user", [USERS[0]])
+    service.flush()
+
+    mongo.broken = set()
+    service.enqueue("user", [USERS[0]])
+    assert service.flush() == 1
+    assert vector_db.indexed == [USERS[0]]
+
+
+def test_requeue_failed_gives_parked_entries_new_attempts(clock):
+    service, mongo, vector_db = make_service()
+    mongo.broken = {USERS[0]}
+    service.enqueue("user", [USERS[0]])
+    for _ in range(settings.WRITE_BEHIND_MAX_ATTEMPTS):
+        service.flush()
+        clock.now += settings.WRITE_BEHIND_MAX_BACKOFF
+    assert service.stats()["failed"] == 1
+
+    with pytest.raises(ValueError):
+        service.requeue_failed("comment")
+    assert service.requeue_failed("post") == 0
+    mongo.broken = set()
+    assert service.requeue_failed("user") == 1
+
+    assert service.flush() == 1
+    assert vector_db.indexed == [USERS[0]]
+    assert service.stats()["failed"] == 0
+
+
+def test_update_during_flush_stays_queued(clock):
+    service, mongo, vector_db = make_service()
+    service.enqueue("user", [USERS[0]])
+
+    original = mongo.get_users_by_ids
+
+    def fetch_then_update(user_ids, fields=None, raise_errors=False):
+        # The entity changes again while its previous update is being indexed
+        service.enqueue("user", [USERS[0]])
+        return original(user_ids, fields, raise_errors)
+
+    mongo.get_users_by_ids = fetch_then_update
+    service.flush()
+    assert service.depth() == 1
+
+    mongo.get_users_by_ids = original
+    assert service.flush() == 1
+    assert service.depth() == 0
+
+
+def test_queue_files_without_backoff_column_are_migrated(tmp_path, clock):
+    path = str(tmp_path / "queue.sqlite3")
+    db = sqlite3.connect(path)
+    db.execute(
+        """
+        CREATE TABLE pending (
+            entity_type TEXT NOT NULL,
+            entity_id TEXT NOT NULL,
+            enqueued_at REAL NOT NULL,
+            updated_at REAL NOT NULL,
+            version INTEGER NOT NULL DEFAULT 0,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (entity_type, entity_id)
+        )
+        """
+    )
+    db.execute("INSERT INTO pending VALUES ('user', ?, 1, 1, 0, 0)", (USERS[0],))
+    db.commit()
+    db.close()
+
+    service, _, vector_db = make_service(path)
+    assert service.flush() == 1
+    assert vector_db.indexed == [USERS[0]]
+
+
+def test_queue_survives_a_restart(tmp_path, clock):
+    path = str(tmp_path / "queue.sqlite3")
+    service, _, _ = make_service(path)
+    service.enqueue("user", USERS[:2])
+    service._db.close()
+
+    reopened, _, vector_db = make_service(path)
+    assert reopened.flush() == 2
+    assert sorted(vector_db.indexed) == sorted(USERS[:2])
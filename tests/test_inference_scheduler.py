@@ -0,0 +1,194 @@
+import random
+import threading
+import time
+import pytest
+from src.utils.inference_scheduler import InferenceScheduler, BatchAutotuner, padded_tokens, INTERACTIVE, BULK
+
+
+class GatedModel:
+    """Batch function that records its calls and can hold the worker until released"""
+
+    def __init__(self, fail_on=None):
+        self.calls = []
+        self.fail_on = fail_on
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def hold(self):
+        self.started.clear()
+        self.release.clear()
+
+    def __call__(self, items):
+        self.calls.append(list(items))
+        self.started.set()
+        self.release.wait(5)
+        if self.fail_on is not None and self.fail_on in items:
+            raise ValueError(f"bad input {self.fail_on}")
+        return [item * 10 for item in items]
+
+
+def make_scheduler(model, max_batch_size=32, bulk_batch_size=4) -> InferenceScheduler:
+    return InferenceScheduler("test", model, max_batch_size=max_batch_size, bulk_batch_size=bulk_batch_size, autotune=False)
+
+
+def occupy_worker(scheduler: InferenceScheduler, model: GatedModel):
+    """Keep the worker busy on one call so later submissions queue up behind it"""
+    model.hold()
+    future = scheduler.submit([0], BULK)
+    assert model.started.wait(5)
+    return future
+
+
+def test_results_follow_item_order():
+    scheduler = make_scheduler(GatedModel())
+    assert scheduler.run([1, 2, 3]) == [10, 20, 30]
+    scheduler.stop()
+
+
+def test_empty_submit_resolves_without_a_call():
+    model = GatedModel()
+    scheduler = make_scheduler(model)
+    assert scheduler.submit([]).result(1) == []
+    assert model.calls == []
+
+
+def test_unknown_lane_is_rejected():
+    with pytest.raises(ValueError):
+        make_scheduler(GatedModel()).submit([1], "batch")
+
+
+def test_bulk_job_is_split_into_batches():
+    model = GatedModel()
+    scheduler = make_scheduler(model, bulk_batch_size=4)
+    assert scheduler.run(list(range(10)), BULK) == [i * 10 for i in range(10)]
+    assert [len(call) for call in model.calls] == [4, 4, 2]
+    scheduler.stop()
+
+
+def test_concurrent_interactive_requests_are_coalesced():
+    model = GatedModel()
+    scheduler = make_scheduler(model)
+    first = occupy_worker(scheduler, model)
+    futures = [scheduler.submit([i]) for i in (1, 2, 3)]
+    model.release.set()
+
+    assert [future.result(5) for future in futures] == [[10], [20], [30]]
+    assert first.result(5) == [0]
+    assert model.calls[1] == [1, 2, 3]
+    scheduler.stop()
+
+
+def test_interactive_lane_runs_before_queued_bulk():
+    model = GatedModel()
+    scheduler = make_scheduler(model, bulk_batch_size=2)
+    occupy_worker(scheduler, model)
+    bulk = scheduler.submit([5, 6, 7, 8], BULK)
+    interactive = scheduler.submit([1])
+    model.release.set()
+
+    assert interactive.result(5) == [10]
+    assert bulk.result(5) == [50, 60, 70, 80]
+    assert model.calls[1:] == [[1], [5, 6], [7, 8]]
+    scheduler.stop()
+
+
+def test_failing_request_does_not_fail_the_requests_coalesced_with_it():
+    model = GatedModel(fail_on=2)
+    scheduler = make_scheduler(model)
+    occupy_worker(scheduler, model)
+    futures = [scheduler.submit([i]) for i in (1, 2, 3)]
+    model.release.set()
+
+    assert futures[0].result(5) == [10]
+    with pytest.raises(ValueError):
+        futures[1].result(5)
+    assert futures[2].result(5) == [30]
+    # The coalesced call, then each request on its own
+    assert model.calls[1:] == [[1, 2, 3], [1], [2], [3]]
+    scheduler.stop()
+
+
+def test_failed_bulk_job_skips_its_remaining_batches():
+    model = GatedModel(fail_on=1)
+    scheduler = make_scheduler(model, bulk_batch_size=2)
+    with pytest.raises(ValueError):
+        scheduler.run([0, 1, 2, 3], BULK)
+    assert scheduler.run([4]) == [40]
+    assert model.calls == [[0, 1], [4]]
+    scheduler.stop()
+
+
+def test_stop_finishes_queued_work_and_rejects_new_work():
+    model = GatedModel()
+    scheduler = make_scheduler(model)
+    occupy_worker(scheduler, model)
+    pending = scheduler.submit([1, 2], BULK)
+    model.release.set()
+    scheduler.stop()
+
+    assert pending.result(1) == [10, 20]
+    with pytest.raises(RuntimeError):
+        scheduler.submit([3])
+
+
+# ==================== Autotuner ====================
+
+OVERHEAD = 0.002
+PER_TOKEN = 1e-5
+
+
+def make_tuner() -> BatchAutotuner:
+    tuner = BatchAutotuner("test", {INTERACTIVE: 8, BULK: 8}, pass_size=32)
+    tuner.slo = {INTERACTIVE: 0.050, BULK: 0.025}
+    tuner.max_batch = 256
+    return tuner
+
+
+def feed(tuner: BatchAutotuner, lane: str, cost, batches: int = 60):
+    """Record batches whose latency is exactly OVERHEAD + PER_TOKEN * padded tokens"""
+    rng = random.Random(0)
+    for _ in range(batches):
+        costs = [cost(rng) for _ in range(rng.randint(1, 16))]
+        tuner.record_batch(lane, costs, OVERHEAD + PER_TOKEN * padded_tokens(costs, tuner.pass_size))
+
+
+def test_padded_tokens_pads_each_pass_to_its_longest_item():
+    assert padded_tokens([5, 1, 3]) == 15
+    assert padded_tokens([5, 1, 3, 2], pass_size=2) == 2 * 5 + 2 * 2
+
+
+def test_cost_model_is_fitted_on_padded_tokens():
+    tuner = make_tuner()
+    feed(tuner, INTERACTIVE, lambda rng: rng.randint(10, 200))
+    overhead, per_token = tuner.cost_model()
+    assert overhead == pytest.approx(OVERHEAD, rel=1e-3)
+    assert per_token == pytest.approx(PER_TOKEN, rel=1e-3)
+
+
+def test_interactive_limit_fits_half_the_slo():
+    tuner = make_tuner()
+    feed(tuner, INTERACTIVE, lambda rng: 50)
+    # 2ms + 0.5ms per item within 25ms
+    assert tuner.limits[INTERACTIVE] in (45, 46)
+
+
+def test_long_tailed_items_get_smaller_batches():
+    uniform = make_tuner()
+    feed(uniform, INTERACTIVE, lambda rng: 30)
+    long_tailed = make_tuner()
+    feed(long_tailed, INTERACTIVE, lambda rng: 250 if rng.random() < 0.05 else 20)
+    assert long_tailed.limits[INTERACTIVE] < uniform.limits[INTERACTIVE] / 2
+
+
+def test_bulk_slo_only_applies_while_interactive_items_arrive():
+    tuner = make_tuner()
+    feed(tuner, BULK, lambda rng: 50)
+    assert tuner.limits[BULK] == 256
+
+    tuner.record_arrival(1, time.perf_counter())
+    assert tuner.limits[BULK] in (45, 46)
+
+    tuner._last_arrival -= tuner.IDLE_AFTER + 1
+    feed(tuner, BULK, lambda rng: 50, batches=1)
+    assert tuner.limits[BULK] == 256
@@ -0,0 +1,256 @@
+import json
+import os
+import shutil
+import numpy as np
+import pytest
+from qdrant_client.models import (
+    Distance, VectorParams, PointStruct, PointVectors, Filter, FieldCondition, HasIdCondition,
+    MatchValue, MatchAny, MatchExcept, NamedVector, PointIdsList, FilterSelector,
+    CreateAlias, CreateAliasOperation, DeleteAlias, DeleteAliasOperation,
+    UpsertOperation, UpdateVectorsOperation, SetPayloadOperation, SetPayload, UpdateVectors, PointsList
+)
+from src.core.config import settings
+from src.services.local_vector_store import LocalVectorStore, _Collection
+
+DIMENSION = 8
+
+
+def make_store(path=None) -> LocalVectorStore:
+    store = LocalVectorStore(path)
+    if "posts" not in store.collections:
+        store.create_collection("posts", vectors_config={
+            "content": VectorParams(size=DIMENSION, distance=Distance.COSINE),
+            "image": VectorParams(size=4, distance=Distance.COSINE),
+        })
+    return store
+
+
+def random_vectors(count: int, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).normal(size=(count, DIMENSION)).astype(np.float32)
+
+
+def fill(store: LocalVectorStore, vectors: np.ndarray):
+    store.upsert("posts", [
+        PointStruct(
+            id=i,
+            vector={"content": vector.tolist()},
+            payload={"author": f"u{i % 3}", "tags": ["even" if i % 2 == 0 else "odd", "all"]}
+        )
+        for i, vector in enumerate(vectors)
+    ])
+
+
+def exact_top(vectors: np.ndarray, query: np.ndarray, rows, limit: int):
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = normalized[rows] @ (query / np.linalg.norm(query))
+    return [rows[i] for i in np.argsort(-scores)[:limit]]
+
+
+def search_ids(store, query, query_filter=None, limit=5):
+    hits = store.search("posts", NamedVector(name="content", vector=query.tolist()), query_filter=query_filter, limit=limit)
+    return [hit.id for hit in hits]
+
+
+# ==================== Search and filters ====================
+
+def test_search_matches_exact_cosine_ranking():
+    vectors = random_vectors(50)
+    store = make_store()
+    fill(store, vectors)
+    query = random_vectors(1, seed=1)[0]
+
+    assert search_ids(store, query) == exact_top(vectors, query, list(range(50)), 5)
+
+
+@pytest.mark.parametrize("query_filter, expected", [
+    (Filter(must=[FieldCondition(key="author", match=MatchValue(value="u1"))]), lambda i: i % 3 == 1),
+    (Filter(must=[FieldCondition(key="author", match=MatchAny(any=["u0", "u2"]))]), lambda i: i % 3 != 1),
+    (Filter(must=[FieldCondition(key="author", match=MatchExcept(**{"except": ["u0"]}))]), lambda i: i % 3 != 0),
+    (Filter(must=[FieldCondition(key="tags", match=MatchValue(value="even"))]), lambda i: i % 2 == 0),
+    (Filter(must_not=[HasIdCondition(has_id=[0, 1, 2, 3])]), lambda i: i > 3),
+    (Filter(should=[
+        FieldCondition(key="author", match=MatchValue(value="u0")),
+        FieldCondition(key="tags", match=MatchValue(value="odd")),
+    ]), lambda i: i % 3 == 0 or i % 2 == 1),
+])
+def test_filters(query_filter, expected):
+    vectors = random_vectors(30)
+    store = make_store()
+    fill(store, vectors)
+    query = random_vectors(1, seed=2)[0]
+
+    allowed = [i for i in range(30) if expected(i)]
+    assert search_ids(store, query, query_filter, limit=len(allowed) + 5) == exact_top(vectors, query, allowed, len(allowed))
+    assert store.count("posts", count_filter=query_filter).count == len(allowed)
+
+
+def test_delete_by_filter_and_ids():
+    store = make_store()
+    fill(store, random_vectors(12))
+
+    store.delete("posts", FilterSelector(filter=Filter(must=[FieldCondition(key="author", match=MatchValue(value="u0"))])))
+    store.delete("posts", PointIdsList(points=[1]))
+
+    remaining = {record.id for record in store.scroll("posts", limit=100)[0]}
+    assert remaining == {i for i in range(12) if i % 3 != 0 and i != 1}
+
+
+# ==================== Partial updates ====================
+
+def test_update_vectors_and_set_payload_keep_the_rest_of_the_point():
+    store = make_store()
+    store.upsert("posts", [PointStruct(id="a", vector={"content": [1.0] * DIMENSION}, payload={"author": "u1"})])
+
+    store.update_vectors("posts", [PointVectors(id="a", vector={"image": [0.0, 1.0, 0.0, 0.0]})])
+    store.set_payload("posts", {"lang": "en"}, points=["a"])
+
+    record = store.retrieve("posts", ["a"], with_payload=True, with_vectors=True)[0]
+    assert sorted(record.vector) == ["content", "image"]
+    assert record.payload == {"author": "u1", "lang": "en"}
+    assert store.count("posts", count_filter=Filter(must=[FieldCondition(key="lang", match=MatchValue(value="en"))])).count == 1
+
+
+def test_update_vectors_of_a_missing_point_fails():
+    store = make_store()
+    with pytest.raises(ValueError):
+        store.update_vectors("posts", [PointVectors(id="missing", vector={"image": [1.0, 0.0, 0.0, 0.0]})])
+
+
+def test_batch_update_points_applies_operations_in_order():
+    store = make_store()
+    store.upsert("posts", [PointStruct(id="a", vector={"content": [1.0] * DIMENSION}, payload={"n": 1})])
+
+    store.batch_update_points("posts", [
+        UpsertOperation(upsert=PointsList(points=[PointStruct(id="b", vector={"content": [0.5] * DIMENSION}, payload={})])),
+        UpdateVectorsOperation(update_vectors=UpdateVectors(points=[PointVectors(id="a", vector={"image": [1, 0, 0, 0]})])),
+        SetPayloadOperation(set_payload=SetPayload(payload={"n": 2}, points=["a", "b"])),
+    ])
+
+    records = {record.id: record for record in store.retrieve("posts", ["a", "b"], with_payload=True, with_vectors=True)}
+    assert sorted(records["a"].vector) == ["content", "image"]
+    assert records["a"].payload == {"n": 2}
+    assert records["b"].payload == {"n": 2}
+
+
+def test_alias_operations_are_applied_together():
+    store = make_store()
+    store.update_collection_aliases([CreateAliasOperation(create_alias=CreateAlias(collection_name="posts", alias_name="live"))])
+    store.create_collection("posts_v2", vectors_config={"content": VectorParams(size=DIMENSION, distance=Distance.COSINE)})
+
+    store.update_collection_aliases([
+        DeleteAliasOperation(delete_alias=DeleteAlias(alias_name="live")),
+        CreateAliasOperation(create_alias=CreateAlias(collection_name="posts_v2", alias_name="live")),
+    ])
+
+    assert {alias.alias_name: alias.collection_name for alias in store.get_aliases().aliases} == {"live": "posts_v2"}
+
+
+# ==================== Persistence and compaction ====================
+
+def test_reopen_restores_points(tmp_path):
+    vectors = random_vectors(20)
+    store = make_store(str(tmp_path))
+    fill(store, vectors)
+    store.delete("posts", [3])
+    store.set_payload("posts", {"pinned": True}, points=[4])
+    store.close()
+
+    reopened = make_store(str(tmp_path))
+    assert reopened.count("posts").count == 19
+    assert reopened.retrieve("posts", [4])[0].payload["pinned"] is True
+    query = random_vectors(1, seed=3)[0]
+    assert search_ids(reopened, query) == exact_top(vectors, query, [i for i in range(20) if i != 3], 5)
+
+
+def churn(path: str, vectors: np.ndarray, deleted: int) -> LocalVectorStore:
+    """A store whose log is long enough to be compacted on the next open"""
+    store = make_store(path)
+    fill(store, vectors)
+    for _ in range(3):
+        fill(store, vectors)
+    store.delete("posts", list(range(deleted)))
+    store.close()
+    return store
+
+
+@pytest.fixture
+def small_compaction(monkeypatch):
+    # Compact after a handful of writes instead of thousands
+    monkeypatch.setattr("src.services.local_vector_store._INITIAL_CAPACITY", 4)
+
+
+def test_compaction_on_open_keeps_live_points(tmp_path, small_compaction):
+    vectors = random_vectors(40)
+    churn(str(tmp_path), vectors, deleted=10)
+    log_path = tmp_path / "posts" / "points.log"
+    lines_before = len(log_path.read_text().splitlines())
+
+    reopened = make_store(str(tmp_path))
+    assert len(log_path.read_text().splitlines()) == 30 < lines_before
+    assert not os.path.exists(str(tmp_path / "posts") + ".compact")
+    assert not os.path.exists(str(tmp_path / "posts") + ".old")
+
+    query = random_vectors(1, seed=4)[0]
+    assert search_ids(reopened, query) == exact_top(vectors, query, list(range(10, 40)), 5)
+    assert reopened.retrieve("posts", [25])[0].payload["author"] == "u1"
+
+    # Writes after compaction land in the rewritten files
+    reopened.upsert("posts", [PointStruct(id=99, vector={"content": vectors[0].tolist()}, payload={})])
+    reopened.close()
+    assert make_store(str(tmp_path)).count("posts").count == 31
+
+
+def test_crash_while_staging_keeps_the_old_files(tmp_path, small_compaction):
+    vectors = random_vectors(40)
+    churn(str(tmp_path), vectors, deleted=10)
+    directory = str(tmp_path / "posts")
+    # Half-written staging directory from a crash before the swap
+    os.makedirs(directory + ".compact")
+    (tmp_path / "posts.compact" / "points.log").write_text(json.dumps({"row": 0}) + "\n")
+
+    _Collection._recover(directory)
+    assert not os.path.exists(directory + ".compact")
+    reopened = make_store(str(tmp_path))
+    assert reopened.count("posts").count == 30
+
+
+def test_crash_between_renames_finishes_the_swap(tmp_path, small_compaction):
+    vectors = random_vectors(40)
+    churn(str(tmp_path), vectors, deleted=10)
+    directory = str(tmp_path / "posts")
+    make_store(str(tmp_path)).close()  # Compacts
+
+    # Simulate the state after the first rename: old files moved aside, staged files not yet in place
+    shutil.copytree(directory, directory + ".compact")
+    os.rename(directory, directory + ".old")
+
+    reopened = make_store(str(tmp_path))
+    assert not os.path.exists(directory + ".old")
+    assert reopened.count("posts").count == 30
+    query = random_vectors(1, seed=5)[0]
+    assert search_ids(reopened, query) == exact_top(vectors, query, list(range(10, 40)), 5)
+
+
+# ==================== IVF ====================
+
+def test_ivf_search_and_exact_fallback_for_selective_filters(monkeypatch):
+    monkeypatch.setattr(settings, "LOCAL_VECTOR_IVF_THRESHOLD", 100)
+    monkeypatch.setattr(settings, "LOCAL_VECTOR_IVF_PROBES", 1)
+    vectors = random_vectors(900)
+    store = make_store()
+    fill(store, vectors)
+    query = vectors[7] + 0.01
+
+    assert search_ids(store, query, limit=1) == [7]
+    assert store.collections["posts"].ivf_for("content") is not None
+
+    # Too few allowed rows in the probed partition: the exact scan still finds all of them
+    only = Filter(must=[HasIdCondition(has_id=[1, 500, 899])])
+    assert sorted(search_ids(store, query, only, limit=3)) == [1, 500, 899]
+
+
+def test_ivf_is_not_used_below_the_threshold(monkeypatch):
+    monkeypatch.setattr(settings, "LOCAL_VECTOR_IVF_THRESHOLD", 1000)
+    store = make_store()
+    fill(store, random_vectors(50))
+    assert store.collections["posts"].ivf_for("content") is None
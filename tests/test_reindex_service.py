@@ -0,0 +1,82 @@
+import pytest
+from src.core.config import settings
+from src.services import reindex_service
+from src.services.local_vector_store import LocalVectorStore
+from src.services.reindex_service import ReindexService
+from src.services.vector_db_service import VectorDBService
+
+
+class FakeEmbeddings:
+    def __init__(self, model_name=None, dimension=None):
+        self.model_name = model_name or settings.EMBEDDING_MODEL
+        self.dimension = dimension or settings.EMBEDDING_DIMENSION
+
+
+class FakeLive:
+    def __init__(self):
+        self.embeddings = FakeEmbeddings()
+
+
+class FakeMongo:
+    def __init__(self):
+        self.versions = {}
+
+    def save_collection_version(self, version, model_name, dimension):
+        self.versions[version] = {"model": model_name, "dimension": dimension}
+
+    def get_collection_version(self, version):
+        return self.versions.get(version)
+
+
+@pytest.fixture
+def reindex(monkeypatch):
+    # Loading a recorded model would need the real one
+    monkeypatch.setattr(reindex_service, "EmbeddingsService", FakeEmbeddings)
+    vector_db = VectorDBService(client=LocalVectorStore())
+    vector_db.create_collections()
+    promoted = []
+    service = ReindexService(FakeLive(), vector_db, FakeMongo(), on_promote=promoted.append)
+    service.promoted = promoted
+    return service
+
+
+def point_posts_at(vector_db: VectorDBService, version: int):
+    view = vector_db.for_version(version)
+    view.create_collection(view.POSTS_COLLECTION)
+    vector_db.swap_aliases({vector_db.POSTS_COLLECTION: view.POSTS_COLLECTION})
+
+
+def test_switching_models_keeps_the_settings(reindex):
+    configured = (settings.EMBEDDING_MODEL, settings.EMBEDDING_DIMENSION, settings.COLLECTION_VERSION)
+    embeddings = FakeEmbeddings("new-model", 16)
+
+    reindex._use_embeddings(embeddings, 2)
+
+    assert (settings.EMBEDDING_MODEL, settings.EMBEDDING_DIMENSION, settings.COLLECTION_VERSION) == configured
+    assert reindex.live.embeddings is embeddings
+    assert reindex.vector_db.dimension == 16
+    assert reindex.promoted == [embeddings]
+    assert reindex.status()["live_version"] == 2
+    assert reindex.status()["live_model"] == "new-model"
+
+
+def test_sync_loads_the_model_recorded_for_the_live_version(reindex):
+    reindex.mongo.save_collection_version(2, "new-model", 16)
+    point_posts_at(reindex.vector_db, 2)
+
+    assert reindex.sync_live_version()
+    assert reindex.live.embeddings.model_name == "new-model"
+    assert reindex.live_version == 2
+    assert not reindex.sync_live_version()
+
+
+def test_sync_compares_against_the_live_model_not_the_settings(reindex):
+    # This process already runs the recorded model although its settings name another one
+    reindex._use_embeddings(FakeEmbeddings("new-model", 16), 2)
+    reindex.live_target = None
+    reindex.mongo.save_collection_version(2, "new-model", 16)
+    point_posts_at(reindex.vector_db, 2)
+
+    assert not reindex.sync_live_version()
+    assert reindex.promoted == [reindex.live.embeddings]
+    assert reindex.live_target == VectorDBService.versioned_name(VectorDBService.POSTS_COLLECTION, 2)
@@ -0,0 +1,155 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from prometheus_client import REGISTRY
+from src.core.config import settings
+from src.utils.single_flight import SingleFlight, single_flight
+
+
+class SlowCall:
+    """Counts its runs and blocks until released, so identical callers pile up behind it"""
+
+    def __init__(self, result="value", error=None):
+        self.runs = 0
+        self.result = result
+        self.error = error
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self):
+        self.runs += 1
+        self.started.set()
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def collapsed(operation: str) -> float:
+    return REGISTRY.get_sample_value("single_flight_collapsed_total", {"operation": operation}) or 0.0
+
+
+def run_concurrently(flight: SingleFlight, call: SlowCall, callers: int = 5):
+    """Start one call, let the other callers join it, then release it"""
+    with ThreadPoolExecutor(callers) as pool:
+        first = pool.submit(flight.do, "key", call)
+        assert call.started.wait(5)
+        others = [pool.submit(flight.do, "key", call) for _ in range(callers - 1)]
+        while collapsed(flight.operation) < callers - 1:
+            pass
+        call.release.set()
+        return [first] + others
+
+
+def test_identical_concurrent_calls_run_once():
+    flight = SingleFlight("test_collapse")
+    call = SlowCall()
+    futures = run_concurrently(flight, call)
+
+    assert [future.result(5) for future in futures] == ["value"] * 5
+    assert call.runs == 1
+
+
+def test_exception_is_shared_by_the_waiting_callers():
+    flight = SingleFlight("test_error")
+    call = SlowCall(error=ValueError("boom"))
+    futures = run_concurrently(flight, call)
+
+    for future in futures:
+        with pytest.raises(ValueError):
+            future.result(5)
+    assert call.runs == 1
+
+
+def test_nothing_is_cached_after_the_call():
+    flight = SingleFlight("test_no_cache")
+    results = iter(["first", "second"])
+    assert flight.do("key", lambda: next(results)) == "first"
+    assert flight.do("key", lambda: next(results)) == "second"
+
+
+def test_recursive_identical_call_does_not_wait_for_itself():
+    flight = SingleFlight("test_recursive")
+
+    def outer():
+        return flight.do("key", lambda: "inner")
+
+    assert flight.do("key", outer) == "inner"
+
+
+def test_do_async_collapses_and_survives_a_cancelled_caller():
+    flight = SingleFlight("test_async")
+    runs = []
+
+    async def compute():
+        runs.append(1)
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def main():
+        cancelled = asyncio.ensure_future(flight.do_async("key", compute))
+        waiters = [asyncio.ensure_future(flight.do_async("key", compute)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        cancelled.cancel()
+        return await asyncio.gather(*waiters)
+
+    assert asyncio.run(main()) == ["value"] * 3
+    assert len(runs) == 1
+
+
+class Service:
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+
+    @single_flight("test_decorated")
+    def lookup(self, name, limit=10):
+        self.calls.append((name, limit))
+        self.release.wait(5)
+        return f"{name}:{limit}"
+
+    @single_flight("test_decorated_unhashable")
+    def lookup_many(self, names):
+        self.calls.append(tuple(names))
+        return len(names)
+
+
+def test_decorator_keys_calls_by_instance_and_arguments():
+    first, second = Service(), Service()
+    first.release.set()
+    second.release.set()
+
+    assert first.lookup("a") == "a:10"
+    assert first.lookup("a", limit=5) == "a:5"
+    assert second.lookup("a") == "a:10"
+    assert first.calls == [("a", 10), ("a", 5)]
+    assert second.calls == [("a", 10)]
+
+
+def test_decorator_collapses_concurrent_calls():
+    service = Service()
+    before = collapsed("test_decorated")
+    with ThreadPoolExecutor(4) as pool:
+        futures = [pool.submit(service.lookup, "a") for _ in range(4)]
+        while collapsed("test_decorated") < before + 3:
+            pass
+        service.release.set()
+        assert [future.result(5) for future in futures] == ["a:10"] * 4
+    assert service.calls == [("a", 10)]
+
+
+def test_decorator_passes_unhashable_arguments_through():
+    service = Service()
+    assert service.lookup_many(["a", "b"]) == 2
+    assert service.lookup_many(["a", "b"]) == 2
+    assert service.calls == [("a", "b"), ("a", "b")]
+
+
+def test_decorator_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(settings, "SINGLE_FLIGHT_ENABLED", False)
+    service = Service()
+    service.release.set()
+    service.lookup("a")
+    service.lookup("a")
+    assert service.calls == [("a", 10), ("a", 10)]
@@ -0,0 +1,75 @@
+import json
+import msgpack
+import numpy as np
+import pytest
+from fastapi import HTTPException
+from src.utils.vector_codec import (
+    negotiate_format, pack_vectors, unpack_vectors, vectors_response,
+    JSON, BINARY, MSGPACK, BINARY_MEDIA_TYPE, MSGPACK_MEDIA_TYPE
+)
+
+
+@pytest.mark.parametrize("accept, requested, expected", [
+    (None, None, JSON),
+    ("application/json", None, JSON),
+    ("application/octet-stream", None, BINARY),
+    ("application/x-msgpack;q=0.9, application/json", None, MSGPACK),
+    ("text/html, application/msgpack", None, MSGPACK),
+    ("text/html", None, JSON),
+    ("application/octet-stream", "json", JSON),
+    (None, "msgpack", MSGPACK),
+])
+def test_negotiate_format(accept, requested, expected):
+    assert negotiate_format(accept, requested) == expected
+
+
+def test_negotiate_format_rejects_unknown_formats():
+    with pytest.raises(HTTPException) as error:
+        negotiate_format(None, "xml")
+    assert error.value.status_code == 400
+
+
+@pytest.mark.parametrize("dtype, tolerance", [("float32", 0.0), ("float16", 1e-3)])
+def test_pack_unpack_round_trip(dtype, tolerance):
+    vectors = np.random.default_rng(0).uniform(-1, 1, size=(3, 5)).astype(np.float32)
+    data = pack_vectors(vectors, dtype)
+
+    assert len(data) == 3 * 5 * np.dtype(dtype).itemsize
+    np.testing.assert_allclose(unpack_vectors(data, 5, dtype), vectors, atol=tolerance)
+
+
+def test_pack_is_little_endian_row_major():
+    assert pack_vectors([[1.0, 2.0]]) == np.array([1.0, 2.0], dtype="<f4").tobytes()
+
+
+def test_unpack_rejects_partial_vectors():
+    with pytest.raises(ValueError):
+        unpack_vectors(pack_vectors([[1.0, 2.0, 3.0]]), 2)
+
+
+def test_binary_response_puts_fields_in_headers():
+    response = vectors_response([[1.0, 2.0], [3.0, 4.0]], BINARY, {"vector_name": "content", "missing_count": 0})
+
+    assert response.media_type == BINARY_MEDIA_TYPE
+    assert response.headers["X-Vector-Count"] == "2"
+    assert response.headers["X-Vector-Dimension"] == "2"
+    assert response.headers["X-Vector-Name"] == "content"
+    assert response.headers["X-Missing-Count"] == "0"
+    np.testing.assert_array_equal(unpack_vectors(response.body, 2), [[1.0, 2.0], [3.0, 4.0]])
+
+
+def test_binary_response_rejects_list_fields():
+    with pytest.raises(ValueError):
+        vectors_response([[1.0]], BINARY, {"ids": ["a"]})
+
+
+def test_msgpack_and_json_responses_carry_the_same_fields():
+    body = {"ids": ["a", "b"]}
+    packed = msgpack.unpackb(vectors_response([[1.0, 2.0], [3.0, 4.0]], MSGPACK, body, "float16").body)
+    plain = json.loads(vectors_response([[1.0, 2.0], [3.0, 4.0]], JSON, body).body)
+
+    assert packed["ids"] == plain["ids"] == ["a", "b"]
+    assert packed["count"] == plain["count"] == 2
+    assert packed["dtype"] == "float16"
+    np.testing.assert_array_equal(unpack_vectors(packed["vectors"], 2, "float16"), plain["vectors"])
+    assert vectors_response([[1.0]], MSGPACK, {}).media_type == MSGPACK_MEDIA_TYPE
@@ -0,0 +1,58 @@
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, VectorParams
+from src.core.config import settings
+from src.services.local_vector_store import LocalVectorStore
+from src.services.vector_db_service import VectorDBService, LegacyCollectionError
+
+
+@pytest.fixture
+def vector_db():
+    # In-memory Qdrant: unlike the local store it can hold collections with an unnamed vector
+    return VectorDBService(client=QdrantClient(":memory:"))
+
+
+def test_collections_are_created_behind_aliases(vector_db):
+    vector_db.create_collections()
+
+    for name in (vector_db.USERS_COLLECTION, vector_db.POSTS_COLLECTION):
+        target = vector_db.get_alias_target(name)
+        assert target == VectorDBService.versioned_name(name, settings.COLLECTION_VERSION)
+        assert not vector_db.is_legacy_collection(target)
+
+
+def test_collections_from_before_named_vectors_refuse_to_start(vector_db):
+    vector_db.client.create_collection(
+        vector_db.POSTS_COLLECTION, vectors_config=VectorParams(size=vector_db.dimension, distance=Distance.COSINE)
+    )
+
+    assert vector_db.is_legacy_collection(vector_db.POSTS_COLLECTION)
+    with pytest.raises(LegacyCollectionError, match="migrate_collections"):
+        vector_db.create_collections()
+
+
+def test_collections_missing_a_named_vector_are_legacy(vector_db):
+    vector_db.client.create_collection(
+        vector_db.USERS_COLLECTION,
+        vectors_config={"profile": VectorParams(size=vector_db.dimension, distance=Distance.COSINE)}
+    )
+    assert vector_db.is_legacy_collection(vector_db.USERS_COLLECTION)
+
+
+def test_unversioned_named_vector_collections_are_kept_until_replaced(vector_db):
+    vector_db.create_collection(vector_db.POSTS_COLLECTION)
+    vector_db.create_collections()
+    assert vector_db.get_alias_target(vector_db.POSTS_COLLECTION) is None
+
+    view = vector_db.for_version(settings.COLLECTION_VERSION + 1)
+    view.create_collection(view.POSTS_COLLECTION)
+    with pytest.raises(RuntimeError):
+        vector_db.swap_aliases({vector_db.POSTS_COLLECTION: view.POSTS_COLLECTION})
+    vector_db.swap_aliases({vector_db.POSTS_COLLECTION: view.POSTS_COLLECTION}, drop_unversioned=True)
+    assert vector_db.get_alias_target(vector_db.POSTS_COLLECTION) == view.POSTS_COLLECTION
+
+
+def test_local_store_collections_are_never_legacy():
+    vector_db = VectorDBService(client=LocalVectorStore())
+    vector_db.create_collections()
+    assert not vector_db.is_legacy_collection(vector_db.get_alias_target(vector_db.POSTS_COLLECTION))